@@ -0,0 +1,107 @@
+"""
+augmentation.py
+
+On-the-fly augmentation of raw EMG windows for training, in batched NumPy:
+every batch of windows is transformed with freshly drawn random parameters,
+so augmented data is never stored on disk and every epoch sees new variants.
+
+- gain: the signal's deviation from its resting level is scaled by a random
+  factor (electrode contact, skin conductance, a stronger or weaker user);
+- noise: white noise relative to the window's spread;
+- drift: a random offset ramp over the window (baseline wander);
+- warp: a smooth random time warp (faster or slower gestures);
+- shift: electrode displacement, simulated as a random blend with a
+  smoothed copy of the signal (the detail a displaced electrode loses).
+
+The strength of each transform is set in an augmentation config (see
+DEFAULT_AUGMENTATION; 0 disables one). window_batches() yields batches of
+augmented window features forever; model_training.py --augment streams it
+into Keras through a prefetching tf.data pipeline.
+"""
+
+import numpy as np
+
+from emg_features import extract_features_batch
+
+DEFAULT_AUGMENTATION = {
+    "gain": 0.3,  # Scale factor drawn from 1 +- gain
+    "noise": 0.05,  # Noise standard deviation as a fraction of the window's std
+    "drift": 0.2,  # Largest ramp over the window as a fraction of the window's std
+    "warp": 0.15,  # Largest speed change (fraction) and bend of the time warp
+    "shift": 0.5,  # Largest weight of the smoothed copy
+}
+SHIFT_SMOOTHING = 9  # Samples in the moving average of the electrode shift
+
+
+def resting_level(windows):
+    """Per-window resting level (low percentile), shape (n, 1)."""
+    return np.percentile(windows, 10, axis=1, keepdims=True)
+
+
+def scale_gain(windows, rng, amount):
+    rest = resting_level(windows)
+    gain = rng.uniform(1 - amount, 1 + amount, (len(windows), 1))
+    return rest + (windows - rest) * gain
+
+
+def add_noise(windows, rng, amount):
+    scale = amount * windows.std(axis=1, keepdims=True)
+    return windows + rng.standard_normal(windows.shape) * scale
+
+
+def add_drift(windows, rng, amount):
+    ramp = np.linspace(-0.5, 0.5, windows.shape[1])[None, :]
+    slope = rng.uniform(-amount, amount, (len(windows), 1)) * windows.std(axis=1, keepdims=True)
+    return windows + slope * ramp
+
+
+def time_warp(windows, rng, amount):
+    """Resample every window along a random monotonic warp of its time axis."""
+    n, size = windows.shape
+    t = np.arange(size, dtype=float)[None, :]
+    center = (size - 1) / 2
+    speed = rng.uniform(1 - amount, 1 + amount, (n, 1))
+    # A half-sine bend moves the middle of the window while keeping its ends
+    bend = rng.uniform(-amount, amount, (n, 1)) * size / 4 * np.sin(np.pi * t / (size - 1))
+    positions = np.clip(center + (t - center) * speed + bend, 0, size - 1)
+    lower = np.minimum(positions.astype(np.intp), size - 2)
+    frac = positions - lower
+    left = np.take_along_axis(windows, lower, axis=1)
+    right = np.take_along_axis(windows, lower + 1, axis=1)
+    return left + (right - left) * frac
+
+
+def electrode_shift(windows, rng, amount):
+    k = SHIFT_SMOOTHING
+    padded = np.pad(windows, ((0, 0), (k // 2, k - 1 - k // 2)), mode="edge")
+    cumsum = np.cumsum(padded, axis=1)
+    smoothed = (cumsum[:, k - 1:] - np.concatenate([np.zeros((len(windows), 1)), cumsum[:, :-k]], axis=1)) / k
+    weight = rng.uniform(0, amount, (len(windows), 1))
+    return windows + (smoothed - windows) * weight
+
+
+TRANSFORMS = [("warp", time_warp), ("shift", electrode_shift), ("gain", scale_gain), ("drift", add_drift),
+              ("noise", add_noise)]
+
+
+def augment(windows, rng, config=DEFAULT_AUGMENTATION):
+    """Augmented copy of a (n, window_size) batch of raw windows."""
+    windows = np.asarray(windows, dtype=float)
+    for name, transform in TRANSFORMS:
+        amount = config.get(name, 0)
+        if amount:
+            windows = transform(windows, rng, amount)
+    return windows
+
+
+def window_batches(windows, timestamps, labels, batch_size, seed=0, config=DEFAULT_AUGMENTATION):
+    """
+    Yield (features, labels) batches of randomly drawn, freshly augmented
+    windows forever. timestamps: the windows' sample times (or None), used
+    unchanged since augmentation does not change the sampling.
+    """
+    rng = np.random.default_rng(seed)
+    while True:
+        index = rng.integers(0, len(windows), batch_size)
+        batch_timestamps = None if timestamps is None else timestamps[index]
+        yield extract_features_batch(augment(windows[index], rng, config), batch_timestamps), labels[index]
@@ -0,0 +1,76 @@
+"""
+bench_controller_latency.py
+
+Measures publish-to-receive latency of the controller link with local
+test clients: a publisher sends probability events at a fixed rate and
+each subscriber process records how long every event took to arrive.
+
+Usage:
+    python bench_controller_latency.py --subscribers 1 4 --messages 2000 --rate 1000
+"""
+
+import time
+import argparse
+import multiprocessing as mp
+
+import numpy as np
+
+from controller_client import ControllerClient
+from controller_link import KIND_STOP, DecisionPublisher, default_address
+
+
+def subscriber(address, ready, results):
+    client = ControllerClient(address)
+    ready.set()
+    latencies = [event.latency_ms for event in client.events() if event.kind == "probabilities"]
+    results.put(latencies)
+
+
+def run(address, subscribers, messages, rate):
+    publisher = DecisionPublisher(address, hello={"classes": ["clench", "index", "rest", "wrist"]})
+    results = mp.Queue()
+    processes = []
+    for _ in range(subscribers):
+        ready = mp.Event()
+        process = mp.Process(target=subscriber, args=(publisher.address, ready, results))
+        process.start()
+        ready.wait()
+        processes.append(process)
+    while publisher.subscriber_count < subscribers:
+        time.sleep(0.01)
+
+    probabilities = np.array([0.1, 0.7, 0.1, 0.1], dtype=np.float32)
+    interval = 1.0 / rate
+    next_send = time.perf_counter()
+    for _ in range(messages):
+        while time.perf_counter() < next_send:
+            pass
+        publisher.publish_probabilities(probabilities)
+        next_send += interval
+    publisher.publish(KIND_STOP)
+
+    latencies = np.concatenate([results.get() for _ in processes])
+    for process in processes:
+        process.join()
+    publisher.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=1000, help="events per second")
+    parser.add_argument("--tcp", action="store_true", help="benchmark loopback TCP instead of the default")
+    args = parser.parse_args()
+
+    address = "tcp:127.0.0.1:0" if args.tcp else default_address("ugc-bench")
+    print(f"{'subscribers':>11} {'median ms':>10} {'p99 ms':>8} {'max ms':>8} {'received':>9}")
+    for count in args.subscribers:
+        latencies = run(address, count, args.messages, args.rate)
+        print(f"{count:>11} {np.median(latencies):>10.3f} {np.percentile(latencies, 99):>8.3f} "
+              f"{latencies.max():>8.3f} {len(latencies):>9}")
+
+
+if __name__ == "__main__":
+    main()
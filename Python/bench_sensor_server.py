@@ -0,0 +1,139 @@
+"""
+bench_sensor_server.py
+
+Runs sensor_server.py against N virtual serial ports ("loop://") fed with
+synthetic EMG at the sensor's rate, for growing N, and reports how the
+server keeps up: samples and windows per second, forward passes per
+second and their average batch, window latency (arrival of the window's
+last sample to its probabilities), dropped samples and the CPU share of
+the event loop.
+
+With one shared bundle the number of forward passes stays at about one
+per tick whatever N is, so windows per second grow with the number of
+users at little extra CPU. --per-user-bundles gives every user a separate
+copy (one pass per user and tick, as with personal bundles).
+
+--stalled-subscriber connects a subscriber to user1's link that never
+reads, and floods that link with FLOOD_BYTES every WRITE_SECONDS, like a
+game that froze on a busy station. Its publisher must drop the subscriber
+without ever blocking the event loop, so the latencies of every station
+stay where they are without the stall.
+
+Usage:
+    python bench_sensor_server.py --users 1 4 16 64 --seconds 10
+    python bench_sensor_server.py --users 8 --speed 10    # 1 kHz sensors
+    python bench_sensor_server.py --users 16 --stalled-subscriber
+"""
+
+import time
+import asyncio
+import argparse
+
+import numpy as np
+
+from controller_link import KIND_PROBS, DecisionSubscriber, default_address
+from model_bundle import BUNDLE_FILE, load_bundle
+from sensor_server import DEFAULT_MAP, TICK_SECONDS, SensorServer, Station, open_port
+from sensor_stream import SAMPLE_RATE
+
+WRITE_SECONDS = 0.01  # Interval of the simulated sensors' writes
+FLOOD_BYTES = 16 * 1024  # Payload written to the stalled subscriber's link per write
+
+
+def synthetic_signal(samples, seed):
+    """Resting noise with bursts of contraction, as integer ADC readings."""
+    rng = np.random.default_rng(seed)
+    values = 300 + rng.normal(0, 5, samples)
+    bursts = rng.random(samples) < 0.002
+    values += 200 * np.convolve(bursts, np.ones(80), mode="same") * rng.normal(1, 0.3, samples)
+    return np.clip(values, 0, 1023).astype(int)
+
+
+async def simulate_sensor(port, values, rate):
+    """Write values to a virtual port as lines, rate samples per second, in real time."""
+    start = time.perf_counter()
+    written = 0
+    while written < len(values):
+        due = min(int((time.perf_counter() - start) * rate), len(values))
+        if due > written:
+            port.write(b"".join(b"%d\n" % v for v in values[written:due]))
+            written = due
+        await asyncio.sleep(WRITE_SECONDS)
+
+
+async def flood_link(publisher):
+    """Publish large messages on a link until its publisher has dropped its (stalled) subscriber."""
+    while not publisher.dropped_subscribers:
+        publisher.publish(KIND_PROBS, 0, bytes(FLOOD_BYTES))
+        await asyncio.sleep(WRITE_SECONDS)
+
+
+async def run(users, seconds, speed, per_user_bundles, bundle_path, tick, stalled_subscriber=False):
+    shared = load_bundle(bundle_path)
+    stations = []
+    for i in range(users):
+        bundle = load_bundle(bundle_path) if per_user_bundles else shared
+        stations.append(Station(f"user{i + 1}", open_port("loop://"), bundle, DEFAULT_MAP,
+                                address=default_address(f"ugc-bench-{i + 1}")))
+    server = SensorServer(stations, tick)
+    rate = SAMPLE_RATE * speed
+    signals = [synthetic_signal(int(rate * seconds), seed) for seed in range(users)]
+    sensors = [asyncio.create_task(simulate_sensor(s.port, v, rate)) for s, v in zip(stations, signals)]
+    stalled = None
+    if stalled_subscriber:
+        stalled = DecisionSubscriber(stations[0].publisher.address)  # Never read
+        while not stations[0].publisher.subscriber_count:
+            await asyncio.sleep(WRITE_SECONDS)
+        sensors.append(asyncio.create_task(flood_link(stations[0].publisher)))
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    await server.run(duration=seconds, status_interval=None)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    for task in sensors:
+        task.cancel()
+    await asyncio.gather(*sensors, return_exceptions=True)
+    if stalled is not None:
+        stalled.close()
+
+    statuses = [station.status() for station in stations]
+    latencies = np.concatenate([np.asarray(station.latencies) for station in stations]) * 1000
+    server.close()
+    worker = server.worker
+    return {
+        "users": users,
+        "samples_s": sum(s["samples"] for s in statuses) / wall,
+        "windows_s": sum(s["windows"] for s in statuses) / wall,
+        "passes_s": worker.passes / wall,
+        "batch": worker.windows / max(worker.passes, 1),
+        "p50_ms": float(np.median(latencies)) if len(latencies) else float("nan"),
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else float("nan"),
+        "dropped": sum(s["dropped"] for s in statuses),
+        "dropped_subscribers": sum(s["dropped_subscribers"] for s in statuses),
+        "cpu": cpu / wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seconds", type=float, default=10.0, help="run time per user count")
+    parser.add_argument("--speed", type=float, default=1.0, help="sensor rate as a multiple of the real one")
+    parser.add_argument("--per-user-bundles", action="store_true", help="load a separate bundle for every user")
+    parser.add_argument("--bundle", default=BUNDLE_FILE, help=f"model bundle (default: {BUNDLE_FILE})")
+    parser.add_argument("--tick", type=float, default=TICK_SECONDS, help="batching interval in seconds")
+    parser.add_argument("--stalled-subscriber", action="store_true",
+                        help="flood user1's link while one of its subscribers never reads")
+    args = parser.parse_args()
+
+    print(f"{'users':>5} {'samples/s':>10} {'windows/s':>10} {'passes/s':>9} {'batch':>6} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'dropped':>8} {'subs dropped':>12} {'cpu %':>6}")
+    for users in args.users:
+        r = asyncio.run(run(users, args.seconds, args.speed, args.per_user_bundles, args.bundle, args.tick,
+                            args.stalled_subscriber))
+        print(f"{r['users']:>5} {r['samples_s']:>10.0f} {r['windows_s']:>10.1f} {r['passes_s']:>9.1f} "
+              f"{r['batch']:>6.1f} {r['p50_ms']:>7.1f} {r['p99_ms']:>7.1f} {r['dropped']:>8} "
+              f"{r['dropped_subscribers']:>12} {100 * r['cpu']:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
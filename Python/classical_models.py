@@ -0,0 +1,181 @@
+"""
+classical_models.py
+
+Classical classifiers for the hand-crafted window features, as cheaper
+alternatives to the Keras MLP: LDA, logistic regression, a linear SVM and
+shallow gradient-boosted trees. They are trained with scikit-learn and
+exported to ordinary model bundles, so the live scripts run them with the
+bundle's NumPy forward pass and import neither scikit-learn nor TensorFlow:
+
+- the linear models become a "linear" bundle, a single softmax layer over
+  their decision scores (the linear SVM's scores are scaled by a fitted
+  temperature so its outputs work with the confidence thresholds);
+- the trees become a "trees" bundle with the normalization folded into
+  the split thresholds.
+
+benchmark() measures accuracy, single-sample predict latency and the peak
+memory of loading and running each saved bundle, so every station can pick
+the cheapest model that meets its accuracy target
+(model_training.py --classical).
+"""
+
+import os
+import tracemalloc
+
+import numpy as np
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import LinearSVC
+
+from emg_features import FEATURE_COLUMNS
+from model_bundle import ModelBundle, load_bundle, predict_latency_ms
+
+CLASSICAL_MODELS = ["lda", "logreg", "linear_svm", "gbt"]
+GBT_ESTIMATORS = 50
+GBT_DEPTH = 3
+GBT_LEARNING_RATE = 0.1
+# Candidate softmax temperatures for the linear SVM's decision scores
+TEMPERATURES = np.logspace(-1, 2, 61)
+LATENCY_REPEATS = 2000
+
+
+def make_classifier(name):
+    if name == "lda":
+        return LinearDiscriminantAnalysis()
+    if name == "logreg":
+        return LogisticRegression(max_iter=2000)
+    if name == "linear_svm":
+        return LinearSVC()
+    if name == "gbt":
+        return GradientBoostingClassifier(n_estimators=GBT_ESTIMATORS, max_depth=GBT_DEPTH,
+                                          learning_rate=GBT_LEARNING_RATE, random_state=0)
+    raise ValueError(f"Unknown classical model: {name}")
+
+
+def _class_scores(scores):
+    """(n, num_classes) scores; binary models give one score for the second class."""
+    scores = np.asarray(scores, dtype=np.float64)
+    if scores.ndim == 1:
+        return np.column_stack([np.zeros(len(scores)), scores])
+    return scores
+
+
+def fit_temperature(scores, y_encoded):
+    """Scale of the decision scores that minimizes the softmax log loss on the training data."""
+    best, best_loss = 1.0, np.inf
+    for temperature in TEMPERATURES:
+        z = scores * temperature
+        z = z - z.max(axis=1, keepdims=True)
+        loss = np.mean(np.log(np.exp(z).sum(axis=1)) - z[np.arange(len(z)), y_encoded])
+        if loss < best_loss:
+            best, best_loss = temperature, loss
+    return float(best)
+
+
+def linear_weights(model, temperature=1.0):
+    """[W, b] of a fitted linear scikit-learn classifier, as one softmax layer."""
+    W = model.coef_.T * temperature
+    b = np.atleast_1d(model.intercept_) * temperature
+    if W.shape[1] == 1:
+        W = np.column_stack([np.zeros(len(W)), W])
+        b = np.concatenate([[0.0], b])
+    return [W, b]
+
+
+def tree_weights(model, X_norm, mean, std):
+    """
+    Node arrays (see ModelBundle._unpack_trees) of a fitted
+    GradientBoostingClassifier trained on standardized features.
+    """
+    stages, per_stage = model.estimators_.shape
+    trees = [model.estimators_[s, k].tree_ for s in range(stages) for k in range(per_stage)]
+    max_nodes = max(tree.node_count for tree in trees)
+    shape = (len(trees), max_nodes)
+    nodes = np.arange(max_nodes)
+    feature = np.zeros(shape)
+    threshold = np.full(shape, np.inf)
+    left = np.tile(nodes, (len(trees), 1)).astype(np.float64)
+    right = left.copy()
+    value = np.zeros(shape)
+    for i, tree in enumerate(trees):
+        n = tree.node_count
+        internal = tree.children_left[:n] >= 0
+        split = np.flatnonzero(internal)
+        f = tree.feature[split]
+        feature[i, split] = f
+        # (x - mean) / std <= t  <=>  x <= t * std + mean
+        threshold[i, split] = tree.threshold[split] * std[f] + mean[f]
+        left[i, split] = tree.children_left[split]
+        right[i, split] = tree.children_right[split]
+        value[i, :n] = tree.value[:n, 0, 0] * model.learning_rate
+    tree_class = np.tile(np.arange(per_stage), stages)
+    if per_stage == 1:
+        tree_class += 1  # Binary: the trees score the second class against 0
+
+    # Constant starting scores: what decision_function adds on top of the trees
+    sample = X_norm[:1]
+    tree_sum = np.zeros(max(per_stage, 1))
+    for i, tree in enumerate(trees):
+        tree_sum[i % per_stage] += model.learning_rate * tree.predict(sample.astype(np.float32))[0, 0]
+    raw = np.atleast_1d(model.decision_function(sample)[0])
+    init = raw - tree_sum
+    if per_stage == 1:
+        init = np.concatenate([[0.0], init])
+    return [feature, threshold, left, right, value, tree_class, init]
+
+
+def train_classical(name, X, y_encoded, classes, mean, std, window_size, hop):
+    """Fit classical model name on raw features X (standardized with mean / std) and export it."""
+    X_norm = (X - mean) / std
+    model = make_classifier(name).fit(X_norm, y_encoded)
+    extra = {"training": {"model": name}}
+    if name == "gbt":
+        extra["training"].update(estimators=GBT_ESTIMATORS, depth=GBT_DEPTH)
+        return ModelBundle(tree_weights(model, X_norm, mean, std), classes, FEATURE_COLUMNS, window_size, hop,
+                           model_type="trees", extra=extra)
+    temperature = 1.0
+    if name == "linear_svm":
+        temperature = fit_temperature(_class_scores(model.decision_function(X_norm)), y_encoded)
+        extra["training"]["temperature"] = temperature
+    return ModelBundle(linear_weights(model, temperature), classes, FEATURE_COLUMNS, window_size, hop,
+                       norm_mean=mean, norm_std=std, model_type="linear", extra=extra)
+
+
+def bundle_footprint_kib(path, X):
+    """Peak memory (KiB) of loading the bundle at path and predicting every row one at a time."""
+    tracemalloc.start()
+    try:
+        bundle = load_bundle(path)
+        for row in X:
+            bundle.predict(row[None, :])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def benchmark(paths, X_test, y_test):
+    """
+    Accuracy, single-sample latency and peak memory of every saved bundle
+    (mapping name -> path) on the held-out features.
+    """
+    results = []
+    for name, path in paths.items():
+        bundle = load_bundle(path)
+        predicted = np.argmax(bundle.predict(X_test), axis=1)
+        results.append({
+            "model": name,
+            "path": path,
+            "accuracy": float(np.mean(predicted == y_test)),
+            "latency_us": 1000 * predict_latency_ms(bundle, X_test, LATENCY_REPEATS),
+            "peak_kib": bundle_footprint_kib(path, X_test),
+            "file_kib": os.path.getsize(path) / 1024,
+        })
+    return results
+
+
+def cheapest(results, target_accuracy):
+    """The fastest result meeting target_accuracy (then the smallest), None if none does."""
+    passing = [r for r in results if r["accuracy"] >= target_accuracy]
+    return min(passing, key=lambda r: (r["latency_us"], r["peak_kib"])) if passing else None
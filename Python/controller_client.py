@@ -0,0 +1,103 @@
+"""
+controller_client.py
+
+Client library for controller_daemon.py (and the wizard's game link).
+
+    from controller_client import ControllerClient
+
+    client = ControllerClient("unix:/tmp/ugc.sock")
+    for event in client.events():
+        if event.kind == "gesture":
+            print(event.label, event.latency_ms)
+
+poll() never blocks, so it can also be called once per frame from a game loop.
+"""
+
+import time
+
+from controller_link import (KIND_ACTION, KIND_GESTURE, KIND_PRESS, KIND_PROBS, KIND_RELEASE, KIND_START,
+                             KIND_STOP, DecisionSubscriber)
+
+KIND_NAMES = {
+    KIND_START: "start",
+    KIND_ACTION: "action",
+    KIND_PRESS: "press",
+    KIND_RELEASE: "release",
+    KIND_PROBS: "probabilities",
+    KIND_STOP: "stop",
+    KIND_GESTURE: "gesture",
+}
+
+
+class ControllerEvent:
+    __slots__ = ("timestamp", "received", "kind", "label", "action", "probabilities", "intensity", "onset")
+
+    def __init__(self, timestamp, received, kind, label=None, action=None, probabilities=None, intensity=None,
+                 onset=None):
+        self.timestamp = timestamp
+        self.received = received
+        self.kind = kind
+        self.label = label
+        self.action = action
+        self.probabilities = probabilities
+        self.intensity = intensity
+        self.onset = onset
+
+    @property
+    def latency_ms(self):
+        """Time from the decision to its arrival here."""
+        return (self.received - self.timestamp) * 1000
+
+    @property
+    def gesture_latency_ms(self):
+        """Time from the start of the gesture to the decision's arrival here, None if not known."""
+        return None if self.onset is None else (self.received - self.onset) * 1000
+
+    def __repr__(self):
+        return f"ControllerEvent({self.kind}, label={self.label}, action={self.action}, t={self.timestamp:.3f})"
+
+
+class ControllerClient:
+    def __init__(self, address, timeout=5.0):
+        self.subscriber = DecisionSubscriber(address, timeout)
+        self.classes = []
+        self.latest_probabilities = None
+
+    def _convert(self, raw, received):
+        if self.subscriber.hello and not self.classes:
+            self.classes = self.subscriber.hello.get("classes", [])
+        label = None
+        probabilities = raw.probabilities
+        if raw.kind in (KIND_GESTURE, KIND_PROBS) and raw.code < len(self.classes):
+            label = self.classes[raw.code]
+        if probabilities is not None:
+            self.latest_probabilities = probabilities
+        return ControllerEvent(raw.timestamp, received, KIND_NAMES.get(raw.kind, str(raw.kind)),
+                               label, raw.action, probabilities, raw.intensity, raw.onset)
+
+    def poll(self):
+        """Events received since the last call, without blocking."""
+        raw_events = self.subscriber.poll()
+        received = time.time()
+        return [self._convert(raw, received) for raw in raw_events]
+
+    def wait(self, timeout=None):
+        """Block until events arrive or timeout passes; returns the (possibly empty) list."""
+        raw_events = self.subscriber.wait(timeout)
+        received = time.time()
+        return [self._convert(raw, received) for raw in raw_events]
+
+    def events(self, timeout=None):
+        """Yield events as they arrive until the daemon stops or disconnects."""
+        while not self.subscriber.closed:
+            for event in self.wait(timeout):
+                yield event
+                if event.kind == "stop":
+                    return
+
+    @property
+    def connected(self):
+        return not self.subscriber.closed
+
+    def close(self):
+        self.subscriber.close()
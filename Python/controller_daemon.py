@@ -0,0 +1,205 @@
+"""
+controller_daemon.py
+
+Standalone EMG controller: the loop of real_time_classification.py
+(read sensor, classify sliding windows, smooth and debounce decisions),
+but instead of printing, every result is published on a controller_link
+socket that any number of programs can subscribe to:
+
+- KIND_PROBS for every classified window (class probabilities),
+- KIND_GESTURE when a gesture becomes active (code = class index),
+- KIND_ACTION when that gesture is mapped to a game action, or
+  KIND_PRESS / KIND_RELEASE for held actions (duck) as the muscle
+  contracts and relaxes.
+
+All events carry the timestamp of the sample that completed the window.
+Subscribers connect with controller_client.ControllerClient.
+
+With --record (or a SessionRecorder), the raw samples and every decision
+are also written to a session log for UI/session_replay.py.
+
+When the loop falls behind the sensor (samples older than BACKLOG_SECONDS
+pending), the backlog goes through LiveClassifier.catch_up() so no stale
+gesture is published; --catch-up picks the mode ("batch" by default).
+
+With --adapt the classifier follows slow signal drift online
+(drift_adaptation.py); the drift metric is kept in drift_status, printed
+and recorded as an event every DRIFT_REPORT_SECONDS.
+
+Usage:
+    python controller_daemon.py --port COM4 --address unix:/tmp/ugc.sock --map clench=jump wrist=duck
+    python controller_daemon.py --port COM4 --record sessions/
+"""
+
+import os
+import time
+import argparse
+import threading
+
+from controller_link import (ACTION_CODES, ACTIONS, KIND_ACTION, KIND_GESTURE, KIND_PRESS, KIND_RELEASE,
+                             KIND_STOP, DecisionPublisher, default_address)
+from live_classifier import BACKLOG_SECONDS, CATCH_UP_MODES, LiveClassifier, backlog_age
+from model_bundle import BUNDLE_FILE, load_bundle
+from sensor_stream import DEFAULT_BAUDRATE, DEFAULT_PORT, SensorStream
+from session_log import CONTROLLER_LOG, SessionRecorder, new_session_dir
+
+IDLE_SECONDS = 0.001  # Sleep when no samples are pending (bounds added latency to ~1 ms)
+# Classify every HOP samples (100 ms at 100 Hz) so held gestures start quickly;
+# their release is detected per sample by the gesture tracker
+HOP = 10
+HELD_ACTIONS = ("duck",)
+DRIFT_REPORT_SECONDS = 10.0
+ACTION_KINDS = {"action": KIND_ACTION, "press": KIND_PRESS, "release": KIND_RELEASE}
+
+
+def publish_decision(publisher, class_index, decision):
+    """Publish a LiveClassifier Decision: KIND_GESTURE, then its action / press / release."""
+    if decision.kind != "release":
+        publisher.publish(KIND_GESTURE, class_index[decision.label], timestamp=decision.timestamp)
+    if decision.action is not None:
+        publisher.publish_action(decision.action, decision.timestamp, ACTION_KINDS[decision.kind],
+                                 decision.intensity, decision.onset)
+
+
+class ControllerDaemon:
+    def __init__(self, sensor, bundle, gestures, publisher=None, address=None, publish_probabilities=True,
+                 hop=HOP, held_actions=HELD_ACTIONS, recorder=None, adapt=False, catch_up="batch"):
+        """
+        sensor: a started SensorStream (or anything with subscribe/unsubscribe).
+        gestures: class name -> game action for KIND_ACTION events.
+        recorder: optional SessionRecorder for the samples and decisions.
+        adapt: adapt the classifier to signal drift during the session.
+        catch_up: LiveClassifier.catch_up mode for backlogs, None to classify them normally.
+        """
+        self.sensor = sensor
+        self.bundle = bundle
+        self.gestures = {label: action for label, action in gestures.items() if action in ACTION_CODES}
+        self.classifier = LiveClassifier(bundle, self.gestures, hop=hop, held_actions=held_actions, adapt=adapt)
+        self.catch_up = catch_up
+        self.drift_status = None
+        self._next_drift_report = None
+        self.publish_probabilities = publish_probabilities
+        self.publisher = publisher or DecisionPublisher(address or default_address("ugc-daemon"))
+        self.publisher.set_hello({"classes": bundle.classes, "actions": ACTIONS, "gestures": self.gestures})
+        self._class_index = {label: i for i, label in enumerate(bundle.classes)}
+        self.recorder = recorder
+        if recorder is not None:
+            # Everything session_replay.py needs to rebuild the same LiveClassifier
+            recorder.meta({"source": "controller", "classes": bundle.classes, "hop": self.classifier.hop,
+                           "gestures": self.gestures, "held_actions": list(held_actions), "adapt": adapt})
+        self._running = False
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.publisher.address
+
+    def _on_window(self, timestamp, probabilities):
+        if self.publish_probabilities:
+            self.publisher.publish_probabilities(probabilities, timestamp)
+
+    def _report_drift(self, timestamp):
+        if self._next_drift_report is None:
+            self._next_drift_report = timestamp + DRIFT_REPORT_SECONDS
+        if timestamp < self._next_drift_report:
+            return
+        self._next_drift_report = timestamp + DRIFT_REPORT_SECONDS
+        self.drift_status = self.classifier.adapter.status()
+        print(f"Drift {self.drift_status['drift']:.2f} std after {self.drift_status['updates']} updates")
+        if self.recorder is not None:
+            self.recorder.event(dict(self.drift_status, event="drift", timestamp=timestamp))
+
+    def run(self):
+        """Classify and publish until stop() is called."""
+        samples = self.sensor.subscribe()
+        self._running = True
+        try:
+            while self._running:
+                timestamps, values = samples.drain()
+                if len(values) == 0:
+                    time.sleep(IDLE_SECONDS)
+                    continue
+                behind = self.catch_up is not None and backlog_age(timestamps) > BACKLOG_SECONDS
+                if self.recorder is not None:
+                    if behind:
+                        # Tells session_replay.py to catch up on the next samples too
+                        self.recorder.event({"event": "catch_up", "mode": self.catch_up, "samples": len(values),
+                                             "timestamp": timestamps[0]})
+                    self.recorder.samples(timestamps, values)
+                if behind:
+                    decisions = self.classifier.catch_up(timestamps, values, self.catch_up, self._on_window)
+                else:
+                    decisions = self.classifier.push(timestamps, values, self._on_window)
+                for decision in decisions:
+                    if self.recorder is not None:
+                        self.recorder.decision(decision.timestamp, decision.kind, self._class_index[decision.label],
+                                               ACTION_CODES.get(decision.action), decision.intensity,
+                                               decision.probabilities)
+                    publish_decision(self.publisher, self._class_index, decision)
+                if self.classifier.adapter is not None:
+                    self._report_drift(timestamps[-1])
+        finally:
+            self.sensor.unsubscribe(samples)
+
+    def start(self):
+        """Run on a background thread."""
+        self._thread = threading.Thread(target=self.run, name="controller-daemon", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.publisher.publish(KIND_STOP)
+
+
+def parse_gestures(pairs):
+    gestures = {}
+    for pair in pairs:
+        label, _, action = pair.partition("=")
+        gestures[label] = action
+    return gestures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish EMG gesture decisions over a local socket.")
+    parser.add_argument("--port", default=DEFAULT_PORT, help=f"serial port of the sensor (default: {DEFAULT_PORT})")
+    parser.add_argument("--baudrate", type=int, default=DEFAULT_BAUDRATE)
+    parser.add_argument("--bundle", default=BUNDLE_FILE, help=f"model bundle (default: {BUNDLE_FILE})")
+    parser.add_argument("--address", default=None, help="unix:<path> or tcp:<host>:<port>")
+    parser.add_argument("--hop", type=int, default=HOP, help=f"classify every HOP samples (default: {HOP})")
+    parser.add_argument("--record", metavar="DIR", help="write a session log to a new folder in DIR")
+    parser.add_argument("--map", nargs="*", default=["clench=jump", "wrist=duck"], metavar="LABEL=ACTION",
+                        help="gesture to game action mapping (default: clench=jump wrist=duck)")
+    parser.add_argument("--adapt", action="store_true", help="adapt to signal drift during the session")
+    parser.add_argument("--catch-up", choices=CATCH_UP_MODES + ("off",), default="batch",
+                        help="how a backlog of stale samples is handled (default: batch)")
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.bundle)
+    recorder = None
+    if args.record:
+        session = new_session_dir(args.record)
+        recorder = SessionRecorder(os.path.join(session, CONTROLLER_LOG), {"bundle": os.path.abspath(args.bundle)})
+        print(f"Recording session to {session}")
+    sensor = SensorStream(args.port, args.baudrate)
+    sensor.start()
+    daemon = ControllerDaemon(sensor, bundle, parse_gestures(args.map), address=args.address, hop=args.hop,
+                              recorder=recorder, adapt=args.adapt,
+                              catch_up=None if args.catch_up == "off" else args.catch_up)
+    print(f"Publishing {bundle.classes} on {daemon.address}. Press Ctrl+C to stop.")
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        print("Stopping controller daemon...")
+    finally:
+        daemon.publisher.publish(KIND_STOP)
+        daemon.publisher.close()
+        sensor.stop()
+        if recorder is not None:
+            recorder.close()
+
+
+if __name__ == "__main__":
+    main()
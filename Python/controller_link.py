@@ -0,0 +1,288 @@
+"""
+controller_link.py
+
+Local socket link that carries controller events (game actions, gesture
+press/release, class probabilities) from the process that owns the sensor
+and the model to the processes that consume them, such as the game.
+
+Uses a Unix domain socket where available and falls back to loopback TCP
+(Windows). Every message is a small fixed header followed by a payload:
+
+    timestamp (float64), kind (uint8), code (uint8), payload length (uint16)
+
+The publisher accepts any number of subscribers on a background thread;
+publish() writes one message to all of them. Its client sockets are
+non-blocking: what a subscriber has not taken yet waits in that client's
+backlog, and a subscriber whose backlog grows past MAX_BACKLOG_BYTES
+(it stopped reading) is disconnected, so no peer can stall the publisher.
+Subscribers read with a non-blocking poll(), so a game loop can drain
+events once per frame.
+"""
+
+import os
+import json
+import math
+import time
+import socket
+import struct
+import tempfile
+import threading
+
+import numpy as np
+
+HEADER = struct.Struct('<dBBH')
+
+# Message kinds
+KIND_HELLO = 0  # payload: JSON with the class and action lists
+KIND_START = 1  # launcher: switch from calibration to play
+KIND_ACTION = 2  # one-shot action, code = index into the action list, optional float32 intensity [+ float64 onset]
+KIND_PRESS = 3  # held gesture started, code = action index, optional float32 intensity [+ float64 onset]
+KIND_RELEASE = 4  # held gesture ended, code = action index
+KIND_PROBS = 5  # payload: float32 class probabilities, code = predicted class
+KIND_STOP = 6
+KIND_GESTURE = 7  # gesture became active, code = class index (names in the hello message)
+
+# Actions the games understand; their index is the message code
+ACTIONS = ["jump", "duck"]
+ACTION_CODES = {name: code for code, name in enumerate(ACTIONS)}
+INTENSITY = struct.Struct('<f')
+INTENSITY_ONSET = struct.Struct('<fd')  # Intensity (nan if none) and the gesture's onset time
+
+MAX_BACKLOG_BYTES = 256 * 1024  # Unsent bytes a subscriber may fall behind before it is dropped
+
+
+def default_address(name="ugc-controller"):
+    """A per-process address string, 'unix:<path>' or 'tcp:127.0.0.1:0'."""
+    if hasattr(socket, "AF_UNIX"):
+        return f"unix:{os.path.join(tempfile.gettempdir(), f'{name}-{os.getpid()}.sock')}"
+    return "tcp:127.0.0.1:0"
+
+
+def _parse(address):
+    scheme, _, rest = address.partition(":")
+    if scheme == "unix":
+        return socket.AF_UNIX, rest
+    if scheme == "tcp":
+        host, _, port = rest.rpartition(":")
+        return socket.AF_INET, (host, int(port))
+    raise ValueError(f"Unknown link address: {address}")
+
+
+def encode(kind, code=0, payload=b"", timestamp=None):
+    if timestamp is None:
+        timestamp = time.time()
+    return HEADER.pack(timestamp, kind, code, len(payload)) + payload
+
+
+class Event:
+    __slots__ = ("timestamp", "kind", "code", "payload")
+
+    def __init__(self, timestamp, kind, code, payload):
+        self.timestamp = timestamp
+        self.kind = kind
+        self.code = code
+        self.payload = payload
+
+    @property
+    def action(self):
+        return ACTIONS[self.code] if self.kind in (KIND_ACTION, KIND_PRESS, KIND_RELEASE) else None
+
+    @property
+    def intensity(self):
+        """Gesture intensity (0..1) of an action / press, or None if the publisher sent none."""
+        if self.kind in (KIND_ACTION, KIND_PRESS) and len(self.payload) in (INTENSITY.size, INTENSITY_ONSET.size):
+            intensity = INTENSITY.unpack_from(self.payload)[0]
+            return None if math.isnan(intensity) else intensity
+        return None
+
+    @property
+    def onset(self):
+        """Time (time.time() clock) the gesture behind an action / press started, or None if not sent."""
+        if self.kind in (KIND_ACTION, KIND_PRESS) and len(self.payload) == INTENSITY_ONSET.size:
+            return INTENSITY_ONSET.unpack(self.payload)[1]
+        return None
+
+    @property
+    def probabilities(self):
+        return np.frombuffer(self.payload, dtype=np.float32) if self.kind == KIND_PROBS else None
+
+    def json(self):
+        return json.loads(self.payload.decode()) if self.payload else None
+
+
+class _Client:
+    """A subscriber's non-blocking socket and the bytes it has not taken yet."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.backlog = bytearray()
+
+    def flush(self):
+        """Send as much of the backlog as the socket takes now; raises OSError if the peer is gone."""
+        while self.backlog:
+            try:
+                sent = self.sock.send(self.backlog)
+            except (BlockingIOError, InterruptedError):
+                return
+            del self.backlog[:sent]
+
+
+class DecisionPublisher:
+    def __init__(self, address=None, hello=None, max_backlog=MAX_BACKLOG_BYTES):
+        """
+        address: 'unix:<path>' or 'tcp:<host>:<port>' (port 0 picks a free one).
+        hello: dict sent to every subscriber when it connects (e.g. class list).
+        max_backlog: unsent bytes after which a subscriber that stopped reading is dropped.
+        """
+        family, target = _parse(address or default_address())
+        if family == getattr(socket, "AF_UNIX", None) and os.path.exists(target):
+            os.unlink(target)
+        self._server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(target)
+        self._server.listen()
+        if family == socket.AF_INET:
+            host, port = self._server.getsockname()
+            self.address = f"tcp:{host}:{port}"
+        else:
+            self.address = f"unix:{target}"
+        self.set_hello(hello)
+        self.max_backlog = max_backlog
+        self.dropped_subscribers = 0
+        self._clients = []
+        self._lock = threading.Lock()
+        self._running = True
+        self._accept_thread = threading.Thread(target=self._accept_loop, name="link-accept", daemon=True)
+        self._accept_thread.start()
+
+    def set_hello(self, hello):
+        """Change the hello message sent to subscribers that connect from now on."""
+        self._hello = encode(KIND_HELLO, payload=json.dumps(hello).encode()) if hello else None
+
+    @property
+    def subscriber_count(self):
+        return len(self._clients)
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                break
+            if client.family == socket.AF_INET:
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = _Client(client)
+            if self._hello:
+                client.backlog += self._hello
+            with self._lock:
+                if self._deliver(client):
+                    self._clients.append(client)
+
+    def _deliver(self, client):
+        """Flush a client's backlog; False (and the client closed) if it is gone or too far behind."""
+        try:
+            client.flush()
+            if len(client.backlog) <= self.max_backlog:
+                return True
+            self.dropped_subscribers += 1
+        except OSError:
+            pass
+        client.sock.close()
+        return False
+
+    def send(self, message):
+        """Queue an encoded message for every subscriber and send what each takes without blocking."""
+        with self._lock:
+            for client in self._clients:
+                client.backlog += message
+            self._clients = [client for client in self._clients if self._deliver(client)]
+
+    def publish(self, kind, code=0, payload=b"", timestamp=None):
+        self.send(encode(kind, code, payload, timestamp))
+
+    def publish_action(self, action, timestamp=None, kind=KIND_ACTION, intensity=None, onset=None):
+        if onset is not None:
+            payload = INTENSITY_ONSET.pack(math.nan if intensity is None else intensity, onset)
+        else:
+            payload = INTENSITY.pack(intensity) if intensity is not None else b""
+        self.publish(kind, ACTION_CODES[action], payload, timestamp)
+
+    def publish_probabilities(self, probabilities, timestamp=None):
+        probabilities = np.asarray(probabilities, dtype=np.float32).reshape(-1)
+        self.publish(KIND_PROBS, int(probabilities.argmax()), probabilities.tobytes(), timestamp)
+
+    def close(self):
+        self._running = False
+        self._server.close()
+        with self._lock:
+            for client in self._clients:
+                # Last messages (usually KIND_STOP) to whoever can take them now
+                self._deliver(client)
+                client.sock.close()
+            self._clients = []
+        if self._server.family == getattr(socket, "AF_UNIX", None):
+            try:
+                os.unlink(self.address.partition(":")[2])
+            except OSError:
+                pass
+
+
+class DecisionSubscriber:
+    def __init__(self, address, timeout=5.0):
+        family, target = _parse(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(target)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._buffer = bytearray()
+        self.hello = None
+        self.closed = False
+
+    def _parse_buffer(self):
+        events = []
+        offset = 0
+        while len(self._buffer) - offset >= HEADER.size:
+            timestamp, kind, code, length = HEADER.unpack_from(self._buffer, offset)
+            end = offset + HEADER.size + length
+            if len(self._buffer) < end:
+                break
+            event = Event(timestamp, kind, code, bytes(self._buffer[offset + HEADER.size:end]))
+            if kind == KIND_HELLO:
+                self.hello = event.json()
+            else:
+                events.append(event)
+            offset = end
+        del self._buffer[:offset]
+        return events
+
+    def poll(self):
+        """Return every complete event received so far without blocking."""
+        self.sock.setblocking(False)
+        try:
+            while True:
+                chunk = self.sock.recv(65536)
+                if not chunk:
+                    self.closed = True
+                    break
+                self._buffer += chunk
+        except (BlockingIOError, InterruptedError):
+            pass
+        return self._parse_buffer()
+
+    def wait(self, timeout=None):
+        """Block until at least one event arrives (or timeout), then return all pending ones."""
+        self.sock.settimeout(timeout)
+        try:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                self.closed = True
+            self._buffer += chunk
+        except socket.timeout:
+            pass
+        return self._parse_buffer() + self.poll()
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,362 @@
+"""
+data_collection.py
+
+Records labelled raw EMG from the sensor into data/data_<label>_<timestamp>.csv
+(the layout data_preprocessing.py parses), with a data_<label>_<timestamp>.json
+sidecar holding the label, user, session, port settings and the counters
+of the recording.
+
+A reader thread takes everything the port has buffered in one read and
+decodes it in bulk; a writer thread appends the decoded samples to the CSV
+in column blocks every FLUSH_SECONDS. Neither waits for the other (the
+queue between them is unbounded), so disk stalls never cost samples.
+
+Two wire formats:
+
+- "text": one integer per line, as sent by emg_sensor.ino (one channel,
+  100 Hz). Samples of one read get timestamps spaced at --rate ending at
+  the time of the read; unparsable lines are counted.
+- "binary": fixed frames from emg_sensor/emg_recorder/emg_recorder.ino,
+  for multi-kHz, multi-channel capture:
+
+      0xA5 0x5A | uint16 sequence | uint32 device micros | channels x uint16 | uint8 checksum
+
+  (little-endian; the checksum is the byte sum, mod 256, of everything
+  between the sync bytes and itself). Timestamps come from the device
+  clock, anchored to the host clock at the first frame. Gaps in the
+  sequence numbers count as dropped samples; bytes skipped to find the
+  next valid frame count as corrupt.
+
+CSV columns: timestamp, value (channel 0, what preprocessing reads),
+value_1 ... for more channels, and device_time (seconds on the device
+clock) for binary recordings.
+
+--port loop:// --simulate RATE records from a simulated binary device on
+a virtual port, to check a machine keeps up at a given rate and channel
+count without dropping samples.
+
+Usage:
+    python data_collection.py clench --seconds 10 --user alice --session 3
+    python data_collection.py clench --format binary --channels 4 --baudrate 2000000 --port COM5
+    python data_collection.py rest --port loop:// --simulate 4000 --channels 4 --seconds 10
+"""
+
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+
+import numpy as np
+import serial
+
+from motion_capture import recording_path
+from sensor_stream import DEFAULT_BAUDRATE, DEFAULT_PORT, SAMPLE_RATE, LineParser
+
+FORMATS = ["text", "binary"]
+SYNC = b"\xa5\x5a"
+SYNC_WORD = 0x5AA5  # SYNC read as a little-endian uint16
+READ_TIMEOUT = 0.05  # Longest a read waits for the first byte
+FLUSH_SECONDS = 0.5  # Interval of the batched writes
+STATUS_SECONDS = 1.0
+RX_BUFFER_BYTES = 1 << 20  # Driver receive buffer requested where pyserial supports it (Windows)
+
+
+def frame_dtype(channels):
+    return np.dtype([("sync", "<u2"), ("sequence", "<u2"), ("micros", "<u4"), ("values", "<u2", (channels,)),
+                     ("checksum", "u1")])
+
+
+def frame_checksums(frames):
+    """Byte sum mod 256 of every frame's fields between the sync bytes and the checksum."""
+    data = frames.view(np.uint8).reshape(len(frames), frames.dtype.itemsize)
+    return (data[:, 2:-1].sum(axis=1, dtype=np.uint32) & 0xFF).astype(np.uint8)
+
+
+class TextDecoder:
+    channels = 1
+    device_clock = False
+
+    def __init__(self, rate=SAMPLE_RATE):
+        self.rate = rate
+        self.parser = LineParser()
+        self.dropped = 0
+        self._last_timestamp = 0.0
+
+    @property
+    def errors(self):
+        return self.parser.errors
+
+    def feed(self, data, arrival):
+        """(timestamps, device_times or None, values of shape (n, 1)) of the complete lines in data."""
+        values = self.parser.feed(data)
+        if not values:
+            return None
+        start = max(arrival - (len(values) - 1) / self.rate, self._last_timestamp)
+        self._last_timestamp = arrival
+        return np.linspace(start, arrival, len(values)), None, np.array(values, dtype=np.int64)[:, None]
+
+
+class BinaryDecoder:
+    device_clock = True
+
+    def __init__(self, channels):
+        self.channels = channels
+        self.dtype = frame_dtype(channels)
+        self.dropped = 0
+        self.errors = 0  # Corrupt bytes skipped
+        self._pending = b""
+        self._last_sequence = None
+        self._last_micros = None
+        self._wraps = 0
+        self._anchor = None
+
+    def _frames(self, data):
+        """Valid whole frames in the pending bytes plus data; resynchronizes on the sync bytes."""
+        buffer = self._pending + data
+        size = self.dtype.itemsize
+        chunks = []
+        pos = search = 0
+        while True:
+            start = buffer.find(SYNC, search)
+            if start < 0:
+                # A trailing first sync byte may start the next frame
+                keep = len(buffer) - 1 if buffer.endswith(SYNC[:1]) else len(buffer)
+                self.errors += max(keep - pos, 0)
+                pos = max(keep, pos)
+                break
+            self.errors += start - pos
+            count = (len(buffer) - start) // size
+            if count == 0:
+                pos = start
+                break
+            frames = np.frombuffer(buffer, self.dtype, count, offset=start)
+            bad = np.flatnonzero((frames["sync"] != SYNC_WORD) | (frames["checksum"] != frame_checksums(frames)))
+            good = int(bad[0]) if len(bad) else count
+            chunks.append(frames[:good])
+            pos = start + good * size
+            if good == count:
+                break
+            # A broken frame: look for the next sync after its first byte
+            search = pos + 1
+        self._pending = buffer[pos:]
+        return np.concatenate(chunks) if chunks else None
+
+    def feed(self, data, arrival):
+        """(timestamps, device_times, values of shape (n, channels)) of the complete frames in data."""
+        frames = self._frames(data)
+        if frames is None or len(frames) == 0:
+            return None
+        sequence = frames["sequence"].astype(np.int64)
+        micros = frames["micros"].astype(np.int64)
+        if self._last_sequence is None:
+            self._last_sequence = sequence[0] - 1
+            self._last_micros = micros[0]
+        # Sequence numbers step by one (mod 2^16); anything more was lost
+        steps = np.diff(sequence, prepend=self._last_sequence) % 65536
+        self.dropped += int(np.sum(steps - 1))
+        # micros() wraps every ~71 minutes
+        wraps = self._wraps + np.cumsum(np.diff(micros, prepend=self._last_micros) < 0)
+        device_times = (micros + wraps * 2 ** 32) / 1e6
+        self._last_sequence, self._last_micros, self._wraps = sequence[-1], micros[-1], int(wraps[-1])
+        if self._anchor is None:
+            self._anchor = arrival - device_times[0]
+        return self._anchor + device_times, device_times, frames["values"].astype(np.int64)
+
+
+def make_decoder(wire_format, channels=1, rate=SAMPLE_RATE):
+    if wire_format == "text":
+        if channels != 1:
+            raise ValueError("The text format carries one channel")
+        return TextDecoder(rate)
+    if wire_format == "binary":
+        return BinaryDecoder(channels)
+    raise ValueError(f"Unknown wire format: {wire_format}")
+
+
+class Recorder:
+    def __init__(self, ser, path, decoder, meta=None, flush_seconds=FLUSH_SECONDS):
+        """
+        ser: an open pyserial port (read timeout READ_TIMEOUT).
+        path: the CSV to write; the metadata goes next to it as .json.
+        """
+        self.ser = ser
+        self.path = path
+        self.decoder = decoder
+        self.meta = dict(meta or {})
+        self.flush_seconds = flush_seconds
+        self.samples = 0
+        self.bytes_read = 0
+        self.max_queued = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self._queue = queue.Queue()
+        self._running = False
+        self._threads = []
+        columns = ["timestamp"] + (["device_time"] if decoder.device_clock else [])
+        columns += ["value"] + [f"value_{i}" for i in range(1, decoder.channels)]
+        self.columns = columns
+        self._format = ",".join(["%.6f"] * (1 + decoder.device_clock) + ["%d"] * decoder.channels)
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "w", newline="")
+        self._file.write(",".join(self.columns) + "\n")
+        if hasattr(self.ser, "set_buffer_size"):
+            self.ser.set_buffer_size(rx_size=RX_BUFFER_BYTES)
+        self.ser.reset_input_buffer()
+        self.started = time.time()
+        self._running = True
+        self._threads = [threading.Thread(target=self._read_loop, name="recorder-reader", daemon=True),
+                         threading.Thread(target=self._write_loop, name="recorder-writer", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop reading, write everything decoded so far and the metadata; returns status()."""
+        self._running = False
+        for thread in self._threads:
+            thread.join()
+        self._file.close()
+        status = self.status()
+        with open(os.path.splitext(self.path)[0] + ".json", "w") as f:
+            json.dump(dict(self.meta, **status), f, indent=2)
+        return status
+
+    def _read_loop(self):
+        while self._running:
+            data = self.ser.read(max(self.ser.in_waiting, 1))
+            if not data:
+                continue
+            self.bytes_read += len(data)
+            decoded = self.decoder.feed(data, time.time())
+            if decoded is not None:
+                self._queue.put(decoded)
+
+    def _write_loop(self):
+        while True:
+            running = self._running
+            time.sleep(self.flush_seconds if running else 0)
+            blocks = []
+            while True:
+                try:
+                    blocks.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.max_queued = max(self.max_queued, len(blocks))
+            if blocks:
+                self._write(blocks)
+            if not running:
+                break
+
+    def _write(self, blocks):
+        timestamps = np.concatenate([b[0] for b in blocks])
+        columns = [timestamps]
+        if self.decoder.device_clock:
+            columns.append(np.concatenate([b[1] for b in blocks]))
+        values = np.concatenate([b[2] for b in blocks])
+        columns += list(values.T)
+        np.savetxt(self._file, np.column_stack(columns), fmt=self._format)
+        if self.first_timestamp is None:
+            self.first_timestamp = float(timestamps[0])
+        self.last_timestamp = float(timestamps[-1])
+        self.samples += len(timestamps)
+
+    def status(self):
+        duration = (self.last_timestamp - self.first_timestamp) if self.samples > 1 else 0.0
+        return {
+            "samples": self.samples,
+            "duration_s": duration,
+            "rate_hz": (self.samples - 1) / duration if duration > 0 else 0.0,
+            "dropped": self.decoder.dropped,
+            "errors": self.decoder.errors,
+            "bytes_read": self.bytes_read,
+            "max_queued_blocks": self.max_queued,
+        }
+
+
+def simulate_device(ser, rate, channels, seconds, stop):
+    """Write binary frames of a synthetic signal to ser in real time (for --simulate)."""
+    dtype = frame_dtype(channels)
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    sent = 0
+    total = int(rate * seconds)
+    while sent < total and not stop.is_set():
+        due = min(int((time.perf_counter() - start) * rate), total)
+        if due > sent:
+            frames = np.zeros(due - sent, dtype)
+            index = np.arange(sent, due)
+            frames["sync"] = SYNC_WORD
+            frames["sequence"] = index % 65536
+            frames["micros"] = (index * 1e6 / rate).astype(np.int64) % 2 ** 32
+            frames["values"] = np.clip(300 + rng.normal(0, 20, (due - sent, channels)), 0, 1023)
+            frames["checksum"] = frame_checksums(frames)
+            ser.write(frames.tobytes())
+            sent = due
+        time.sleep(0.001)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("label", help="movement label (no underscores)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="recording length")
+    parser.add_argument("--port", default=DEFAULT_PORT, help=f"serial port or pyserial URL (default: {DEFAULT_PORT})")
+    parser.add_argument("--baudrate", type=int, default=DEFAULT_BAUDRATE)
+    parser.add_argument("--format", choices=FORMATS, default="text", help="wire format (default: text)")
+    parser.add_argument("--channels", type=int, default=1, help="channels per binary frame")
+    parser.add_argument("--rate", type=float, default=SAMPLE_RATE, help="sample rate of the text format in Hz")
+    parser.add_argument("--user", default=None, help="who is recorded")
+    parser.add_argument("--session", default=None, help="session name or number")
+    parser.add_argument("--folder", default="data", help="output folder (default: data)")
+    parser.add_argument("--simulate", type=float, metavar="RATE",
+                        help="record a simulated binary device at RATE Hz (use with --port loop://)")
+    args = parser.parse_args()
+
+    if "_" in args.label:
+        parser.error("the label may not contain underscores (data_<label>_<timestamp>.csv)")
+    if args.simulate:
+        args.format = "binary"
+    try:
+        decoder = make_decoder(args.format, args.channels, args.rate)
+    except ValueError as error:
+        parser.error(str(error))
+
+    ser = serial.serial_for_url(args.port, args.baudrate, timeout=READ_TIMEOUT)
+    path = recording_path(args.label, args.folder)
+    meta = {"label": args.label, "user": args.user, "session": args.session, "port": args.port,
+            "baudrate": args.baudrate, "format": args.format, "channels": decoder.channels,
+            "columns": None, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    recorder = Recorder(ser, path, decoder, meta)
+    recorder.meta["columns"] = recorder.columns
+    recorder.start()
+
+    stop = threading.Event()
+    simulator = None
+    if args.simulate:
+        simulator = threading.Thread(target=simulate_device,
+                                     args=(ser, args.simulate, args.channels, args.seconds, stop), daemon=True)
+        simulator.start()
+
+    print(f"Recording '{args.label}' from {args.port} for {args.seconds:.0f} s to {path}. Press Ctrl+C to stop early.")
+    end = time.time() + args.seconds
+    try:
+        while time.time() < end:
+            time.sleep(min(STATUS_SECONDS, max(end - time.time(), 0)))
+            print(f"  {recorder.samples} samples written, {decoder.dropped} dropped, {decoder.errors} errors")
+        if simulator is not None:
+            simulator.join()
+            time.sleep(2 * READ_TIMEOUT)  # Let the reader take the last frames
+    except KeyboardInterrupt:
+        print("Stopping early...")
+    finally:
+        stop.set()
+        status = recorder.stop()
+        ser.close()
+    print(f"Saved {status['samples']} samples ({status['duration_s']:.1f} s at {status['rate_hz']:.0f} Hz, "
+          f"{decoder.channels} channel(s)) to {path}; dropped {status['dropped']}, errors {status['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,72 +1,89 @@
 """
 data_preprocessing.py
 
-This script scans the 'data' folder for CSV files of raw sensor data,
-extracts enhanced features, 
-and outputs a combined features.csv file.
+This script selects raw sensor recordings from the 'data' folder through
+the dataset catalog (dataset_catalog.py: --user, --label, --session,
+--last-sessions; duplicated recordings are skipped), extracts enhanced
+features, and outputs a combined features.csv file.
+
+With --progressive WINDOW_SIZE it also writes one features_prefix_<n>.csv
+per prefix length (25/50/75/100% of WINDOW_SIZE samples) for training the
+early-exit models used by the progressive classification mode.
+
+Every row carries the name of the recording it came from ("recording"
+column), so model_training.py can keep windows of one recording on the
+same side of a train/test split.
 
 Assumes each file is named in the format: data_<label>_<timestamp>.csv
 """
 
 import os
-import glob
+import argparse
 import pandas as pd
-import numpy as np
-
-# Folder where raw data CSVs are stored (create this folder and move your CSV files here)
-data_folder = "data"
-files = glob.glob(os.path.join(data_folder, "*.csv"))
-
-rows = []
-for file in files:
-    # Extract label from filename: expected pattern: data_<label>_<timestamp>.csv
-    basename = os.path.basename(file)
-    parts = basename.split('_')
-    if len(parts) < 3:
-        continue
-    label = parts[1]
-    df = pd.read_csv(file)
-    if 'value' not in df.columns:
-        continue
-    
-    values = df['value'].values
-    # If your CSV contains a "timestamp" column with the actual times, use it;
-    # otherwise, assume uniform sampling (you may adjust dx accordingly)
-    if 'timestamp' in df.columns:
-        timestamps = df['timestamp'].values
-        auc = np.trapezoid(values, timestamps)
-    else:
-        # If no timestamp available, use the sample index (adjust dx if needed)
-        auc = np.trapezoid(values)
-    
-    # Basic features
-    mean_val = np.mean(values)
-    std_val = np.std(values)
-    rms_val = np.sqrt(np.mean(np.square(values)))
-    max_val = np.max(values)
-    min_val = np.min(values)
-    
-    # Compute first derivative of the signal and its statistics
-    derivative = np.diff(values)
-    if len(derivative) > 0:
-        mean_deriv = np.mean(derivative)
-        std_deriv = np.std(derivative)
-    else:
-        mean_deriv = 0
-        std_deriv = 0
-    
-    rows.append({
-        "label": label, 
-        "auc": auc,
-        "mean": mean_val, 
-        "std": std_val, 
-        "rms": rms_val,
-        "max": max_val,
-        "min": min_val,
-        "mean_deriv": mean_deriv,
-        "std_deriv": std_deriv
-    })
-
-features_df = pd.DataFrame(rows)
-features_df.to_csv("features.csv", index=False)
-print("Features saved to features.csv")
+
+from dataset_catalog import add_selection_arguments, selected_recordings
+from emg_features import FEATURE_COLUMNS, extract_features
+
+# Fractions of the live window evaluated by the progressive classifier
+PREFIX_FRACTIONS = [0.25, 0.5, 0.75, 1.0]
+
+
+def prefix_lengths(window_size):
+    """Number of samples in each prefix of a window of window_size samples."""
+    return [int(round(fraction * window_size)) for fraction in PREFIX_FRACTIONS]
+
+
+def feature_row(label, values, timestamps, recording=None):
+    features = extract_features(values, timestamps)[0]
+    row = {"label": label, "recording": recording}
+    row.update(zip(FEATURE_COLUMNS, features))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--progressive", type=int, metavar="WINDOW_SIZE",
+                        help="also write per-prefix feature files for a live window of WINDOW_SIZE samples")
+    # Folder where raw data CSVs are stored (create this folder and move your CSV files here) and the subset to use
+    add_selection_arguments(parser)
+    args = parser.parse_args()
+
+    recordings = selected_recordings(args)
+    print(f"Extracting features from {len(recordings)} recording(s)")
+
+    lengths = prefix_lengths(args.progressive) if args.progressive else []
+    rows = []
+    prefix_rows = {n: [] for n in lengths}
+    for recording in recordings:
+        # The catalog holds only data_<label>_<timestamp>.csv files with a value column
+        basename = os.path.basename(recording["path"])
+        label = recording["label"]
+        df = pd.read_csv(recording["path"])
+
+        values = df['value'].values
+        # If your CSV contains a "timestamp" column with the actual times, use it;
+        # otherwise, assume uniform sampling (you may adjust dx accordingly)
+        timestamps = df['timestamp'].values if 'timestamp' in df.columns else None
+
+        rows.append(feature_row(label, values, timestamps, basename))
+
+        # Prefix windows slide over the recording with 50% overlap so the
+        # early-exit models see the gesture at different alignments
+        for n in lengths:
+            hop = max(1, n // 2)
+            for start in range(0, len(values) - n + 1, hop):
+                window_ts = timestamps[start:start + n] if timestamps is not None else None
+                prefix_rows[n].append(feature_row(label, values[start:start + n], window_ts, basename))
+
+    features_df = pd.DataFrame(rows)
+    features_df.to_csv("features.csv", index=False)
+    print("Features saved to features.csv")
+
+    for n in lengths:
+        out_file = f"features_prefix_{n}.csv"
+        pd.DataFrame(prefix_rows[n]).to_csv(out_file, index=False)
+        print(f"Prefix features ({n} samples) saved to {out_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+dataset_catalog.py
+
+SQLite index of the raw recordings in data/ (data/catalog.sqlite), so
+preprocessing and training can pick subsets with one indexed query instead
+of globbing the folder and inferring everything from file names.
+
+Every data_<label>_<timestamp>.csv gets one row: label, user, session and
+recording time (from the .json sidecar data_collection.py writes, else the
+file name), sample count, channels, duration, rate, mean / std / min / max
+of the "value" column and a SHA-256 of the file's content. update() only
+re-reads files whose size or modification time changed and forgets files
+that are gone, so keeping the catalog current costs one stat() per file.
+
+A recording whose content hash matches an earlier one is marked as its
+duplicate and left out of selections unless asked for.
+
+Recordings made before sidecars existed have no user or session; "assign"
+writes sidecars for them.
+
+Usage:
+    python dataset_catalog.py scan
+    python dataset_catalog.py list --user alice --last-sessions 3
+    python dataset_catalog.py assign data/data_clench_2024*.csv --user alice --session 1
+    python dataset_catalog.py duplicates
+"""
+
+import os
+import glob
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+
+DATA_FOLDER = "data"
+CATALOG_NAME = "catalog.sqlite"
+TIMESTAMP_FORMAT = "%Y%m%d-%H%M%S"  # Of recording_path() file names
+HASH_CHUNK_BYTES = 1 << 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    path TEXT PRIMARY KEY,
+    label TEXT NOT NULL,
+    user TEXT,
+    session TEXT,
+    recorded_at TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    channels INTEGER NOT NULL,
+    duration_s REAL,
+    rate_hz REAL,
+    mean REAL,
+    std REAL,
+    min REAL,
+    max REAL,
+    content_hash TEXT NOT NULL,
+    duplicate_of TEXT,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS recordings_user ON recordings (user, session, recorded_at);
+CREATE INDEX IF NOT EXISTS recordings_label ON recordings (label, recorded_at);
+CREATE INDEX IF NOT EXISTS recordings_hash ON recordings (content_hash);
+"""
+
+
+def recording_label(path):
+    """(label, timestamp) of a data_<label>_<timestamp>.csv path, None for other names."""
+    parts = os.path.splitext(os.path.basename(path))[0].split('_')
+    if len(parts) < 3 or parts[0] != "data":
+        return None
+    return parts[1], "_".join(parts[2:])
+
+
+def sidecar_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def read_sidecar(path):
+    """The metadata data_collection.py stored next to a recording, {} if there is none."""
+    try:
+        with open(sidecar_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def recorded_at(timestamp, meta, mtime):
+    """ISO time a recording was made: sidecar, else file name, else modification time."""
+    if meta.get("recorded_at"):
+        return str(meta["recorded_at"])
+    try:
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.strptime(timestamp, TIMESTAMP_FORMAT))
+    except ValueError:
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(mtime))
+
+
+def summarize(path):
+    """Sample count, channels, duration, rate and value statistics of a recording CSV."""
+    df = pd.read_csv(path)
+    if "value" not in df.columns:
+        return None
+    values = df["value"].values.astype(np.float64)
+    channels = 1 + sum(column.startswith("value_") for column in df.columns)
+    summary = {"samples": len(values), "channels": channels, "duration_s": None, "rate_hz": None,
+               "mean": None, "std": None, "min": None, "max": None}
+    if len(values):
+        summary.update(mean=float(values.mean()), std=float(values.std()), min=float(values.min()),
+                       max=float(values.max()))
+    if "timestamp" in df.columns and len(values) > 1:
+        duration = float(df["timestamp"].values[-1] - df["timestamp"].values[0])
+        summary["duration_s"] = duration
+        summary["rate_hz"] = (len(values) - 1) / duration if duration > 0 else None
+    return summary
+
+
+class DatasetCatalog:
+    def __init__(self, folder=DATA_FOLDER, path=None):
+        """The catalog of the recordings in folder, stored in folder/catalog.sqlite by default."""
+        self.folder = folder
+        self.path = path or os.path.join(folder, CATALOG_NAME)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self):
+        """Index new and changed recordings, drop vanished ones; returns (added or changed, removed)."""
+        known = {row["path"]: (row["size"], row["mtime_ns"])
+                 for row in self.db.execute("SELECT path, size, mtime_ns FROM recordings")}
+        seen = set()
+        changed = 0
+        for file in sorted(glob.glob(os.path.join(self.folder, "*.csv"))):
+            name = recording_label(file)
+            if name is None:
+                continue
+            path = os.path.normpath(file)
+            seen.add(path)
+            stat = os.stat(path)
+            # A sidecar written after the recording counts as a change too
+            meta_stat = os.stat(sidecar_path(path)) if os.path.exists(sidecar_path(path)) else None
+            mtime_ns = max(stat.st_mtime_ns, meta_stat.st_mtime_ns if meta_stat else 0)
+            if known.get(path) == (stat.st_size, mtime_ns):
+                continue
+            summary = summarize(path)
+            if summary is None:
+                continue
+            meta = read_sidecar(path)
+            label, timestamp = name
+            user, session = meta.get("user"), meta.get("session")
+            self.db.execute(
+                "INSERT OR REPLACE INTO recordings VALUES (:path, :label, :user, :session, :recorded_at, :samples, "
+                ":channels, :duration_s, :rate_hz, :mean, :std, :min, :max, :content_hash, NULL, :size, :mtime_ns)",
+                dict(summary, path=path, label=label,
+                     user=None if user is None else str(user), session=None if session is None else str(session),
+                     recorded_at=recorded_at(timestamp, meta, stat.st_mtime), content_hash=content_hash(path),
+                     size=stat.st_size, mtime_ns=mtime_ns))
+            changed += 1
+        removed = [(path,) for path in known if path not in seen]
+        self.db.executemany("DELETE FROM recordings WHERE path = ?", removed)
+        if changed or removed:
+            self._mark_duplicates()
+        self.db.commit()
+        return changed, len(removed)
+
+    def _mark_duplicates(self):
+        """Point every recording at the earliest recording with the same content, if it is not that one."""
+        self.db.execute("""
+            UPDATE recordings SET duplicate_of = (
+                SELECT first.path FROM recordings AS first
+                WHERE first.content_hash = recordings.content_hash
+                ORDER BY first.recorded_at, first.path LIMIT 1)
+        """)
+        self.db.execute("UPDATE recordings SET duplicate_of = NULL WHERE duplicate_of = path")
+
+    def select(self, labels=None, users=None, sessions=None, last_sessions=None, min_samples=None,
+               include_duplicates=False):
+        """
+        Catalog rows (sqlite3.Row, oldest first) of the recordings matching
+        every given filter. last_sessions=N keeps each user's N most recent
+        sessions (by their latest recording); recordings without a session
+        count as one session.
+        """
+        where, params = [], []
+        for column, wanted in (("label", labels), ("user", users), ("session", sessions)):
+            if wanted:
+                wanted = [str(w) for w in wanted]
+                where.append(f"{column} IN ({', '.join('?' * len(wanted))})")
+                params += wanted
+        if min_samples:
+            where.append("samples >= ?")
+            params.append(int(min_samples))
+        if not include_duplicates:
+            where.append("duplicate_of IS NULL")
+        query = f"SELECT * FROM recordings{' WHERE ' + ' AND '.join(where) if where else ''}"
+        if last_sessions:
+            query = f"""
+                WITH selected AS ({query}),
+                ranked AS (
+                    SELECT user, session, DENSE_RANK() OVER (
+                        PARTITION BY user ORDER BY MAX(recorded_at) DESC, session DESC) AS age
+                    FROM selected GROUP BY user, session)
+                SELECT selected.* FROM selected JOIN ranked
+                    ON selected.user IS ranked.user AND selected.session IS ranked.session
+                WHERE ranked.age <= ?"""
+            params.append(int(last_sessions))
+        return self.db.execute(f"{query} ORDER BY recorded_at, path", params).fetchall()
+
+    def duplicates(self):
+        """(duplicate path, original path) of every duplicated recording."""
+        return [(row["path"], row["duplicate_of"]) for row in self.db.execute(
+            "SELECT path, duplicate_of FROM recordings WHERE duplicate_of IS NOT NULL ORDER BY path")]
+
+
+def assign(paths, user=None, session=None):
+    """Store user and session in the sidecars of existing recordings."""
+    for path in paths:
+        meta = read_sidecar(path)
+        if user is not None:
+            meta["user"] = user
+        if session is not None:
+            meta["session"] = session
+        with open(sidecar_path(path), "w") as f:
+            json.dump(meta, f, indent=2)
+
+
+def add_selection_arguments(parser):
+    """The recording filters of select() as command-line options."""
+    parser.add_argument("--data", default=DATA_FOLDER, help=f"recordings folder (default: {DATA_FOLDER})")
+    parser.add_argument("--user", nargs="+", help="only these users' recordings")
+    parser.add_argument("--label", nargs="+", help="only these labels")
+    parser.add_argument("--session", nargs="+", help="only these sessions")
+    parser.add_argument("--last-sessions", type=int, metavar="N", help="only each user's N most recent sessions")
+    parser.add_argument("--include-duplicates", action="store_true", help="keep recordings with duplicated content")
+
+
+def selected_recordings(args):
+    """Update the catalog of args.data and return the rows of the recordings args select."""
+    with DatasetCatalog(args.data) as catalog:
+        catalog.update()
+        rows = catalog.select(args.label, args.user, args.session, args.last_sessions,
+                              include_duplicates=args.include_duplicates)
+        skipped = len(catalog.duplicates())
+    if skipped and not args.include_duplicates:
+        print(f"Skipping {skipped} duplicated recording(s) (see dataset_catalog.py duplicates)")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("scan", help="index new and changed recordings").add_argument(
+        "--data", default=DATA_FOLDER, help=f"recordings folder (default: {DATA_FOLDER})")
+    add_selection_arguments(commands.add_parser("list", help="print the selected recordings"))
+    assign_parser = commands.add_parser("assign", help="set the user / session of recordings")
+    assign_parser.add_argument("recordings", nargs="+")
+    assign_parser.add_argument("--user")
+    assign_parser.add_argument("--session")
+    commands.add_parser("duplicates", help="print duplicated recordings").add_argument(
+        "--data", default=DATA_FOLDER, help=f"recordings folder (default: {DATA_FOLDER})")
+    args = parser.parse_args()
+
+    if args.command == "assign":
+        assign(args.recordings, args.user, args.session)
+        print(f"Updated the sidecars of {len(args.recordings)} recording(s)")
+        return
+    with DatasetCatalog(args.data) as catalog:
+        start = time.perf_counter()
+        changed, removed = catalog.update()
+        print(f"{catalog.path}: {changed} recording(s) indexed, {removed} removed "
+              f"in {1000 * (time.perf_counter() - start):.0f} ms")
+        if args.command == "list":
+            rows = catalog.select(args.label, args.user, args.session, args.last_sessions,
+                                  include_duplicates=args.include_duplicates)
+            for row in rows:
+                print(f"{row['path']}  {row['label']:<10} user={row['user']} session={row['session']} "
+                      f"{row['recorded_at']}  {row['samples']} samples"
+                      f"{'  duplicate of ' + row['duplicate_of'] if row['duplicate_of'] else ''}")
+            print(f"{len(rows)} recording(s)")
+        elif args.command == "duplicates":
+            for path, original in catalog.duplicates():
+                print(f"{path} duplicates {original}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+decision_layer.py
+
+Decision layer between the classifier and game actions.
+
+The raw model output for each window is smoothed over recent windows
+(exponential moving average of the probability vectors, or a majority vote
+over the recent predictions), then passed through per-gesture hysteresis:
+a gesture fires its action once when its score rises above its "on"
+threshold and cannot fire again until the score has dropped below its
+"off" threshold. This replaces the ad-hoc repeat cooldowns.
+
+All state lives in arrays allocated up front, so update() does no
+allocations per decision.
+"""
+
+import numpy as np
+
+
+class DecisionLayer:
+    def __init__(self, label_classes, actions, mode="ema", alpha=0.5, vote_window=3,
+                 on_threshold=0.7, off_threshold=0.5):
+        """
+        label_classes: class names in model output order.
+        actions: mapping of class name -> action (e.g. {'clench': 'jump'}).
+            Every mapped class must be one of the model's classes.
+        mode: "ema" (smooth probabilities) or "vote" (majority of recent argmax).
+        on_threshold / off_threshold: a number for every gesture or a dict of
+            per-class values; classes missing from a dict use the defaults above.
+            In "vote" mode the score compared against them is the fraction of
+            the last vote_window predictions that agree.
+        """
+        self.label_classes = [str(c) for c in label_classes]
+        unknown = sorted(set(actions) - set(self.label_classes))
+        if unknown:
+            raise ValueError(f"Actions mapped to labels the model does not output: {unknown} "
+                             f"(model classes: {self.label_classes})")
+        if mode not in ("ema", "vote"):
+            raise ValueError(f"Unknown smoothing mode: {mode}")
+
+        n = len(self.label_classes)
+        self.mode = mode
+        self.alpha = alpha
+        self.actions = [actions.get(c) for c in self.label_classes]
+        self.on_threshold = self._per_class(on_threshold, 0.7)
+        self.off_threshold = self._per_class(off_threshold, 0.5)
+        if np.any(self.off_threshold > self.on_threshold):
+            raise ValueError("off_threshold must not exceed on_threshold")
+
+        # Preallocated state
+        self.scores = np.zeros(n)
+        self._scratch = np.zeros(n)
+        self._votes = np.full(vote_window, -1, dtype=np.intp)
+        self._vote_counts = np.zeros(n)
+        self._vote_pos = 0
+        self._primed = False
+        self.active = -1  # index of the gesture currently held above threshold
+
+    def _per_class(self, value, default):
+        if isinstance(value, dict):
+            return np.array([value.get(c, default) for c in self.label_classes], dtype=float)
+        return np.full(len(self.label_classes), float(value))
+
+    def reset(self):
+        self.scores.fill(0)
+        self._votes.fill(-1)
+        self._vote_counts.fill(0)
+        self._vote_pos = 0
+        self._primed = False
+        self.active = -1
+
+    def release(self):
+        """
+        Drop the active gesture so it can fire again (e.g. after an undecided
+        window). Returns the (label, action) that was active, or None.
+        """
+        released, self.active = self.active, -1
+        if released < 0:
+            return None
+        return self.label_classes[released], self.actions[released]
+
+    def update(self, probabilities):
+        """
+        Feed one probability vector (shape (n,) or (1, n)). Returns the
+        (label, action) of a gesture that just became active, otherwise None.
+        """
+        probabilities = probabilities.reshape(-1)
+        if self.mode == "ema":
+            if self._primed:
+                # scores = alpha * p + (1 - alpha) * scores, in place
+                np.multiply(probabilities, self.alpha, out=self._scratch)
+                self.scores *= 1 - self.alpha
+                self.scores += self._scratch
+            else:
+                self.scores[:] = probabilities
+                self._primed = True
+        else:
+            window = len(self._votes)
+            old = self._votes[self._vote_pos]
+            if old >= 0:
+                self._vote_counts[old] -= 1
+            new = probabilities.argmax()
+            self._votes[self._vote_pos] = new
+            self._vote_counts[new] += 1
+            self._vote_pos = (self._vote_pos + 1) % window
+            np.multiply(self._vote_counts, 1.0 / window, out=self.scores)
+
+        # Hysteresis: release the active gesture once it drops below its off threshold
+        if self.active >= 0 and self.scores[self.active] < self.off_threshold[self.active]:
+            self.active = -1
+
+        best = int(self.scores.argmax())
+        if best != self.active and self.scores[best] >= self.on_threshold[best]:
+            self.active = best
+            return self.label_classes[best], self.actions[best]
+        return None
@@ -0,0 +1,220 @@
+"""
+drift_adaptation.py
+
+Online adaptation of a feature-based model bundle to slow signal drift
+during play (electrodes shifting, skin conductance changing, fatigue),
+without recalibrating.
+
+Every classified window whose top probability reaches CONFIDENCE is taken
+as a pseudo-label. Per class, the first WARMUP_WINDOWS such windows of the
+session set a reference mean of the standardized features; after that an
+exponential moving average follows where that class's windows are now.
+Both come from the same kind of windows, so without drift they agree up to
+sampling noise; displacements within NOISE_MARGIN standard errors of the
+two estimates (from the spread of the warm-up windows) are ignored, so the
+model is left alone until the signal has really moved.
+
+Features are standardized with the bundle's normalization stats. Bundles
+trained without them (like the shipped emg_classifier.npz) take the mean
+and standard deviation of the session's first WARMUP_WINDOWS confident
+windows instead, and are left unadapted until those are in.
+
+- re-centering: a gain or offset drift moves every class's features by
+  (roughly) the same affine map per feature. After each confident window
+  the map that takes the current class means back onto their references
+  is refitted (per-feature least squares over the classes, pulled towards
+  the identity so one class alone cannot bend it) and applied to every
+  window before it reaches the network.
+- head bias correction: one small cross-entropy gradient step on the
+  movement classes' output biases towards the pseudo-label, for windows
+  whose top probability reaches BIAS_CONFIDENCE and whose class is not
+  rest. Stepping towards the model's own labels drifts the biases towards
+  whichever class the session uses most, so each step is weighted by
+  uniform usage over the session's (EMA) usage of its class, capped at
+  MAX_WEIGHT, and the biases decay towards zero by BIAS_DECAY of a step.
+  Without drift the steps then cancel out; the rest bias is never moved.
+
+The map and the biases are clamped (MIN_GAIN..MAX_GAIN, MAX_OFFSET standard
+deviations, MAX_BIAS logits) so a run of wrong pseudo-labels cannot run
+away. Each window costs a fixed handful of vector operations on
+num_classes x num_features values, however long the session runs.
+
+drift is the RMS distance of the current class means from their references,
+in (training or session) standard deviations: a single number to monitor. status() adds
+the bias offsets and the number of updates.
+"""
+
+import numpy as np
+
+CONFIDENCE = 0.8  # Top probability a window needs to be used as a pseudo-label
+BIAS_CONFIDENCE = 0.95  # Top probability a movement window needs to step the biases
+WARMUP_WINDOWS = 30  # Confident windows of a class that set its reference
+MEAN_RATE = 0.02  # EMA weight of one confident window in its class mean
+NOISE_MARGIN = 1.0  # Standard errors of a class mean counted as noise
+IDENTITY_WEIGHT = 0.5  # Pull of the correction towards the identity, in classes
+BIAS_RATE = 0.002  # Gradient step size of the bias correction
+USAGE_RATE = 0.01  # EMA weight of one bias step in the class usage
+MAX_WEIGHT = 4.0  # Largest usage weight of a bias step
+BIAS_DECAY = 0.05  # Pull of the biases towards zero, per step, relative to BIAS_RATE
+MIN_GAIN = 0.25
+MAX_GAIN = 4.0
+MAX_OFFSET = 3.0  # In training standard deviations
+MAX_BIAS = 2.0  # In logits
+REST_LABEL = "rest"  # Class that never steps the biases (as in param_sweep.py)
+
+
+class DriftAdapter:
+    def __init__(self, bundle, confidence=CONFIDENCE, mean_rate=MEAN_RATE, bias_rate=BIAS_RATE):
+        """bundle: a feature-based ModelBundle (any model type but "cnn")."""
+        if bundle.model_type == "cnn":
+            raise ValueError("Drift adaptation needs a feature bundle, not a 'cnn' bundle")
+        self.bundle = bundle
+        self.confidence = confidence
+        self.mean_rate = mean_rate
+        self.bias_rate = bias_rate
+        num_features = len(bundle.feature_columns)
+        num_classes = len(bundle.classes)
+        # Without training stats the session's first confident windows standardize the features
+        self.session_stats = bundle.norm_mean is None
+        self._stats_count = 0
+        self._stats_mean = np.zeros(num_features)
+        self._stats_squares = np.zeros(num_features)
+        self.mean = None if self.session_stats else bundle.norm_mean
+        self.scale = None if self.session_stats else bundle.norm_std
+
+        self.reference = np.zeros((num_classes, num_features))
+        self._squares = np.zeros((num_classes, num_features))  # Welford sums of the warm-up windows
+        self.noise = np.zeros((num_classes, num_features))
+        self.current = np.zeros((num_classes, num_features))
+        self.counts = np.zeros(num_classes, dtype=int)
+        self.gain = np.ones(num_features)
+        self.offset = np.zeros(num_features)
+        self.bias = np.zeros(num_classes)
+        self.movement = np.array([label != REST_LABEL for label in bundle.classes])
+        self.prior = self.movement / max(1, self.movement.sum())  # Uniform usage of the movement classes
+        self.usage = self.prior.copy()
+        self.updates = 0
+        self._z = np.zeros(num_features)
+        self._x = np.zeros((1, num_features))
+
+    def reset(self):
+        """Forget the adaptation and the session references."""
+        self.reference.fill(0)
+        self._squares.fill(0)
+        self.noise.fill(0)
+        self.current.fill(0)
+        self.counts.fill(0)
+        self.gain.fill(1)
+        self.offset.fill(0)
+        self.bias.fill(0)
+        self.usage[:] = self.prior
+        self.updates = 0
+        if self.session_stats:
+            self._stats_count = 0
+            self._stats_mean.fill(0)
+            self._stats_squares.fill(0)
+            self.mean = self.scale = None
+
+    @property
+    def drift(self):
+        """RMS distance of the class means from their references, in training standard deviations."""
+        ready = self.counts > WARMUP_WINDOWS
+        if not ready.any():
+            return 0.0
+        return float(np.sqrt(np.mean(np.square(self.current[ready] - self.reference[ready]))))
+
+    def status(self):
+        return {"drift": self.drift, "bias": [float(b) for b in self.bias], "updates": self.updates}
+
+    def predict(self, features):
+        """Adapted class probabilities of one window's features, shape (num_classes,); then adapt."""
+        features = np.asarray(features, dtype=np.float64).reshape(-1)
+        if self.mean is None:
+            p = self.bundle.predict(features[None, :])[0]
+            if p.max() >= self.confidence:
+                self._collect_stats(features)
+            return p
+        z = self._z
+        np.subtract(features, self.mean, out=z)
+        z /= self.scale
+        # Corrected window in raw units: mean + (gain * z + offset) * std
+        x = self._x[0]
+        np.multiply(z, self.gain, out=x)
+        x += self.offset
+        x *= self.scale
+        x += self.mean
+        p = self.bundle.logits(self._x)[0]
+        p += self.bias
+        p -= p.max()
+        np.exp(p, out=p)
+        p /= p.sum()
+        self._update(z, p)
+        return p
+
+    def _collect_stats(self, features):
+        """Welford mean / std of the first confident raw windows; standardize with them once complete."""
+        self._stats_count += 1
+        delta = features - self._stats_mean
+        self._stats_mean += delta / self._stats_count
+        self._stats_squares += delta * (features - self._stats_mean)
+        if self._stats_count == WARMUP_WINDOWS:
+            std = np.sqrt(self._stats_squares / (WARMUP_WINDOWS - 1))
+            std[std == 0] = 1.0
+            self.mean = self._stats_mean.copy()
+            self.scale = std
+
+    def _update(self, z, p):
+        c = int(p.argmax())
+        if p[c] < self.confidence:
+            return
+        self.counts[c] += 1
+        if self.counts[c] <= WARMUP_WINDOWS:
+            # Running mean of the first windows, used as both reference and start of the EMA
+            delta = z - self.reference[c]
+            self.reference[c] += delta / self.counts[c]
+            self._squares[c] += delta * (z - self.reference[c])
+            self.current[c] = self.reference[c]
+            if self.counts[c] == WARMUP_WINDOWS:
+                # Standard error of the reference plus that of the EMA at equilibrium
+                variance = self._squares[c] / (WARMUP_WINDOWS - 1)
+                rate = self.mean_rate
+                self.noise[c] = NOISE_MARGIN * np.sqrt(variance * (1 / WARMUP_WINDOWS + rate / (2 - rate)))
+            return
+        self.current[c] += self.mean_rate * (z - self.current[c])
+        self._fit_correction()
+        self.updates += 1
+
+        if not self.movement[c] or p[c] < BIAS_CONFIDENCE:
+            return
+        self.usage *= 1 - USAGE_RATE
+        self.usage[c] += USAGE_RATE
+        step = self.bias_rate * min(self.prior[c] / self.usage[c], MAX_WEIGHT)
+        # Cross-entropy gradient on the biases is q - onehot(c), q the
+        # probabilities renormalized over the movement classes
+        q = p * self.movement
+        q /= q.sum()
+        self.bias -= step * q
+        self.bias[c] += step
+        self.bias *= 1 - self.bias_rate * BIAS_DECAY
+        np.clip(self.bias, -MAX_BIAS, MAX_BIAS, out=self.bias)
+
+    def _fit_correction(self):
+        """
+        Per feature, gain and offset minimizing
+        sum_c (gain * current_c + offset - reference_c)^2 + w ((gain - 1)^2 + offset^2)
+        over the classes past their warm-up (w = IDENTITY_WEIGHT), with every
+        class mean's displacement shrunk by its noise margin.
+        """
+        ready = self.counts > WARMUP_WINDOWS
+        r = self.reference[ready]
+        shift = self.current[ready] - r
+        m = r + np.sign(shift) * np.maximum(np.abs(shift) - self.noise[ready], 0)
+        w = IDENTITY_WEIGHT
+        s_mm = np.sum(m * m, axis=0) + w
+        s_m = np.sum(m, axis=0)
+        s_1 = len(m) + w
+        s_mr = np.sum(m * r, axis=0) + w
+        s_r = np.sum(r, axis=0)
+        det = s_mm * s_1 - s_m * s_m
+        np.clip((s_mr * s_1 - s_m * s_r) / det, MIN_GAIN, MAX_GAIN, out=self.gain)
+        np.clip((s_mm * s_r - s_m * s_mr) / det, -MAX_OFFSET, MAX_OFFSET, out=self.offset)
@@ -0,0 +1,75 @@
+"""
+early_exit.py
+
+Progressive (early-exit) classification for the live loops.
+
+Instead of waiting for a full window, the classifier evaluates growing
+prefixes of it (25/50/75/100% by default) with a model trained for each
+prefix length by `model_training.py --progressive`. A decision is emitted
+as soon as the predicted class passes its per-class threshold.
+"""
+
+import json
+import numpy as np
+
+from emg_features import extract_features
+from model_bundle import load_bundle
+
+
+class ProgressiveClassifier:
+    def __init__(self, config_path="emg_classifier_progressive.json"):
+        with open(config_path) as f:
+            config = json.load(f)
+        self.window_size = config["window_size"]
+        self.label_classes = config["classes"]
+        self.stage_samples = [stage["samples"] for stage in config["stages"]]
+        self.models = [load_bundle(stage["model"]) for stage in config["stages"]]
+        for stage, model in zip(config["stages"], self.models):
+            if model.classes != self.label_classes:
+                raise ValueError(f"{stage['model']} classes {model.classes} do not match {self.label_classes}")
+        # Thresholds as one array per stage, indexed like the model outputs
+        self.thresholds = [np.array([stage["thresholds"][c] for c in self.label_classes])
+                           for stage in config["stages"]]
+        self.next_stage = 0
+        self.last_prediction = None
+
+    def reset(self):
+        """Start a new window: the next evaluation is the shortest prefix."""
+        self.next_stage = 0
+
+    def update(self, data_buffer, timestamps_buffer, final_threshold=None):
+        """
+        Call after each new sample. Returns (label, confidence, samples) when a
+        decision is made on the current window, otherwise None.
+
+        At the last stage the decision falls back to final_threshold (if given)
+        so a full window is classified the same way as in non-progressive mode.
+        The probability vector of the latest evaluated prefix is kept in
+        last_prediction.
+        """
+        if self.next_stage >= len(self.stage_samples):
+            return None
+        n = self.stage_samples[self.next_stage]
+        if len(data_buffer) < n:
+            return None
+
+        stage = self.next_stage
+        self.next_stage += 1
+        values = list(data_buffer)[:n]
+        timestamps = list(timestamps_buffer)[:n]
+        prediction = self.models[stage].predict(extract_features(values, timestamps))[0]
+        self.last_prediction = prediction
+        index = int(np.argmax(prediction))
+        confidence = float(prediction[index])
+
+        threshold = self.thresholds[stage][index]
+        if stage == len(self.stage_samples) - 1 and final_threshold is not None:
+            threshold = min(threshold, final_threshold)
+        if confidence >= threshold:
+            return self.label_classes[index], confidence, n
+        return None
+
+    @property
+    def finished(self):
+        """True once every prefix of the current window has been evaluated."""
+        return self.next_stage >= len(self.stage_samples)
@@ -0,0 +1,84 @@
+"""
+emg_features.py
+
+Feature extraction shared by data_preprocessing.py, model_training.py
+and the live classification scripts, so the training and live paths
+compute exactly the same features in the same column order.
+"""
+
+import numpy as np
+
+# Column order of the feature vector (and of features.csv)
+FEATURE_COLUMNS = ["auc", "mean", "std", "rms", "max", "min", "mean_deriv", "std_deriv"]
+
+
+def extract_features(window, timestamps=None):
+    """
+    Extract enhanced features from a list of sensor values.
+    Features: AUC, mean, std, RMS, max, min, mean derivative, std derivative.
+
+    If timestamps are given the AUC is integrated over them, otherwise
+    over the sample index. Returns an array of shape (1, 8).
+    """
+    window = np.asarray(window, dtype=float)
+
+    # Calculate AUC using the trapezoidal rule
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps, dtype=float)
+        auc = np.trapezoid(window, timestamps) if len(timestamps) > 1 else 0
+    else:
+        auc = np.trapezoid(window)
+
+    mean_val = np.mean(window)
+    std_val = np.std(window)
+    rms_val = np.sqrt(np.mean(np.square(window)))
+    max_val = np.max(window)
+    min_val = np.min(window)
+
+    # Compute derivative features
+    derivative = np.diff(window)
+    if len(derivative) > 0:
+        mean_deriv = np.mean(derivative)
+        std_deriv = np.std(derivative)
+    else:
+        mean_deriv = 0
+        std_deriv = 0
+
+    features = np.array([auc, mean_val, std_val, rms_val, max_val, min_val, mean_deriv, std_deriv])
+    return features.reshape(1, -1)
+
+
+def sliding_windows(values, window_size, hop=1):
+    """Every full window of window_size samples starting hop apart, as a (n, window_size) view."""
+    values = np.asarray(values, dtype=float)
+    if len(values) < window_size:
+        return np.empty((0, window_size))
+    return np.lib.stride_tricks.sliding_window_view(values, window_size)[::hop]
+
+
+def extract_features_batch(windows, timestamps=None):
+    """
+    extract_features for a stack of windows of shape (n, window_size) at
+    once (e.g. from sliding_windows). Returns an array of shape (n, 8).
+    """
+    windows = np.asarray(windows, dtype=float)
+    n, size = windows.shape
+    if timestamps is not None:
+        auc = np.trapezoid(windows, np.asarray(timestamps, dtype=float), axis=1) if size > 1 else np.zeros(n)
+    else:
+        auc = np.trapezoid(windows, axis=1)
+
+    mean_val = windows.mean(axis=1)
+    std_val = windows.std(axis=1)
+    rms_val = np.sqrt(np.mean(np.square(windows), axis=1))
+    max_val = windows.max(axis=1)
+    min_val = windows.min(axis=1)
+
+    if size > 1:
+        derivative = np.diff(windows, axis=1)
+        mean_deriv = derivative.mean(axis=1)
+        std_deriv = derivative.std(axis=1)
+    else:
+        mean_deriv = std_deriv = np.zeros(n)
+
+    return np.column_stack([auc, mean_val, std_val, rms_val, max_val, min_val, mean_deriv, std_deriv])
@@ -0,0 +1,84 @@
+"""
+gesture_tracker.py
+
+Press / release tracking for held gestures (e.g. duck while the muscle
+stays contracted).
+
+The classifier decides *which* gesture started, but it needs a full window
+to do so and would keep reporting the gesture until the contraction has
+left the window. The end of a gesture is therefore detected per sample
+from the signal envelope instead: once the envelope has dropped below
+release_fraction of its peak during the hold for release_samples samples
+in a row, the gesture is released. At 100 Hz with the defaults that is
+about 50-60 ms after the muscle relaxes.
+
+While the classifier still reports the gesture, a renewed contraction
+(envelope back above press_fraction of the last peak) presses it again
+without waiting for the next window.
+"""
+
+from signal_filter import EnvelopeFilter
+
+
+class HeldGestureTracker:
+    def __init__(self, release_fraction=0.3, release_samples=5, press_fraction=0.8, press_samples=3,
+                 signal_filter=None):
+        # A fast envelope: the release detector should react within a few samples
+        self.filter = signal_filter or EnvelopeFilter(envelope_alpha=0.3)
+        self.release_fraction = release_fraction
+        self.release_samples = release_samples
+        self.press_fraction = press_fraction
+        self.press_samples = press_samples
+        self.label = None  # gesture the classifier currently reports as active
+        self.holding = False
+        self.peak = 0.0
+        self._count = 0
+
+    def reset(self):
+        self.filter.reset()
+        self.label = None
+        self.holding = False
+        self.peak = 0.0
+        self._count = 0
+
+    def update(self, value):
+        """
+        Feed one raw sample. Returns "press" or "release" when the held
+        state of the current gesture changes, otherwise None.
+        """
+        envelope = self.filter.update(value)
+        if self.label is None:
+            return None
+        if self.holding:
+            self.peak = max(self.peak, envelope)
+            self._count = self._count + 1 if envelope < self.release_fraction * self.peak else 0
+            if self._count >= self.release_samples:
+                self.holding = False
+                self._count = 0
+                return "release"
+        else:
+            self._count = self._count + 1 if envelope >= self.press_fraction * self.peak else 0
+            if self._count >= self.press_samples:
+                self.holding = True
+                self._count = 0
+                self.peak = envelope
+                return "press"
+        return None
+
+    def start(self, label):
+        """The classifier reports a new held gesture: press it."""
+        self.label = label
+        self.holding = True
+        self.peak = self.filter.envelope
+        self._count = 0
+
+    def stop(self):
+        """
+        The classifier no longer reports the gesture. Returns True if it was
+        still held, i.e. a release must be emitted.
+        """
+        was_holding = self.holding
+        self.label = None
+        self.holding = False
+        self._count = 0
+        return was_holding
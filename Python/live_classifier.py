@@ -0,0 +1,276 @@
+"""
+live_classifier.py
+
+The sliding-window classification loop of real_time_classification.py as a
+reusable object: feed it sample chunks from any source (SensorStream,
+a recording, a virtual port) and it returns the decisions they produce.
+
+Used wherever classification runs outside the standalone scripts, e.g.
+the wizard that hands decisions to the game over controller_link.
+
+With adapt=True the window probabilities come from a DriftAdapter
+(drift_adaptation.py), which follows slow signal drift during the session.
+
+"cnn" bundles skip the feature windows: every sample is pushed through a
+StreamingCNN and its probabilities are read every hop samples.
+
+push() runs the whole loop. Callers that predict windows elsewhere (the
+batched inference of sensor_server.py) drive its steps themselves:
+advance() to the next due window, window_features(), then complete() with
+the window's probabilities.
+
+When the loop has fallen behind the sensor (backlog_age() of the pending
+samples above BACKLOG_SECONDS, e.g. after a stall in rendering), catch_up()
+takes the whole backlog without acting on gestures from seconds ago:
+"batch" classifies its windows in one forward pass to keep the decision
+layer in step with the signal, "skip" drops all but the newest window.
+
+Every action / press Decision carries the gesture's onset: the time of the
+first sample of the hop in which its class started leading the window
+probabilities. A consumer that compares it with its own clock gets the
+player's gesture-to-decision latency (windowing, smoothing, inference and
+transport), not just the transport delay.
+"""
+
+import time
+
+import numpy as np
+
+from emg_features import extract_features, extract_features_batch
+from decision_layer import DecisionLayer
+from gesture_tracker import HeldGestureTracker
+from streaming_cnn import StreamingCNN
+from drift_adaptation import DriftAdapter
+
+BACKLOG_SECONDS = 0.5  # Pending samples older than this mean the loop has fallen behind
+CATCH_UP_MODES = ("batch", "skip")
+
+
+def backlog_age(timestamps, now=None):
+    """Seconds since the oldest of the pending samples arrived (0 if there are none)."""
+    if len(timestamps) == 0:
+        return 0.0
+    return (time.time() if now is None else now) - timestamps[0]
+
+
+class Decision:
+    __slots__ = ("timestamp", "label", "action", "probabilities", "kind", "intensity", "onset")
+
+    def __init__(self, timestamp, label, action, probabilities, kind="action", intensity=None, onset=None):
+        """
+        kind: "action" (one-shot), or "press" / "release" for held gestures.
+        intensity: 0..1, how far the window's probability of the gesture was
+            above its on threshold (None for releases).
+        onset: sample timestamp at which the gesture started (None for releases).
+        """
+        self.timestamp = timestamp
+        self.label = label
+        self.action = action
+        self.probabilities = probabilities
+        self.kind = kind
+        self.intensity = intensity
+        self.onset = onset
+
+
+class LiveClassifier:
+    def __init__(self, bundle, actions, hop=None, held_actions=(), adapt=False, **decision_options):
+        """
+        bundle: ModelBundle; its window size and hop define the windowing.
+        actions: gesture -> action mapping for the DecisionLayer.
+        hop: classify every hop samples instead of the bundle's hop.
+        held_actions: actions that are held while the muscle stays contracted
+            (e.g. "duck"); their gestures produce press/release decisions.
+        adapt: adapt the normalization and output biases to drift online.
+        decision_options: smoothing / threshold options for the DecisionLayer;
+            defaults come from the bundle's "live" settings (see param_sweep.py).
+        """
+        self.bundle = bundle
+        self.window_size = bundle.window_size
+        self.hop = max(1, hop or bundle.hop)
+        self.decisions = DecisionLayer(bundle.classes, actions, **dict(bundle.live_settings, **decision_options))
+        self.held = {label for label, action in actions.items() if action in held_actions}
+        self.tracker = HeldGestureTracker() if self.held else None
+        self.actions = actions
+        self.stream = StreamingCNN(bundle) if bundle.model_type == "cnn" else None
+        self.adapter = DriftAdapter(bundle) if adapt else None
+        self._class_index = {label: i for i, label in enumerate(self.decisions.label_classes)}
+        self._values = np.zeros(self.window_size)
+        self._timestamps = np.zeros(self.window_size)
+        self._filled = 0
+        self._since_last = 0
+        self._hop_start = 0.0  # Timestamp of the first sample of the current hop
+        self._leader = -1  # Class with the highest probability in the latest window
+        self._leader_since = 0.0  # _hop_start of the window it started leading in
+        self.windows_classified = 0
+        self.catch_ups = 0
+        self.skipped_samples = 0
+
+    def reset(self):
+        self._filled = 0
+        self._since_last = 0
+        self._leader = -1
+        self.decisions.reset()
+        if self.stream is not None:
+            self.stream.reset()
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    def _held_update(self, timestamp, value, fired):
+        """Per-sample end-of-gesture detection for the held gesture."""
+        change = self.tracker.update(value)
+        if change is not None:
+            label = self.tracker.label
+            fired.append(Decision(timestamp, label, self.actions[label], None, change))
+
+    def _intensity(self, label, probabilities):
+        index = self._class_index[label]
+        on = self.decisions.on_threshold[index]
+        if on >= 1.0:
+            return 1.0
+        return float(min(max((probabilities[index] - on) / (1.0 - on), 0.0), 1.0))
+
+    def _classified(self, timestamp, probabilities, fired):
+        top = int(np.argmax(probabilities))
+        if top != self._leader:
+            self._leader, self._leader_since = top, self._hop_start
+        event = self.decisions.update(probabilities)
+        if self.tracker is not None and self.tracker.label is not None:
+            label = self.tracker.label
+            # The classifier moved on from the held gesture: release it if still down
+            if event is not None or self.decisions.active < 0:
+                if self.tracker.stop():
+                    fired.append(Decision(timestamp, label, self.actions[label], probabilities, "release"))
+        if event is None:
+            return
+        label, action = event
+        intensity = self._intensity(label, probabilities)
+        onset = self._leader_since if self._class_index[label] == self._leader else self._hop_start
+        if label in self.held:
+            self.tracker.start(label)
+            fired.append(Decision(timestamp, label, action, probabilities, "press", intensity, onset))
+        else:
+            fired.append(Decision(timestamp, label, action, probabilities, intensity=intensity, onset=onset))
+
+    @property
+    def batchable(self):
+        """True if window probabilities are plain bundle.predict() of window_features()."""
+        return self.stream is None and self.adapter is None
+
+    def advance(self, timestamps, values, start, fired):
+        """
+        Add samples from index start of the chunk until a window is due.
+        Returns the index after the sample that completed it, or None once
+        the chunk is used up. Held-gesture changes are appended to fired.
+        """
+        n = self.window_size
+        for i in range(start, len(values)):
+            timestamp, value = timestamps[i], values[i]
+            if self.stream is not None:
+                self.stream.push(value)
+                self._filled = min(self._filled + 1, n)
+            # Keep the newest window contiguous so it can be passed to extract_features as is
+            elif self._filled < n:
+                self._values[self._filled] = value
+                self._timestamps[self._filled] = timestamp
+                self._filled += 1
+            else:
+                self._values[:-1] = self._values[1:]
+                self._timestamps[:-1] = self._timestamps[1:]
+                self._values[-1] = value
+                self._timestamps[-1] = timestamp
+            if self._since_last == 0:
+                self._hop_start = timestamp
+            self._since_last += 1
+            if self.tracker is not None:
+                self._held_update(timestamp, value, fired)
+
+            if self._filled == n and self._since_last >= self.hop:
+                self._since_last = 0
+                return i + 1
+        return None
+
+    def window_features(self):
+        """Features of the newest window, shape (1, num_features)."""
+        return extract_features(self._values, self._timestamps)
+
+    def window_probabilities(self):
+        """Class probabilities of the newest window."""
+        if self.stream is not None:
+            return self.stream.probabilities()
+        if self.adapter is not None:
+            return self.adapter.predict(self.window_features())
+        return self.bundle.predict(self.window_features())[0]
+
+    def complete(self, timestamp, probabilities, fired, on_window=None):
+        """Feed the probabilities of the window advance() stopped at to the decision layer."""
+        self.windows_classified += 1
+        if on_window is not None:
+            on_window(timestamp, probabilities)
+        self._classified(timestamp, probabilities, fired)
+
+    def push(self, timestamps, values, on_window=None):
+        """
+        Add a chunk of samples. Returns the list of Decisions (gestures that
+        became active, and press/release changes of held gestures).
+        on_window(timestamp, probabilities), if given, is called for every
+        classified window.
+        """
+        fired = []
+        end = self.advance(timestamps, values, 0, fired)
+        while end is not None:
+            self.complete(timestamps[end - 1], self.window_probabilities(), fired, on_window)
+            end = self.advance(timestamps, values, end, fired)
+        return fired
+
+    def catch_up(self, timestamps, values, mode="batch", on_window=None):
+        """
+        Add a backlog chunk without acting on its stale windows. A held
+        gesture is released first.
+        - "batch": every window due in the chunk is classified (in one forward
+          pass unless the probabilities are stateful) and updates the decision
+          layer, but only the newest window can produce a decision;
+        - "skip": everything but the newest window_size samples is dropped
+          and the decision layer starts over from them.
+        Returns the Decisions (the release, then those of the newest window).
+        """
+        if mode not in CATCH_UP_MODES:
+            raise ValueError(f"Unknown catch-up mode: {mode}")
+        self.catch_ups += 1
+        fired = []
+        if self.tracker is not None and self.tracker.label is not None:
+            label = self.tracker.label
+            if self.tracker.stop():
+                fired.append(Decision(timestamps[0], label, self.actions[label], None, "release"))
+
+        if mode == "skip":
+            keep = self.window_size
+            self.skipped_samples += max(len(values) - keep, 0)
+            self.reset()
+            return fired + self.push(timestamps[-keep:], values[-keep:], on_window)
+
+        # Gesture onsets inside the backlog are stale: time them from the newest window
+        self._leader = -1
+        ends = []
+        windows = []
+        end = self.advance(timestamps, values, 0, fired)
+        while end is not None:
+            ends.append(timestamps[end - 1])
+            if self.batchable:
+                windows.append((self._values.copy(), self._timestamps.copy()))
+            else:
+                windows.append(self.window_probabilities())
+            end = self.advance(timestamps, values, end, fired)
+        if not windows:
+            return fired
+        if self.batchable:
+            window_values, window_timestamps = (np.array(w) for w in zip(*windows))
+            probabilities = self.bundle.predict(extract_features_batch(window_values, window_timestamps))
+        else:
+            probabilities = windows
+        for timestamp, p in zip(ends[:-1], probabilities[:-1]):
+            self.windows_classified += 1
+            if on_window is not None:
+                on_window(timestamp, p)
+            self.decisions.update(p)
+        self.complete(ends[-1], probabilities[-1], fired, on_window)
+        return fired
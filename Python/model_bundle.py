@@ -0,0 +1,295 @@
+"""
+model_bundle.py
+
+A model bundle is a single .npz file holding everything the live scripts
+need to reproduce the training-time pipeline: the network weights, the
+class list (in model output order), the feature column order, the window
+and hop sizes, the filter configuration and the feature normalization
+statistics.
+
+Bundles are plain NumPy arrays plus a JSON header, so loading one does not
+import TensorFlow and the forward pass runs in NumPy. Load with
+load_bundle(); the feature columns are checked against emg_features so a
+bundle trained on a different feature set fails at startup instead of
+producing wrong actions.
+
+Model types:
+- "mlp": dense relu layers and a softmax output layer (model_training.py).
+- "linear": a single softmax layer (LDA, logistic regression, linear SVM
+  from classical_models.py); same forward pass as "mlp".
+- "trees": gradient-boosted trees stored as padded node arrays (see
+  _unpack_trees), evaluated for all trees at once.
+- "cnn": a causal 1D CNN on filtered raw samples instead of features
+  (see _unpack_cnn); predict() takes windows of window_size filtered
+  samples, and streaming_cnn.py runs it sample by sample.
+
+To convert an existing Keras model:
+    python model_bundle.py emg_classifier.h5 --classes clench index rest wrist
+
+model_training.py trains on standardized features and writes their
+statistics next to the .h5 (emg_classifier.norm.json), where the converter
+picks them up. Without them (or --norm-mean / --norm-std) it refuses to
+convert, since the bundle would load fine and predict garbage; models from
+before normalization was added need --raw-features.
+"""
+
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from emg_features import FEATURE_COLUMNS
+
+BUNDLE_FILE = "emg_classifier.npz"
+BUNDLE_VERSION = 1
+
+
+class ModelBundle:
+    def __init__(self, weights, classes, feature_columns, window_size, hop,
+                 filter_config=None, norm_mean=None, norm_std=None, model_type="mlp", extra=None):
+        self.weights = [np.asarray(w, dtype=np.float64) for w in weights]
+        self.classes = [str(c) for c in classes]
+        self.feature_columns = list(feature_columns)
+        self.window_size = int(window_size)
+        self.hop = int(hop)
+        self.filter_config = filter_config
+        self.norm_mean = None if norm_mean is None else np.asarray(norm_mean, dtype=np.float64)
+        self.norm_std = None if norm_std is None else np.asarray(norm_std, dtype=np.float64)
+        self.model_type = model_type
+        self.extra = extra or {}
+        if model_type == "trees":
+            self._unpack_trees()
+        elif model_type == "cnn":
+            self._unpack_cnn()
+        else:
+            self._fold_normalization()
+
+    def _fold_normalization(self):
+        """
+        Fold the standardization into the first dense layer:
+        ((x - mean) / std) @ W + b == x @ (W / std[:, None]) + (b - (mean / std) @ W),
+        so the live path normalizes for free inside the first matrix product.
+        """
+        self._layers = [(self.weights[2 * i], self.weights[2 * i + 1]) for i in range(len(self.weights) // 2)]
+        if self.norm_mean is not None and self._layers:
+            w, b = self._layers[0]
+            self._layers[0] = (w / self.norm_std[:, None], b - (self.norm_mean / self.norm_std) @ w)
+
+    def _unpack_trees(self):
+        """
+        Tree weights are [feature, threshold, left, right, value, tree_class,
+        init]: (n_trees, max_nodes) node arrays padded to the largest tree,
+        where leaves point to themselves, values include the learning rate
+        and thresholds apply to raw features (normalization folded in at
+        export); tree_class is the class each tree adds its value to and init
+        the constant starting scores.
+        """
+        feature, threshold, left, right, value, tree_class, init = self.weights
+        self._tree_feature = feature.astype(np.intp)
+        self._tree_threshold = threshold
+        self._tree_left = left.astype(np.intp)
+        self._tree_right = right.astype(np.intp)
+        self._tree_value = value
+        self._tree_internal = self._tree_left != np.arange(left.shape[1])
+        self._tree_onehot = np.eye(len(self.classes))[tree_class.astype(np.intp)]
+        self._tree_init = init
+        self._tree_rows = np.arange(left.shape[0])
+
+    def _unpack_cnn(self):
+        """
+        CNN weights are a [kernel, bias] pair per causal convolution (kernel
+        shape (taps, in, out), relu; the dilations are in extra["cnn"])
+        followed by the dense output layer, applied to the mean of the last
+        pool_size outputs of the last convolution. window_size is exactly the
+        receptive field of those outputs, so a window is never padded and the
+        streaming engine reproduces predict() once it has seen a window.
+        """
+        dilations = self.extra["cnn"]["dilations"]
+        self.conv_layers = [(self.weights[2 * i], self.weights[2 * i + 1], d) for i, d in enumerate(dilations)]
+        self._layers = [(self.weights[-2], self.weights[-1])]
+        self.receptive_field = 1 + sum((w.shape[0] - 1) * d for w, _, d in self.conv_layers)
+        self.pool_size = self.window_size - self.receptive_field + 1
+        if self.pool_size < 1:
+            raise ValueError(f"Window of {self.window_size} samples is shorter than the CNN's receptive field "
+                             f"({self.receptive_field})")
+
+    def _cnn_hidden(self, windows):
+        """Pooled last-convolution activations for (n, window_size) filtered sample windows."""
+        x = np.asarray(windows, dtype=np.float64)
+        if self.norm_mean is not None:
+            x = (x - self.norm_mean) / self.norm_std
+        x = x[:, :, None]  # (n, time, channels)
+        for w, b, d in self.conv_layers:
+            length = x.shape[1] - (w.shape[0] - 1) * d
+            y = np.broadcast_to(b, (len(x), length, len(b))).copy()
+            for tap in range(w.shape[0]):
+                y += x[:, tap * d:tap * d + length] @ w[tap]
+            x = np.maximum(y, 0, out=y)
+        return x.mean(axis=1)
+
+    def _tree_scores(self, x):
+        """Class scores of every sample: all trees step down one level at a time."""
+        rows = self._tree_rows
+        samples = np.arange(len(x))[:, None]
+        node = np.zeros((len(x), len(rows)), dtype=np.intp)
+        while self._tree_internal[rows, node].any():
+            go_left = x[samples, self._tree_feature[rows, node]] <= self._tree_threshold[rows, node]
+            node = np.where(go_left, self._tree_left[rows, node], self._tree_right[rows, node])
+        return self._tree_value[rows, node] @ self._tree_onehot + self._tree_init
+
+    @property
+    def overlap(self):
+        """Window overlap as a fraction, like OVERLAP_PERCENTAGE in the live scripts."""
+        return 1 - self.hop / self.window_size
+
+    @property
+    def live_settings(self):
+        """
+        Decision-layer settings tuned for this bundle (on_threshold,
+        off_threshold, alpha; see param_sweep.py), empty if never tuned.
+        """
+        return dict(self.extra.get("live", {}))
+
+    def hidden(self, features):
+        """Activations of the last hidden layer for a (n, num_features) feature array."""
+        if self.model_type == "cnn":
+            return self._cnn_hidden(features)
+        x = np.asarray(features, dtype=np.float64)
+        for w, b in self._layers[:-1]:
+            x = x @ w
+            x += b
+            np.maximum(x, 0, out=x)  # relu
+        return x
+
+    def logits(self, features):
+        """Scores before the softmax, shape (n, num_classes)."""
+        if self.model_type == "trees":
+            return self._tree_scores(np.asarray(features, dtype=np.float64))
+        w, b = self._layers[-1]
+        x = self.hidden(features) @ w
+        x += b
+        return x
+
+    def predict(self, features):
+        """
+        Class probabilities for a (n, num_features) feature array (for "cnn"
+        bundles: (n, window_size) windows of filtered samples).
+        """
+        x = self.logits(features)
+        # Softmax output layer
+        x -= x.max(axis=1, keepdims=True)
+        np.exp(x, out=x)
+        x /= x.sum(axis=1, keepdims=True)
+        return x
+
+    def save(self, path=BUNDLE_FILE):
+        header = {
+            "version": BUNDLE_VERSION,
+            "model_type": self.model_type,
+            "classes": self.classes,
+            "feature_columns": self.feature_columns,
+            "window_size": self.window_size,
+            "hop": self.hop,
+            "filter": self.filter_config,
+            "num_weights": len(self.weights),
+            "extra": self.extra,
+        }
+        arrays = {f"w{i}": w for i, w in enumerate(self.weights)}
+        if self.norm_mean is not None:
+            arrays["norm_mean"] = self.norm_mean
+            arrays["norm_std"] = self.norm_std
+        np.savez(path, header=np.array(json.dumps(header)), **arrays)
+
+
+def predict_latency_ms(bundle, features, repeats=2000):
+    """Median time of one live prediction (a single feature row) with the bundle."""
+    row = np.asarray(features, dtype=np.float64)[:1]
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        bundle.predict(row)
+        times[i] = time.perf_counter() - start
+    return float(np.median(times) * 1000)
+
+
+def load_bundle(path=BUNDLE_FILE, feature_columns=FEATURE_COLUMNS):
+    """
+    Load a model bundle. Raises ValueError if it was trained on a different
+    feature column order than the one the live code extracts.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        header = json.loads(str(data["header"]))
+        if header["version"] != BUNDLE_VERSION:
+            raise ValueError(f"{path}: unsupported bundle version {header['version']}")
+        # CNN bundles read filtered samples, not features
+        if (feature_columns is not None and header["model_type"] != "cnn"
+                and header["feature_columns"] != list(feature_columns)):
+            raise ValueError(f"{path}: bundle features {header['feature_columns']} do not match "
+                             f"the live feature columns {list(feature_columns)}")
+        weights = [data[f"w{i}"] for i in range(header["num_weights"])]
+        norm_mean = data["norm_mean"] if "norm_mean" in data else None
+        norm_std = data["norm_std"] if "norm_std" in data else None
+    return ModelBundle(weights, header["classes"], header["feature_columns"], header["window_size"],
+                       header["hop"], header["filter"], norm_mean, norm_std, header["model_type"],
+                       header["extra"])
+
+
+def norm_stats_path(model_path):
+    """Sidecar of a Keras model file holding its feature normalization statistics."""
+    return os.path.splitext(model_path)[0] + ".norm.json"
+
+
+def save_norm_stats(model_path, mean, std):
+    with open(norm_stats_path(model_path), "w") as f:
+        json.dump({"mean": [float(m) for m in mean], "std": [float(s) for s in std]}, f)
+
+
+def load_norm_stats(model_path):
+    """(mean, std) saved next to a Keras model file, or None if there is no sidecar."""
+    try:
+        with open(norm_stats_path(model_path)) as f:
+            stats = json.load(f)
+    except FileNotFoundError:
+        return None
+    return stats["mean"], stats["std"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a Keras .h5 model into a model bundle.")
+    parser.add_argument("model", help="Keras model file, e.g. emg_classifier.h5")
+    parser.add_argument("--classes", nargs="+", required=True, help="class names in model output order")
+    parser.add_argument("--window-size", type=int, default=200)
+    parser.add_argument("--overlap", type=float, default=0.5)
+    parser.add_argument("--norm-mean", type=float, nargs="+", help="feature means the model was trained with")
+    parser.add_argument("--norm-std", type=float, nargs="+", help="feature standard deviations")
+    parser.add_argument("--raw-features", action="store_true",
+                        help="the model takes unnormalized features (trained before normalization was added)")
+    parser.add_argument("--output", default=BUNDLE_FILE)
+    args = parser.parse_args()
+
+    if (args.norm_mean is None) != (args.norm_std is None):
+        parser.error("give both --norm-mean and --norm-std")
+    stats = (args.norm_mean, args.norm_std) if args.norm_mean is not None else load_norm_stats(args.model)
+    if stats is None and not args.raw_features:
+        parser.error(f"no normalization statistics for {args.model}: expected {norm_stats_path(args.model)}, "
+                     f"--norm-mean / --norm-std, or --raw-features for a model trained on raw features")
+    if args.raw_features:
+        stats = None
+    if stats is not None and not (len(stats[0]) == len(stats[1]) == len(FEATURE_COLUMNS)):
+        parser.error(f"normalization statistics need {len(FEATURE_COLUMNS)} values each")
+
+    import tensorflow as tf
+    model = tf.keras.models.load_model(args.model)
+    if model.output_shape[-1] != len(args.classes):
+        parser.error(f"model outputs {model.output_shape[-1]} classes, got {len(args.classes)} names")
+
+    hop = int(args.window_size * (1 - args.overlap))
+    norm_mean, norm_std = stats if stats is not None else (None, None)
+    ModelBundle(model.get_weights(), args.classes, FEATURE_COLUMNS, args.window_size, hop,
+                norm_mean=norm_mean, norm_std=norm_std).save(args.output)
+    print(f"Bundle saved as {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,45 +3,530 @@ model_training.py
 
 This script loads features.csv (with enhanced features),
 encodes the movement labels,
-trains a neural network classifier using TensorFlow/Keras, and saves the model.
+trains a neural network classifier using TensorFlow/Keras, and saves the model
+as a Keras file plus a model bundle (emg_classifier.npz) that carries the
+class list, feature order and window parameters for the live scripts.
+
+With --progressive WINDOW_SIZE it instead trains one early-exit model per
+prefix feature file written by `data_preprocessing.py --progressive`, picks
+per-class confidence thresholds on held-out recordings that played no
+part in training or early stopping and writes them to
+emg_classifier_progressive.json for the progressive classification mode.
+
+With --search it first evaluates every combination in SEARCH_SPACE
+(hidden layers, learning rate, batch size) with GroupKFold cross-validation
+across a process pool, ranks the candidates by accuracy and by measured
+inference latency, and trains the final model with the winner. The
+chosen configuration and its scores are stored in the bundle.
+
+With --classical it instead trains the classical models of
+classical_models.py (LDA, logistic regression, linear SVM, gradient-boosted
+trees) and the MLP on the same split, saves each as
+emg_classifier_<model>.npz and prints accuracy, per-sample predict latency
+and peak memory, marking the cheapest model that meets --target-accuracy.
+
+With --cnn it trains the raw-sample causal CNN of streaming_cnn.py on the
+baseline-filtered recordings in data/ (windows of --window-size samples)
+and saves it as emg_classifier_cnn.npz.
+
+With --augment it trains the MLP on sliding windows of the recordings in
+data/ instead of features.csv, augmenting every training batch on the fly
+(augmentation.py) through a prefetching tf.data pipeline; the held-out
+recordings are evaluated unaugmented.
+
+--cnn and --augment pick their recordings through the dataset catalog
+(dataset_catalog.py) with the same --user / --label / --session /
+--last-sessions filters as data_preprocessing.py, which selects the
+recordings behind features.csv for the other modes.
+
+Held-out data is always split by recording (the "recording" column written
+by data_preprocessing.py), so windows of one recording never end up on
+both sides of a split.
 """
 
+import os
+import json
+import argparse
+import itertools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import GroupKFold, GroupShuffleSplit
 from sklearn.preprocessing import LabelEncoder
 import tensorflow as tf
 
+from emg_features import FEATURE_COLUMNS, extract_features_batch, sliding_windows
+from augmentation import DEFAULT_AUGMENTATION, window_batches
+from calibration import load_recordings
+from param_sweep import labelled_recordings
+from classical_models import CLASSICAL_MODELS, benchmark, cheapest, train_classical
+from data_preprocessing import prefix_lengths
+from dataset_catalog import add_selection_arguments, selected_recordings
+from model_bundle import BUNDLE_FILE, ModelBundle, predict_latency_ms, save_norm_stats
+from signal_filter import BaselineFilter, make_filter
+from streaming_cnn import CNN_BUNDLE_FILE, CNN_CHANNELS, CNN_DILATIONS, CNN_INPUT, CNN_KERNEL
+
 keras = tf.keras
 
-# Load features dataset (ensure features.csv has the new feature columns)
-data = pd.read_csv("features.csv")
-# Use the enhanced feature set: auc, mean, std, rms, max, min, mean_deriv, std_deriv
-feature_columns = ["auc", "mean", "std", "rms", "max", "min", "mean_deriv", "std_deriv"]
-X = data[feature_columns].values
-labels = data["label"].values
-print("Labels:", labels)
-
-# Encode string labels to integers
-le = LabelEncoder()
-y_encoded = le.fit_transform(labels)
-num_classes = len(le.classes_)
-y = keras.utils.to_categorical(y_encoded, num_classes)
-
-# Split data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Define a neural network model
-model = keras.models.Sequential([
-    keras.layers.Dense(32, activation='relu', input_shape=(X_train.shape[1],)),
-    keras.layers.Dense(32, activation='relu'),
-    keras.layers.Dense(num_classes, activation='softmax')  # Output layer: softmax gives probabilities
-])
-
-model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
-model.fit(X_train, y_train, epochs=150, batch_size=4, validation_data=(X_test, y_test))
-
-# Save the trained model
-model.save("emg_classifier.h5")
-print("Trained classes:", le.classes_)
-print("Model saved as emg_classifier.h5")
+# An early exit is only taken when the held-out precision of the class at
+# the chosen threshold reaches this value
+EARLY_EXIT_PRECISION = 0.95
+PROGRESSIVE_CONFIG = "emg_classifier_progressive.json"
+
+# With standardized inputs the network converges with larger batches;
+# training stops once validation loss has not improved for PATIENCE epochs
+BATCH_SIZE = 32
+MAX_EPOCHS = 300
+EARLY_STOPPING_PATIENCE = 20
+HIDDEN_LAYERS = (32, 32)
+LEARNING_RATE = 1e-3
+TEST_FRACTION = 0.2
+
+# Hyperparameter search (--search)
+SEARCH_SPACE = {
+    "hidden": [(16,), (32, 32), (64, 32), (64, 64, 32)],
+    "learning_rate": [1e-3, 3e-3, 1e-2],
+    "batch_size": [16, 32, 64],
+}
+SEARCH_FOLDS = 5
+# Candidates within this much mean CV accuracy of the best are considered
+# equally accurate; the fastest of them wins
+ACCURACY_TOLERANCE = 0.005
+LATENCY_REPEATS = 2000
+TARGET_ACCURACY = 0.9
+# Training windows cut from recordings (--cnn, --augment) start every WINDOW_HOP_FRACTION of a window
+WINDOW_HOP_FRACTION = 0.25
+# Augmented batches per epoch: this many times the training windows
+AUGMENT_FACTOR = 4
+
+
+def load_features(path, classes=None):
+    """Load a feature CSV and return (X, y_encoded, label_encoder)."""
+    data = pd.read_csv(path)
+    X = data[FEATURE_COLUMNS].values
+    labels = data["label"].values
+
+    # Encode string labels to integers
+    le = LabelEncoder()
+    if classes is not None:
+        le.fit(classes)
+        y_encoded = le.transform(labels)
+    else:
+        y_encoded = le.fit_transform(labels)
+    return X, y_encoded, le
+
+
+def load_groups(path):
+    """
+    Recording of every row of a feature CSV, for grouped splits. Files
+    written before the "recording" column existed fall back to one group
+    per row.
+    """
+    data = pd.read_csv(path)
+    if "recording" not in data.columns:
+        print(f"{path} has no recording column (re-run data_preprocessing.py); splitting by row")
+        return np.arange(len(data))
+    return data["recording"].astype(str).values
+
+
+def build_model(num_features, num_classes, hidden=HIDDEN_LAYERS, learning_rate=LEARNING_RATE):
+    # Define a neural network model
+    layers = [keras.layers.Input(shape=(num_features,))]
+    layers += [keras.layers.Dense(units, activation='relu') for units in hidden]
+    layers.append(keras.layers.Dense(num_classes, activation='softmax'))  # Output layer: softmax gives probabilities
+    model = keras.models.Sequential(layers)
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate), loss='categorical_crossentropy',
+                  metrics=['accuracy'])
+    return model
+
+
+def fit_normalization(X):
+    """Per-feature mean and std of the training features (std 1 for constant features)."""
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    return mean, std
+
+
+def group_split(groups, test_size=TEST_FRACTION, seed=42):
+    """(train_index, test_index) with every group entirely on one side."""
+    splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=seed)
+    return next(splitter.split(np.zeros(len(groups)), groups=groups))
+
+
+def validation_split(train_index, groups):
+    """
+    Group split of the training rows into (fit_index, validation_index) for
+    early stopping, so the held-out test recordings stay unseen.
+    """
+    fit, validation = group_split(groups[train_index])
+    return train_index[fit], train_index[validation]
+
+
+def train_model(X, y_encoded, num_classes, groups=None, hidden=HIDDEN_LAYERS, learning_rate=LEARNING_RATE,
+                batch_size=BATCH_SIZE, verbose=1):
+    """
+    Train the classifier on standardized features, returning it with the
+    normalization stats (mean, std) and the raw held-out split.
+    groups: recording of every row; held-out rows come from other recordings.
+    """
+    y = keras.utils.to_categorical(y_encoded, num_classes)
+
+    # Split data into training and testing sets, by recording
+    train_index, test_index = group_split(np.arange(len(X)) if groups is None else groups)
+    X_train, X_test, y_train, y_test = X[train_index], X[test_index], y[train_index], y[test_index]
+
+    # Features span several orders of magnitude (AUC ~100, mean_deriv ~0.01);
+    # standardize with stats fitted on the training split only
+    mean, std = fit_normalization(X_train)
+
+    model = build_model(X_train.shape[1], num_classes, hidden, learning_rate)
+    early_stopping = keras.callbacks.EarlyStopping(
+        monitor='val_loss', patience=EARLY_STOPPING_PATIENCE, restore_best_weights=True)
+    model.fit((X_train - mean) / std, y_train, epochs=MAX_EPOCHS, batch_size=batch_size,
+              validation_data=((X_test - mean) / std, y_test), callbacks=[early_stopping], verbose=verbose)
+    return model, (mean, std), X_test, y_test
+
+
+def search_candidates(space=SEARCH_SPACE):
+    """Every combination of the search space as a list of config dicts."""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def _init_search_worker(threads):
+    # Each worker gets a fixed share of the cores instead of TensorFlow
+    # sizing its thread pools to the whole machine in every process
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def evaluate_candidate(config, X, y_encoded, groups, classes, folds=SEARCH_FOLDS):
+    """GroupKFold accuracy and live inference latency of one configuration."""
+    accuracies = []
+    latencies = []
+    for train_index, test_index in GroupKFold(n_splits=folds).split(X, y_encoded, groups):
+        # Early stopping watches a group split of the training fold, never the test fold
+        model, (mean, std), _, _ = train_model(X[train_index], y_encoded[train_index], len(classes),
+                                               groups[train_index], config["hidden"], config["learning_rate"],
+                                               config["batch_size"], verbose=0)
+        bundle = ModelBundle(model.get_weights(), classes, FEATURE_COLUMNS, 0, 0, norm_mean=mean, norm_std=std)
+        predicted = np.argmax(bundle.predict(X[test_index]), axis=1)
+        accuracies.append(float(np.mean(predicted == y_encoded[test_index])))
+        latencies.append(predict_latency_ms(bundle, X, LATENCY_REPEATS))
+        keras.backend.clear_session()
+    return {"config": config, "accuracy": float(np.mean(accuracies)), "accuracy_std": float(np.std(accuracies)),
+            "latency_ms": float(np.median(latencies))}
+
+
+def rank_candidates(results, tolerance=ACCURACY_TOLERANCE):
+    """
+    Sort by accuracy, then latency. The winner is the fastest candidate whose
+    accuracy is within tolerance of the best.
+    """
+    ranked = sorted(results, key=lambda r: (-r["accuracy"], r["latency_ms"]))
+    best_accuracy = ranked[0]["accuracy"]
+    winner = min((r for r in ranked if r["accuracy"] >= best_accuracy - tolerance), key=lambda r: r["latency_ms"])
+    return ranked, winner
+
+
+def search(X, y_encoded, groups, classes, workers=None, threads=1):
+    """Evaluate every SEARCH_SPACE candidate on a process pool; returns (ranked, winner)."""
+    candidates = search_candidates()
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    folds = min(SEARCH_FOLDS, len(np.unique(groups)))
+    print(f"Evaluating {len(candidates)} candidates with {folds}-fold GroupKFold on {workers} workers "
+          f"x {threads} threads")
+    # Spawned workers start TensorFlow fresh, so the thread limits take effect
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn"), initializer=_init_search_worker,
+                             initargs=(threads,)) as pool:
+        futures = [pool.submit(evaluate_candidate, config, X, y_encoded, groups, classes, folds)
+                   for config in candidates]
+        results = [future.result() for future in futures]
+
+    ranked, winner = rank_candidates(results)
+    print(f"{'hidden':<14} {'lr':>7} {'batch':>6} {'accuracy':>9} {'± std':>7} {'latency ms':>11}")
+    for result in ranked:
+        config = result["config"]
+        marker = "  <- winner" if result is winner else ""
+        print(f"{str(config['hidden']):<14} {config['learning_rate']:>7g} {config['batch_size']:>6} "
+              f"{result['accuracy']:>9.3f} {result['accuracy_std']:>7.3f} {result['latency_ms']:>11.4f}{marker}")
+    return ranked, winner
+
+
+def compare_models(X, y_encoded, groups, classes, window_size, hop, target_accuracy=TARGET_ACCURACY):
+    """
+    Train the classical models and the MLP on the same grouped split, save
+    each as emg_classifier_<model>.npz and print the benchmark table.
+    """
+    train_index, test_index = group_split(groups)
+    mean, std = fit_normalization(X[train_index])
+    paths = {}
+    for name in CLASSICAL_MODELS:
+        paths[name] = f"emg_classifier_{name}.npz"
+        train_classical(name, X[train_index], y_encoded[train_index], classes, mean, std, window_size,
+                        hop).save(paths[name])
+
+    # Early stopping watches a group split of the training part; the test recordings stay unseen
+    model, (mlp_mean, mlp_std), _, _ = train_model(X[train_index], y_encoded[train_index], len(classes),
+                                                   groups[train_index], verbose=0)
+    paths["mlp"] = "emg_classifier_mlp.npz"
+    ModelBundle(model.get_weights(), classes, FEATURE_COLUMNS, window_size, hop,
+                norm_mean=mlp_mean, norm_std=mlp_std).save(paths["mlp"])
+
+    results = benchmark(paths, X[test_index], y_encoded[test_index])
+    choice = cheapest(results, target_accuracy)
+    print(f"{'model':<11} {'accuracy':>9} {'latency us':>11} {'peak KiB':>9} {'file KiB':>9}")
+    for result in sorted(results, key=lambda r: r["latency_us"]):
+        marker = "  <- cheapest" if result is choice else ""
+        print(f"{result['model']:<11} {result['accuracy']:>9.3f} {result['latency_us']:>11.1f} "
+              f"{result['peak_kib']:>9.1f} {result['file_kib']:>9.1f}{marker}")
+    if choice is None:
+        print(f"No model reaches {target_accuracy:.0%} accuracy on the held-out recordings")
+    else:
+        print(f"Cheapest model with at least {target_accuracy:.0%} accuracy: {choice['path']} "
+              f"(copy it to {BUNDLE_FILE} to use it live)")
+    return results
+
+
+def early_exit_thresholds(probabilities, y_true, classes, precision=EARLY_EXIT_PRECISION):
+    """
+    For each class, the lowest confidence at which predictions of that class
+    reach the requested precision on held-out data. Classes that never reach
+    it get a threshold above 1 so the stage never exits early on them.
+    """
+    predicted = np.argmax(probabilities, axis=1)
+    confidence = np.max(probabilities, axis=1)
+    thresholds = {}
+    for index, name in enumerate(classes):
+        mask = predicted == index
+        threshold = 1.01
+        # Walk the candidate thresholds from most to least confident
+        order = np.argsort(-confidence[mask])
+        correct = (y_true[mask] == index)[order]
+        if len(correct):
+            running_precision = np.cumsum(correct) / np.arange(1, len(correct) + 1)
+            ok = np.nonzero(running_precision >= precision)[0]
+            if len(ok):
+                threshold = float(confidence[mask][order][ok[-1]])
+        thresholds[str(name)] = threshold
+    return thresholds
+
+
+def train_progressive(window_size):
+    """Train one model per prefix length and write the early-exit config."""
+    # Use a common class list so every stage outputs the same columns
+    all_labels = pd.read_csv(f"features_prefix_{window_size}.csv")["label"].values
+    classes = np.unique(all_labels)
+
+    stages = []
+    for n in prefix_lengths(window_size):
+        X, y_encoded, le = load_features(f"features_prefix_{n}.csv", classes)
+        groups = load_groups(f"features_prefix_{n}.csv")
+        # train_model early-stops on a split of the training recordings; the
+        # thresholds are calibrated on the others (same recordings for every prefix)
+        train_index, calibration_index = group_split(groups)
+        model, (mean, std), _, _ = train_model(X[train_index], y_encoded[train_index], len(classes),
+                                               groups[train_index])
+        model_file = f"emg_classifier_prefix_{n}.npz"
+        bundle = ModelBundle(model.get_weights(), le.classes_, FEATURE_COLUMNS, n, max(1, n // 2),
+                             norm_mean=mean, norm_std=std)
+        bundle.save(model_file)
+
+        thresholds = early_exit_thresholds(bundle.predict(X[calibration_index]), y_encoded[calibration_index],
+                                           le.classes_)
+        stages.append({"samples": n, "model": model_file, "thresholds": thresholds})
+        print(f"Prefix {n}: thresholds {thresholds}, saved as {model_file}")
+
+    with open(PROGRESSIVE_CONFIG, "w") as f:
+        json.dump({"window_size": window_size, "classes": [str(c) for c in classes], "stages": stages}, f, indent=2)
+    print(f"Progressive config saved as {PROGRESSIVE_CONFIG}")
+
+
+def load_windows(files, window_size, hop, filter_config=None):
+    """
+    Sliding windows of the recordings (filtered if filter_config is given),
+    with their sample times in seconds, labels and recording index.
+    """
+    windows, times, labels, groups = [], [], [], []
+    for recording, (label, values, seconds) in enumerate(labelled_recordings(load_recordings(files))):
+        if filter_config is not None:
+            values = make_filter(filter_config).process(values)
+        recording_windows = sliding_windows(values, window_size, hop)
+        windows.append(recording_windows)
+        times.append(sliding_windows(seconds, window_size, hop))
+        labels += [label] * len(recording_windows)
+        groups += [recording] * len(recording_windows)
+    if not labels:
+        raise SystemExit(f"No recording of at least {window_size} samples found")
+    return np.concatenate(windows), np.concatenate(times), np.array(labels), np.array(groups)
+
+
+def build_cnn(window_size, num_classes, channels=CNN_CHANNELS, kernel=CNN_KERNEL, dilations=CNN_DILATIONS):
+    # Unpadded dilated convolutions: each output only sees samples inside the window,
+    # exactly like the causal streaming engine
+    layers = [keras.layers.Input(shape=(window_size, 1))]
+    layers += [keras.layers.Conv1D(channels, kernel, dilation_rate=d, activation='relu') for d in dilations]
+    layers += [keras.layers.GlobalAveragePooling1D(), keras.layers.Dense(num_classes, activation='softmax')]
+    model = keras.models.Sequential(layers)
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def train_cnn(window_size, overlap, files):
+    """Train the raw-sample CNN on the recording files and save it as a "cnn" bundle."""
+    filter_config = BaselineFilter().config()
+    X, _, labels, groups = load_windows(files, window_size, max(1, int(window_size * WINDOW_HOP_FRACTION)),
+                                        filter_config)
+    le = LabelEncoder()
+    y_encoded = le.fit_transform(labels)
+    y = keras.utils.to_categorical(y_encoded, len(le.classes_))
+
+    train_index, test_index = group_split(groups)
+    fit_index, validation_index = validation_split(train_index, groups)
+    mean = float(X[fit_index].mean())
+    std = float(X[fit_index].std()) or 1.0
+    model = build_cnn(window_size, len(le.classes_))
+    early_stopping = keras.callbacks.EarlyStopping(
+        monitor='val_loss', patience=EARLY_STOPPING_PATIENCE, restore_best_weights=True)
+    model.fit(((X[fit_index] - mean) / std)[..., None], y[fit_index], epochs=MAX_EPOCHS, batch_size=BATCH_SIZE,
+              validation_data=(((X[validation_index] - mean) / std)[..., None], y[validation_index]),
+              callbacks=[early_stopping])
+
+    bundle = ModelBundle(model.get_weights(), le.classes_, CNN_INPUT, window_size, int(window_size * (1 - overlap)),
+                         filter_config, [mean], [std], "cnn",
+                         {"cnn": {"channels": CNN_CHANNELS, "kernel": CNN_KERNEL, "dilations": CNN_DILATIONS}})
+    accuracy = float(np.mean(np.argmax(bundle.predict(X[test_index]), axis=1) == y_encoded[test_index]))
+    bundle.extra["training"] = {"held_out_accuracy": accuracy}
+    bundle.save(CNN_BUNDLE_FILE)
+    print(f"CNN (receptive field {bundle.receptive_field} samples): held-out accuracy {accuracy:.3f}, "
+          f"saved as {CNN_BUNDLE_FILE}")
+
+
+def augmented_dataset(windows, timestamps, y_encoded, num_classes, mean, std, batch_size=BATCH_SIZE,
+                      shards=None, config=DEFAULT_AUGMENTATION):
+    """
+    Endless tf.data stream of normalized, augmented feature batches. Each
+    shard is an independently seeded window_batches() generator; shards are
+    interleaved in parallel and batches are prefetched while Keras trains.
+    """
+    shards = shards or os.cpu_count() or 1
+
+    def shard(seed):
+        for features, labels in window_batches(windows, timestamps, y_encoded, batch_size, int(seed), config):
+            yield ((features - mean) / std).astype(np.float32), keras.utils.to_categorical(labels, num_classes)
+
+    signature = (tf.TensorSpec((None, len(FEATURE_COLUMNS)), tf.float32),
+                 tf.TensorSpec((None, num_classes), tf.float32))
+    return tf.data.Dataset.range(shards).interleave(
+        lambda seed: tf.data.Dataset.from_generator(shard, args=(seed,), output_signature=signature),
+        cycle_length=shards, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False).prefetch(tf.data.AUTOTUNE)
+
+
+def train_augmented(window_size, overlap, files, config=DEFAULT_AUGMENTATION):
+    """Train the MLP on augmented windows of the recording files and save the bundle."""
+    windows, times, labels, groups = load_windows(files, window_size, max(1, int(window_size * WINDOW_HOP_FRACTION)))
+    le = LabelEncoder()
+    y_encoded = le.fit_transform(labels)
+    num_classes = len(le.classes_)
+
+    train_index, test_index = group_split(groups)
+    fit_index, validation_index = validation_split(train_index, groups)
+    # Normalization, validation and test use the real (unaugmented) windows;
+    # early stopping watches the validation recordings, never the test ones
+    mean, std = fit_normalization(extract_features_batch(windows[fit_index], times[fit_index]))
+    X_validation = extract_features_batch(windows[validation_index], times[validation_index])
+    y_validation = keras.utils.to_categorical(y_encoded[validation_index], num_classes)
+    X_test = extract_features_batch(windows[test_index], times[test_index])
+
+    dataset = augmented_dataset(windows[fit_index], times[fit_index], y_encoded[fit_index], num_classes,
+                                mean, std, config=config)
+    model = build_model(len(FEATURE_COLUMNS), num_classes)
+    early_stopping = keras.callbacks.EarlyStopping(
+        monitor='val_loss', patience=EARLY_STOPPING_PATIENCE, restore_best_weights=True)
+    model.fit(dataset, steps_per_epoch=max(1, AUGMENT_FACTOR * len(fit_index) // BATCH_SIZE), epochs=MAX_EPOCHS,
+              validation_data=((X_validation - mean) / std, y_validation), callbacks=[early_stopping])
+
+    bundle = ModelBundle(model.get_weights(), le.classes_, FEATURE_COLUMNS, window_size,
+                         int(window_size * (1 - overlap)), norm_mean=mean, norm_std=std)
+    accuracy = float(np.mean(np.argmax(bundle.predict(X_test), axis=1) == y_encoded[test_index]))
+    bundle.extra["training"] = {"augmentation": dict(config), "held_out_accuracy": accuracy}
+    model.save("emg_classifier.h5")
+    save_norm_stats("emg_classifier.h5", mean, std)
+    bundle.save(BUNDLE_FILE)
+    print(f"Held-out accuracy on unaugmented windows: {accuracy:.3f}; saved emg_classifier.h5 and {BUNDLE_FILE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--progressive", type=int, metavar="WINDOW_SIZE",
+                        help="train early-exit models for each prefix of a WINDOW_SIZE-sample window")
+    parser.add_argument("--window-size", type=int, default=200,
+                        help="live window length in samples, stored in the bundle (default: 200)")
+    parser.add_argument("--overlap", type=float, default=0.5,
+                        help="live window overlap fraction, stored in the bundle (default: 0.5)")
+    parser.add_argument("--search", action="store_true",
+                        help="pick hidden layers, learning rate and batch size by grouped cross-validation")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="search worker processes (default: cores / threads per worker)")
+    parser.add_argument("--threads-per-worker", type=int, default=1,
+                        help="TensorFlow intra-op threads per search worker (default: 1)")
+    parser.add_argument("--classical", action="store_true",
+                        help="benchmark LDA / logistic regression / linear SVM / boosted trees against the MLP")
+    parser.add_argument("--target-accuracy", type=float, default=TARGET_ACCURACY,
+                        help=f"accuracy the --classical recommendation must reach (default: {TARGET_ACCURACY})")
+    parser.add_argument("--cnn", action="store_true",
+                        help=f"train the streaming raw-sample CNN on the recordings (saves {CNN_BUNDLE_FILE})")
+    parser.add_argument("--augment", action="store_true",
+                        help="train on augmented windows of the recordings instead of features.csv")
+    add_selection_arguments(parser)
+    args = parser.parse_args()
+
+    if args.progressive:
+        train_progressive(args.progressive)
+        return
+    if args.cnn:
+        train_cnn(args.window_size, args.overlap, [r["path"] for r in selected_recordings(args)])
+        return
+    if args.augment:
+        train_augmented(args.window_size, args.overlap, [r["path"] for r in selected_recordings(args)])
+        return
+
+    # Load features dataset (ensure features.csv has the new feature columns)
+    X, y_encoded, le = load_features("features.csv")
+    groups = load_groups("features.csv")
+    print("Labels:", le.inverse_transform(y_encoded))
+    num_classes = len(le.classes_)
+    hop = int(args.window_size * (1 - args.overlap))
+
+    if args.classical:
+        compare_models(X, y_encoded, groups, le.classes_, args.window_size, hop, args.target_accuracy)
+        return
+
+    config = {"hidden": HIDDEN_LAYERS, "learning_rate": LEARNING_RATE, "batch_size": BATCH_SIZE}
+    training = {}
+    if args.search:
+        _, winner = search(X, y_encoded, groups, le.classes_, args.workers, args.threads_per_worker)
+        config = winner["config"]
+        training = {"cv_accuracy": winner["accuracy"], "cv_accuracy_std": winner["accuracy_std"],
+                    "latency_ms": winner["latency_ms"], "cv_folds": min(SEARCH_FOLDS, len(np.unique(groups)))}
+        print(f"Training the final model with {config}")
+
+    model, (mean, std), _, _ = train_model(X, y_encoded, num_classes, groups, config["hidden"],
+                                           config["learning_rate"], config["batch_size"])
+    training["config"] = {"hidden": list(config["hidden"]), "learning_rate": config["learning_rate"],
+                          "batch_size": config["batch_size"]}
+
+    # Save the trained model (the .h5 expects standardized inputs, so their
+    # statistics go next to it for model_bundle.py; the bundle carries them itself)
+    model.save("emg_classifier.h5")
+    save_norm_stats("emg_classifier.h5", mean, std)
+    ModelBundle(model.get_weights(), le.classes_, FEATURE_COLUMNS, args.window_size, hop,
+                norm_mean=mean, norm_std=std, extra={"training": training}).save(BUNDLE_FILE)
+    print("Trained classes:", le.classes_)
+    print(f"Model saved as emg_classifier.h5 and {BUNDLE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+motion_capture.py
+
+Helpers for the motion-capture wizard (UI/Pop_Up.py): saving recordings in
+the data_<label>_<timestamp>.csv layout that data_preprocessing.py expects,
+and scoring how distinct a new motion is from the ones already captured.
+"""
+
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from emg_features import extract_features
+
+# Window used to summarize a capture for the distinctness score
+# (1 s at the sensor's 100 Hz, with 75% overlap)
+SCORE_WINDOW = 100
+SCORE_HOP = 25
+# Feature differences up to this fraction of the feature's size count as noise
+RELATIVE_TOLERANCE = 0.2
+# Motions scoring below this against an existing one count as the same motion
+DISTINCTNESS_THRESHOLD = 1.0
+
+
+def recording_path(label, folder="data", timestamp=None):
+    if timestamp is None:
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(folder, f"data_{label}_{timestamp}.csv")
+
+
+def save_recording(label, timestamps, values, folder="data"):
+    """Write a recording as data_<label>_<timestamp>.csv and return its path."""
+    os.makedirs(folder, exist_ok=True)
+    path = recording_path(label, folder)
+    pd.DataFrame({"timestamp": timestamps, "value": values}).to_csv(path, index=False)
+    return path
+
+
+def capture_features(timestamps, values):
+    """Feature vectors of the overlapping score windows of a capture, shape (n, 8)."""
+    rows = [extract_features(values[start:start + SCORE_WINDOW], timestamps[start:start + SCORE_WINDOW])[0]
+            for start in range(0, len(values) - SCORE_WINDOW + 1, SCORE_HOP)]
+    return np.array(rows).reshape(len(rows), -1)
+
+
+def distinctness(features_a, features_b):
+    """
+    Separation of two captures: the distance between their mean feature
+    vectors, per feature in units of the within-capture spread plus a
+    relative tolerance (so small differences between otherwise steady
+    captures of the same motion do not count), averaged over features.
+    Around 0 means the same motion, above ~1 clearly different.
+    """
+    mean_a = features_a.mean(axis=0)
+    mean_b = features_b.mean(axis=0)
+    spread = np.sqrt((features_a.var(axis=0) + features_b.var(axis=0)) / 2)
+    tolerance = RELATIVE_TOLERANCE * (np.abs(mean_a) + np.abs(mean_b)) / 2
+    z = (mean_a - mean_b) / (spread + tolerance + 1e-9)
+    return float(np.sqrt(np.mean(np.square(z))))
+
+
+def closest_motion(features, captured):
+    """
+    Compare a capture with the already captured motions ({label: features}).
+    Returns (label, score) of the most similar one, or (None, inf).
+    """
+    best_label, best_score = None, float("inf")
+    for label, other in captured.items():
+        if len(features) < 2 or len(other) < 2:
+            continue
+        score = distinctness(features, other)
+        if score < best_score:
+            best_label, best_score = label, score
+    return best_label, best_score
@@ -0,0 +1,272 @@
+"""
+param_sweep.py
+
+Offline sweep of the live windowing and decision parameters (WINDOW_SIZE,
+OVERLAP_PERCENTAGE, CONFIDENCE_THRESHOLD) against labelled recordings
+(data_<label>_<timestamp>.csv, as written by the motion capture wizard).
+
+Every recording is replayed the way the live loops see it: a window ends
+every hop samples once the first one is full, the probabilities are
+smoothed with the decision layer's moving average, and a movement is
+reported once its smoothed probability reaches the confidence threshold.
+For every combination the sweep measures
+
+- error rate: gesture recordings whose first reported movement is missing
+  or wrong, plus rest recordings in which any movement is reported;
+- decision latency: time from the start of a gesture recording (the cue)
+  to its correct decision, median over the recordings.
+
+Features depend on the window size, so every window size gets its own
+output layer on the frozen hidden layers of the base bundle
+(calibration.calibrate), fitted with the test recordings held out by fold.
+Windows are cut and featurized in bulk (sliding_windows /
+extract_features_batch), each fold's test windows go through one batched
+forward pass, overlaps and thresholds are evaluated on the same
+probabilities, and the window sizes run in parallel worker processes.
+
+Prints the Pareto frontier of latency against error rate and saves the
+recommended configuration (the fastest frontier point within --max-error)
+as a bundle: the output layer refitted on all recordings, the window and
+hop, and the decision settings in extra["live"], which LiveClassifier and
+the live scripts load.
+
+Usage:
+    python param_sweep.py data/*.csv
+    python param_sweep.py data/*.csv --max-error 0.05 --output emg_classifier.npz
+"""
+
+import math
+import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calibration import calibrate, load_recordings
+from emg_features import extract_features_batch, sliding_windows
+from model_bundle import BUNDLE_FILE, ModelBundle, load_bundle
+
+WINDOW_SIZES = [50, 100, 150, 200, 300]
+OVERLAPS = [0.0, 0.25, 0.5, 0.75, 0.9]
+THRESHOLDS = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9]
+RELEASE_GAP = 0.2  # off_threshold = on_threshold - RELEASE_GAP, as in the live scripts
+SMOOTHING_ALPHA = 0.6
+FOLDS = 5
+MAX_ERROR = 0.1
+SAMPLE_RATE = 100  # For recordings without a timestamp column
+REST_LABEL = "rest"
+OUTPUT_FILE = "emg_classifier_tuned.npz"
+
+
+def labelled_recordings(recordings):
+    """Flatten load_recordings() output to (label, values, seconds since the first sample)."""
+    flat = []
+    for label in sorted(recordings):
+        for values, timestamps in recordings[label]:
+            values = np.asarray(values, dtype=float)
+            if timestamps is None:
+                times = np.arange(len(values)) / SAMPLE_RATE
+            else:
+                times = np.asarray(timestamps, dtype=float) - timestamps[0]
+            flat.append((label, values, times))
+    return flat
+
+
+def assign_folds(recordings, folds, seed=0):
+    """Fold of every recording, spreading each label's recordings evenly over the folds."""
+    rng = np.random.default_rng(seed)
+    fold = np.zeros(len(recordings), dtype=int)
+    labels = np.array([label for label, _, _ in recordings])
+    for label in np.unique(labels):
+        members = rng.permutation(np.flatnonzero(labels == label))
+        fold[members] = np.arange(len(members)) % folds
+    return fold
+
+
+def with_window(bundle, window_size, hop):
+    """The bundle with different window parameters (same weights)."""
+    return ModelBundle(bundle.weights, bundle.classes, bundle.feature_columns, window_size, hop,
+                       bundle.filter_config, bundle.norm_mean, bundle.norm_std, bundle.model_type, bundle.extra)
+
+
+def fit_head(base, recordings, window_size, hop):
+    """calibrate() on the recordings long enough for one window; None if a label has none."""
+    grouped = {}
+    for label, values, times in recordings:
+        if len(values) >= window_size:
+            grouped.setdefault(label, []).append((values, times))
+    labels = {label for label, _, _ in recordings}
+    if set(grouped) != labels:
+        return None
+    return calibrate(with_window(base, window_size, hop), grouped)
+
+
+def smooth(probabilities, alpha):
+    """DecisionLayer's "ema" scores after every window."""
+    scores = np.empty_like(probabilities)
+    if len(probabilities):
+        scores[0] = probabilities[0]
+    for i in range(1, len(probabilities)):
+        scores[i] = alpha * probabilities[i] + (1 - alpha) * scores[i - 1]
+    return scores
+
+
+def first_decisions(scores, movement, thresholds):
+    """
+    For every threshold, the index of the first window that reports a
+    movement and the class it reports (-1 if none). This is where a fresh
+    DecisionLayer fires its first movement: the best class is a movement and
+    its score reaches the on threshold.
+    """
+    best = scores.argmax(axis=1)
+    fires = movement[best][None, :] & (scores.max(axis=1)[None, :] >= thresholds[:, None])
+    fired = fires.any(axis=1)
+    index = np.where(fired, fires.argmax(axis=1), -1)
+    return index, np.where(fired, best[np.maximum(index, 0)], -1)
+
+
+def evaluate_window(window_size, base, recordings, fold, overlaps=OVERLAPS, thresholds=THRESHOLDS,
+                    alpha=SMOOTHING_ALPHA):
+    """
+    Cross-validated error rate and latency of every (overlap, threshold) for
+    one window size. Returns a list of result dicts (empty if some label has
+    no recording as long as the window).
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    hops = [max(1, int(window_size * (1 - overlap))) for overlap in overlaps]
+    # Featurize once at the finest stride every hop is a multiple of
+    stride = functools.reduce(math.gcd, hops)
+    errors = np.zeros((len(overlaps), len(thresholds)))
+    latencies = [[[] for _ in thresholds] for _ in overlaps]
+    total = 0
+
+    for k in np.unique(fold):
+        head = fit_head(base, [r for r, f in zip(recordings, fold) if f != k], window_size, stride)
+        if head is None:
+            return []
+        class_index = {label: i for i, label in enumerate(head.classes)}
+        movement = np.array([label != REST_LABEL for label in head.classes])
+        test = [r for r, f in zip(recordings, fold) if f == k]
+        total += len(test)
+
+        features = []
+        for _, values, times in test:
+            windows = sliding_windows(values, window_size, stride)
+            features.append(extract_features_batch(windows, sliding_windows(times, window_size, stride)))
+        counts = [len(f) for f in features]
+        probabilities = np.split(head.predict(np.concatenate(features)), np.cumsum(counts)[:-1])
+
+        for (label, values, times), probs in zip(test, probabilities):
+            target = class_index.get(label, -1)
+            ends = times[window_size - 1::stride][:len(probs)]
+            for i, hop in enumerate(hops):
+                step = hop // stride
+                index, fired = first_decisions(smooth(probs[::step], alpha), movement, thresholds)
+                for j in range(len(thresholds)):
+                    if label == REST_LABEL:
+                        errors[i, j] += fired[j] >= 0
+                    elif fired[j] != target:
+                        errors[i, j] += 1
+                    else:
+                        latencies[i][j].append(ends[::step][index[j]])
+
+    results = []
+    for i, (overlap, hop) in enumerate(zip(overlaps, hops)):
+        for j, threshold in enumerate(thresholds):
+            found = latencies[i][j]
+            results.append({
+                "window_size": window_size, "overlap": overlap, "hop": hop, "threshold": float(threshold),
+                "error_rate": errors[i, j] / total,
+                "latency_s": float(np.median(found)) if found else math.inf,
+                "latency_p90_s": float(np.percentile(found, 90)) if found else math.inf,
+            })
+    return results
+
+
+def pareto_frontier(results):
+    """Results no other result beats on both latency and error rate, fastest first."""
+    frontier = []
+    for result in sorted(results, key=lambda r: (r["latency_s"], r["error_rate"])):
+        if math.isfinite(result["latency_s"]) and (not frontier or result["error_rate"] < frontier[-1]["error_rate"]):
+            frontier.append(result)
+    return frontier
+
+
+def recommend(frontier, max_error=MAX_ERROR):
+    """The fastest frontier point within max_error, else the most accurate one."""
+    within = [r for r in frontier if r["error_rate"] <= max_error]
+    return within[0] if within else min(frontier, key=lambda r: r["error_rate"])
+
+
+def sweep(base, recordings, window_sizes=WINDOW_SIZES, overlaps=OVERLAPS, thresholds=THRESHOLDS,
+          alpha=SMOOTHING_ALPHA, folds=FOLDS, workers=None):
+    """evaluate_window for every window size on a process pool; all results in one list."""
+    fold = assign_folds(recordings, folds)
+    evaluate = functools.partial(evaluate_window, base=base, recordings=recordings, fold=fold,
+                                 overlaps=overlaps, thresholds=thresholds, alpha=alpha)
+    with ProcessPoolExecutor(workers) as pool:
+        per_window = list(pool.map(evaluate, window_sizes))
+    for window_size, results in zip(window_sizes, per_window):
+        if not results:
+            print(f"Skipped window size {window_size}: some label has no recording that long")
+    return [result for results in per_window for result in results]
+
+
+def save_recommendation(base, recordings, best, alpha, path):
+    bundle = fit_head(base, recordings, best["window_size"], best["hop"])
+    bundle.extra["live"] = {"on_threshold": best["threshold"],
+                            "off_threshold": round(max(best["threshold"] - RELEASE_GAP, 0.0), 2), "alpha": alpha}
+    bundle.extra["sweep"] = {key: best[key] for key in ("error_rate", "latency_s", "latency_p90_s")}
+    bundle.extra["sweep"]["recordings"] = len(recordings)
+    bundle.save(path)
+    return bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recordings", nargs="+", help="labelled data_<label>_<timestamp>.csv recordings")
+    parser.add_argument("--base", default=BUNDLE_FILE, help=f"bundle whose hidden layers are used (default: {BUNDLE_FILE})")
+    parser.add_argument("--window-sizes", type=int, nargs="+", default=WINDOW_SIZES)
+    parser.add_argument("--overlaps", type=float, nargs="+", default=OVERLAPS)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=THRESHOLDS)
+    parser.add_argument("--alpha", type=float, default=SMOOTHING_ALPHA, help="weight of the newest window in the EMA")
+    parser.add_argument("--folds", type=int, default=FOLDS)
+    parser.add_argument("--max-error", type=float, default=MAX_ERROR,
+                        help=f"error rate the recommendation must stay within (default: {MAX_ERROR})")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--csv", help="also write every result to this CSV file")
+    parser.add_argument("--output", default=OUTPUT_FILE, help=f"recommended bundle (default: {OUTPUT_FILE})")
+    args = parser.parse_args()
+
+    base = load_bundle(args.base)
+    recordings = labelled_recordings(load_recordings(args.recordings))
+    if not recordings:
+        parser.error("no data_<label>_<timestamp>.csv recordings given")
+    folds = min(args.folds, min(np.unique([label for label, _, _ in recordings], return_counts=True)[1]))
+    if folds < 2:
+        parser.error("every label needs at least two recordings")
+
+    results = sweep(base, recordings, args.window_sizes, args.overlaps, args.thresholds, args.alpha, folds,
+                    args.workers)
+    if args.csv:
+        pd.DataFrame(results).to_csv(args.csv, index=False)
+    frontier = pareto_frontier(results)
+    if not frontier:
+        print("No combination made a correct decision")
+        return
+    best = recommend(frontier, args.max_error)
+
+    print(f"Pareto frontier over {len(results)} combinations ({len(recordings)} recordings, {folds} folds):")
+    print(f"{'window':>7} {'overlap':>8} {'hop':>5} {'threshold':>10} {'error %':>8} {'latency s':>10} {'p90 s':>7}")
+    for result in frontier:
+        marker = "  <- recommended" if result is best else ""
+        print(f"{result['window_size']:>7} {result['overlap']:>8.2f} {result['hop']:>5} {result['threshold']:>10.2f} "
+              f"{100 * result['error_rate']:>8.1f} {result['latency_s']:>10.3f} {result['latency_p90_s']:>7.3f}{marker}")
+
+    save_recommendation(base, recordings, best, args.alpha, args.output)
+    print(f"Saved window {best['window_size']}, hop {best['hop']}, threshold {best['threshold']} as {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,24 +5,64 @@ This script performs real-time classification by reading sensor data from the se
 processing a sliding window of data, extracting enhanced features,
 and using the trained model to predict the movement.
 
-
+Samples are read in bulk from the port. If the loop falls behind (e.g. a
+slow prediction), the pending backlog is caught up on without reporting
+stale movements (CATCH_UP_MODE).
 """
 
 import serial
 import time
-import numpy as np
-import tensorflow as tf
+import traceback
 from collections import deque
 
-# Load the trained model
-model = tf.keras.models.load_model("emg_classifier.h5")
-# Define label classes as per the training (update these based on your actual labels)
-label_classes = ['clench', 'index', 'rest', 'wrist']
+from decision_layer import DecisionLayer
+from live_classifier import BACKLOG_SECONDS, LiveClassifier, backlog_age
+from model_bundle import load_bundle
+from sensor_stream import SerialReader
+
+# Load the trained model bundle; the label classes and window parameters come from training
+model = load_bundle("emg_classifier.npz")
+label_classes = model.classes
 
 # Parameters for the sliding window
-WINDOW_SIZE = 100  # Number of samples in each window
-OVERLAP_PERCENTAGE = 0  # 50% overlap between windows
-CONFIDENCE_THRESHOLD = 0.7  # Only report predictions above this confidence
+WINDOW_SIZE = model.window_size  # Number of samples in each window
+OVERLAP_PERCENTAGE = model.overlap  # Fraction of overlap between windows
+# Decision settings tuned by param_sweep.py are stored in the bundle
+LIVE_SETTINGS = model.live_settings
+CONFIDENCE_THRESHOLD = LIVE_SETTINGS.get("on_threshold", 0.7)  # Only report predictions above this confidence
+RELEASE_THRESHOLD = LIVE_SETTINGS.get("off_threshold", 0.5)  # A reported movement can repeat once its score falls below this
+SMOOTHING_MODE = "ema"  # "ema" over probabilities or "vote" over recent predictions
+SMOOTHING_ALPHA = LIVE_SETTINGS.get("alpha", 0.6)  # Weight of the newest window in "ema" mode
+VOTE_WINDOW = 3  # Number of recent windows in "vote" mode
+VOTE_FRACTION = 0.6  # Share of those windows that must agree in "vote" mode
+# Evaluate growing prefixes of the window with early-exit models
+# (train them with `model_training.py --progressive WINDOW_SIZE`)
+PROGRESSIVE_MODE = False
+# Stale samples after a stall: "batch" classifies them in one pass without
+# reporting, "skip" jumps straight to the newest window
+CATCH_UP_MODE = "batch"
+IDLE_SECONDS = 0.005  # Sleep when no samples are waiting
+
+progressive = None
+if PROGRESSIVE_MODE:
+    from early_exit import ProgressiveClassifier
+    progressive = ProgressiveClassifier()
+    label_classes = progressive.label_classes
+    WINDOW_SIZE = progressive.window_size
+
+# Report every movement except rest
+movements = {label: label for label in label_classes if label != 'rest'}
+if progressive is not None:
+    # Early exits are already confidence-gated; only suppress back-to-back
+    # repeats of a movement until a different or undecided window is seen
+    decisions = DecisionLayer(label_classes, movements, mode="vote", vote_window=1)
+else:
+    on_threshold = CONFIDENCE_THRESHOLD if SMOOTHING_MODE == "ema" else VOTE_FRACTION
+    # Slides the window by the trained hop (WINDOW_SIZE * (1 - OVERLAP_PERCENTAGE))
+    classifier = LiveClassifier(model, movements, mode=SMOOTHING_MODE, alpha=SMOOTHING_ALPHA,
+                                vote_window=VOTE_WINDOW, on_threshold=on_threshold,
+                                off_threshold=min(RELEASE_THRESHOLD, on_threshold))
+    decisions = classifier.decisions
 
 data_buffer = deque(maxlen=WINDOW_SIZE)
 timestamps_buffer = deque(maxlen=WINDOW_SIZE)
@@ -31,78 +71,65 @@ timestamps_buffer = deque(maxlen=WINDOW_SIZE)
 ser = serial.Serial('COM4', 9600)
 ser.flushInput()
 time.sleep(0.5)
-
-def extract_features(window, timestamps):
-    """
-    Extract enhanced features from a list of sensor values.
-    Features: AUC, mean, std, RMS, max, min, mean derivative, std derivative.
-    """
-    window = np.array(window)
-    timestamps = np.array(timestamps)
-    
-    # Calculate AUC using the trapezoidal rule
-    if len(timestamps) > 1:
-        auc = np.trapezoid(window, timestamps)
-    else:
-        auc = 0
-
-    mean_val = np.mean(window)
-    std_val = np.std(window)
-    rms_val = np.sqrt(np.mean(np.square(window)))
-    max_val = np.max(window)
-    min_val = np.min(window)
-    
-    # Compute derivative features
-    derivative = np.diff(window)
-    if len(derivative) > 0:
-        mean_deriv = np.mean(derivative)
-        std_deriv = np.std(derivative)
-    else:
-        mean_deriv = 0
-        std_deriv = 0
-    
-    features = np.array([auc, mean_val, std_val, rms_val, max_val, min_val, mean_deriv, std_deriv])
-    return features.reshape(1, -1)
+reader = SerialReader(ser)
 
 print("Starting real-time classification. Press Ctrl+C to stop.")
 
-last_prediction = None
-last_prediction_time = 0
-prediction_cooldown = 0.5  # Seconds between reporting same prediction
-
 try:
     while True:
-        line = ser.readline().decode('latin-1').strip()
         try:
-            value = int(line)
-            current_time = time.time()
-            
-            data_buffer.append(value)
-            timestamps_buffer.append(current_time)
-            
-            # Check if we have enough data to make a prediction
-            if len(data_buffer) >= WINDOW_SIZE:
-                features = extract_features(list(data_buffer), list(timestamps_buffer))
-                prediction = model.predict(features)
-                max_prob = np.max(prediction)
-                predicted_label = label_classes[np.argmax(prediction)]
-                
-                # Report prediction only if confidence is high and not repeating too fast
-                if (max_prob > CONFIDENCE_THRESHOLD and 
-                    (current_time - last_prediction_time > prediction_cooldown or 
-                    predicted_label != last_prediction)):
-                    print(f"Predicted movement: {predicted_label} (Confidence: {max_prob:.2f})")
-                    last_prediction = predicted_label
-                    last_prediction_time = current_time
-                
-                # Slide the window with overlap
-                slide_amount = int(WINDOW_SIZE * (1 - OVERLAP_PERCENTAGE))
-                data_buffer = deque(list(data_buffer)[slide_amount:], maxlen=WINDOW_SIZE)
-                timestamps_buffer = deque(list(timestamps_buffer)[slide_amount:], maxlen=WINDOW_SIZE)
-
-        except Exception as e:
-            # Optionally, print or log the exception: print("Error:", e)
-            continue
+            timestamps, values = reader.read()
+            if len(values) == 0:
+                time.sleep(IDLE_SECONDS)
+                continue
+            behind = backlog_age(timestamps) > BACKLOG_SECONDS
+
+            if progressive is not None:
+                if behind:
+                    # Restart the early exits on the newest samples
+                    timestamps, values = timestamps[-WINDOW_SIZE:], values[-WINDOW_SIZE:]
+                    data_buffer.clear()
+                    timestamps_buffer.clear()
+                    progressive.reset()
+                    decisions.reset()
+                for current_time, value in zip(timestamps, values):
+                    data_buffer.append(value)
+                    timestamps_buffer.append(current_time)
+                    decision = progressive.update(data_buffer, timestamps_buffer, CONFIDENCE_THRESHOLD)
+                    if decision is not None:
+                        event = decisions.update(progressive.last_prediction)
+                        if event is not None and event[1] is not None:
+                            predicted_label, max_prob, n = decision
+                            print(f"Predicted movement: {predicted_label} (Confidence: {max_prob:.2f}, {n} samples)")
+                        # The decided samples belong to this gesture; start a fresh window
+                        data_buffer.clear()
+                        timestamps_buffer.clear()
+                        progressive.reset()
+                    elif progressive.finished:
+                        # No confident decision on this window, so the next one may repeat the movement
+                        decisions.release()
+                        slide_amount = int(WINDOW_SIZE * (1 - OVERLAP_PERCENTAGE))
+                        data_buffer = deque(list(data_buffer)[slide_amount:], maxlen=WINDOW_SIZE)
+                        timestamps_buffer = deque(list(timestamps_buffer)[slide_amount:], maxlen=WINDOW_SIZE)
+                        progressive.reset()
+
+            else:
+                # Report a movement once when its smoothed confidence rises above the threshold
+                if behind:
+                    fired = classifier.catch_up(timestamps, values, CATCH_UP_MODE)
+                else:
+                    fired = classifier.push(timestamps, values)
+                for decision in fired:
+                    if decision.action is None:
+                        continue
+                    max_prob = decisions.scores[decisions.active]
+                    print(f"Predicted movement: {decision.label} (Confidence: {max_prob:.2f})")
+
+        except (ValueError, serial.SerialException) as e:
+            # A failed or garbled serial read; the next one continues the stream
+            print(f"Serial read error: {e}")
+        except Exception:
+            traceback.print_exc()
 
 except KeyboardInterrupt:
     print("Exiting real-time classification...")
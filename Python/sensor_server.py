@@ -0,0 +1,310 @@
+"""
+sensor_server.py
+
+One asyncio process for all the stations of a facility, instead of one
+copy of real_time_classification.py (and one model runtime) per station.
+Every station has its own serial sensor, its user's model bundle and
+gesture map, and publishes its decisions on its own controller_link
+address, exactly like controller_daemon.py.
+
+- readers: one coroutine per sensor polls its port without blocking
+  (in_waiting) and turns every complete line read so far into one chunk;
+- backpressure: a station's chunks wait in its own StreamBuffer, capped at
+  STREAM_CAPACITY samples. A station whose classification falls behind
+  drops its own oldest samples (counted in its stats) and carries on with
+  fresh ones; no other station ever waits for it;
+- publishing: a station's DecisionPublisher never blocks the event loop.
+  Its client sockets are non-blocking with a bounded backlog each, and a
+  subscriber that stops reading is disconnected once it falls
+  MAX_BACKLOG_BYTES behind (counted in the status as dropped_subscribers);
+- inference: the windows of all stations go to one InferenceWorker, which
+  every TICK_SECONDS runs one forward pass per distinct bundle over all
+  the windows queued since the last tick. Stations that name the same
+  bundle file share one bundle. CNN and drift-adapting stations keep
+  per-sample / per-user model state and classify inline. A station waits
+  for each window's result before the next, so it gets at most one window
+  per tick: keep TICK_SECONDS below hop / sample rate (100 ms by default).
+  A station that finds a backlog of stale samples (older than
+  BACKLOG_SECONDS) catches up on it in one step with
+  LiveClassifier.catch_up() instead.
+
+Stations are listed in a JSON file:
+
+    [{"name": "station1", "port": "COM4", "bundle": "alice.npz",
+      "map": {"clench": "jump", "wrist": "duck"}, "address": "tcp:0.0.0.0:5001"},
+     {"name": "station2", "port": "COM5", "bundle": "bob.npz", "adapt": true}]
+
+port is any pyserial port name or URL; "loop://" is a virtual port
+(bench_sensor_server.py drives N of them with synthetic signals and shows
+how throughput scales with the number of users).
+
+Usage:
+    python sensor_server.py stations.json
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+
+import numpy as np
+import serial
+
+from controller_daemon import HELD_ACTIONS, HOP, publish_decision
+from controller_link import ACTION_CODES, ACTIONS, KIND_STOP, DecisionPublisher, default_address
+from live_classifier import BACKLOG_SECONDS, LiveClassifier, backlog_age
+from model_bundle import BUNDLE_FILE, load_bundle
+from sensor_stream import DEFAULT_BAUDRATE, SerialReader
+
+POLL_SECONDS = 0.005  # Sleep between reads of a port
+TICK_SECONDS = 0.01  # Batching interval of the inference worker
+STREAM_CAPACITY = 500  # Samples queued per station before its oldest are dropped (5 s at 100 Hz)
+LATENCY_HISTORY = 1000  # Windows kept per station for the latency percentiles
+STATUS_SECONDS = 10.0
+DEFAULT_MAP = {"clench": "jump", "wrist": "duck"}
+
+
+def open_port(port, baudrate=DEFAULT_BAUDRATE):
+    """A non-blocking pyserial port for a port name or URL ("loop://" for a virtual one)."""
+    ser = serial.serial_for_url(port, baudrate, timeout=0)
+    ser.reset_input_buffer()
+    return ser
+
+
+class StreamBuffer:
+    """Bounded queue of one station's sample chunks that drops its oldest samples when full."""
+
+    def __init__(self, capacity=STREAM_CAPACITY):
+        self.capacity = capacity
+        self._chunks = deque()
+        self._size = 0
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def __len__(self):
+        return self._size
+
+    def put(self, timestamps, values):
+        self._chunks.append((timestamps, values))
+        self._size += len(values)
+        while self._size > self.capacity:
+            first_timestamps, first_values = self._chunks[0]
+            excess = self._size - self.capacity
+            if len(first_values) <= excess:
+                self._chunks.popleft()
+                excess = len(first_values)
+            else:
+                self._chunks[0] = (first_timestamps[excess:], first_values[excess:])
+            self._size -= excess
+            self.dropped += excess
+        self._ready.set()
+
+    async def get(self):
+        """Wait for samples, then return (timestamps, values) of everything queued."""
+        while not self._chunks:
+            self._ready.clear()
+            await self._ready.wait()
+        chunks, self._chunks = self._chunks, deque()
+        self._size = 0
+        if len(chunks) == 1:
+            return chunks[0]
+        return np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])
+
+
+class InferenceWorker:
+    """Collects windows from all stations and predicts them in one batch per bundle every tick."""
+
+    def __init__(self, tick=TICK_SECONDS):
+        self.tick = tick
+        self._pending = {}  # id(bundle) -> (bundle, features, futures)
+        self.passes = 0
+        self.windows = 0
+        self.largest_batch = 0
+
+    def predict(self, bundle, features):
+        """Future of the probabilities of one window's features, shape (1, num_features)."""
+        future = asyncio.get_running_loop().create_future()
+        _, batch, futures = self._pending.setdefault(id(bundle), (bundle, [], []))
+        batch.append(features)
+        futures.append(future)
+        return future
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+        for bundle, batch, futures in pending.values():
+            try:
+                probabilities = bundle.predict(np.concatenate(batch))
+            except Exception as error:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.passes += 1
+            self.windows += len(futures)
+            self.largest_batch = max(self.largest_batch, len(futures))
+            for future, p in zip(futures, probabilities):
+                if not future.done():
+                    future.set_result(p)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self.flush()
+
+
+class Station:
+    def __init__(self, name, port, bundle, gestures, publisher=None, address=None, publish_probabilities=True,
+                 hop=HOP, held_actions=HELD_ACTIONS, adapt=False, capacity=STREAM_CAPACITY, catch_up="batch"):
+        """
+        port: an open pyserial port (see open_port).
+        gestures: class name -> game action, as for ControllerDaemon.
+        catch_up: LiveClassifier.catch_up mode for backlogs, None to classify them normally.
+        """
+        self.name = name
+        self.port = port
+        self.bundle = bundle
+        self.gestures = {label: action for label, action in gestures.items() if action in ACTION_CODES}
+        self.classifier = LiveClassifier(bundle, self.gestures, hop=hop, held_actions=held_actions, adapt=adapt)
+        self.catch_up = catch_up
+        self.publish_probabilities = publish_probabilities
+        self.publisher = publisher or DecisionPublisher(address or default_address(f"ugc-{name}"))
+        self.publisher.set_hello({"classes": bundle.classes, "actions": ACTIONS, "gestures": self.gestures,
+                                  "station": name})
+        self._class_index = {label: i for i, label in enumerate(bundle.classes)}
+        self.buffer = StreamBuffer(capacity)
+        self.reader = SerialReader(port)
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self.decisions = 0
+
+    def _on_window(self, timestamp, probabilities):
+        self.latencies.append(time.time() - timestamp)
+        if self.publish_probabilities:
+            self.publisher.publish_probabilities(probabilities, timestamp)
+
+    async def read_sensor(self):
+        """Move every complete line from the port into the stream buffer."""
+        while True:
+            timestamps, values = self.reader.read()
+            if len(values):
+                self.buffer.put(timestamps, values)
+            await asyncio.sleep(POLL_SECONDS)
+
+    async def classify(self, worker):
+        """Classify the buffered samples window by window and publish the decisions."""
+        classifier = self.classifier
+        while True:
+            timestamps, values = await self.buffer.get()
+            if self.catch_up is not None and backlog_age(timestamps) > BACKLOG_SECONDS:
+                fired = classifier.catch_up(timestamps, values, self.catch_up, self._on_window)
+                end = None
+            else:
+                fired = []
+                end = classifier.advance(timestamps, values, 0, fired)
+            while end is not None:
+                if classifier.batchable:
+                    probabilities = await worker.predict(self.bundle, classifier.window_features())
+                else:
+                    probabilities = classifier.window_probabilities()
+                classifier.complete(timestamps[end - 1], probabilities, fired, self._on_window)
+                end = classifier.advance(timestamps, values, end, fired)
+            for decision in fired:
+                publish_decision(self.publisher, self._class_index, decision)
+            self.decisions += len(fired)
+
+    def status(self):
+        latencies = np.asarray(self.latencies)
+        return {
+            "station": self.name,
+            "samples": self.reader.samples_read,
+            "windows": self.classifier.windows_classified,
+            "decisions": self.decisions,
+            "dropped": self.buffer.dropped,
+            "catch_ups": self.classifier.catch_ups,
+            "parse_errors": self.reader.parse_errors,
+            "dropped_subscribers": self.publisher.dropped_subscribers,
+            "latency_p50_ms": 1000 * float(np.median(latencies)) if len(latencies) else None,
+            "latency_p99_ms": 1000 * float(np.percentile(latencies, 99)) if len(latencies) else None,
+        }
+
+    def close(self):
+        self.publisher.publish(KIND_STOP)
+        self.publisher.close()
+        self.port.close()
+
+
+class SensorServer:
+    def __init__(self, stations, tick=TICK_SECONDS):
+        self.stations = stations
+        self.worker = InferenceWorker(tick)
+
+    async def _report(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            for status in (station.status() for station in self.stations):
+                latency = status["latency_p50_ms"]
+                print(f"{status['station']}: {status['windows']} windows, {status['decisions']} decisions, "
+                      f"{status['dropped']} dropped, latency p50 "
+                      f"{'-' if latency is None else f'{latency:.1f} ms'}")
+
+    async def run(self, duration=None, status_interval=STATUS_SECONDS):
+        """Serve every station (for duration seconds, or until cancelled)."""
+        tasks = [asyncio.create_task(self.worker.run())]
+        for station in self.stations:
+            tasks.append(asyncio.create_task(station.read_sensor()))
+            tasks.append(asyncio.create_task(station.classify(self.worker)))
+        if status_interval:
+            tasks.append(asyncio.create_task(self._report(status_interval)))
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks)
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        for station in self.stations:
+            station.close()
+
+
+def load_stations(config, baudrate=DEFAULT_BAUDRATE):
+    """Stations from a list of station dicts (see the module docstring)."""
+    bundles = {}
+    stations = []
+    for i, entry in enumerate(config):
+        path = os.path.abspath(entry.get("bundle", BUNDLE_FILE))
+        if path not in bundles:
+            bundles[path] = load_bundle(path)
+        stations.append(Station(entry.get("name", f"station{i + 1}"), open_port(entry["port"], baudrate),
+                                bundles[path], entry.get("map", DEFAULT_MAP), address=entry.get("address"),
+                                hop=entry.get("hop", HOP), adapt=entry.get("adapt", False),
+                                catch_up=entry.get("catch_up", "batch")))
+    return stations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("config", help="JSON list of stations")
+    parser.add_argument("--baudrate", type=int, default=DEFAULT_BAUDRATE)
+    parser.add_argument("--tick", type=float, default=TICK_SECONDS, help="batching interval in seconds")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        server = SensorServer(load_stations(json.load(f), args.baudrate), args.tick)
+    for station in server.stations:
+        print(f"{station.name}: {station.port.name} -> {station.publisher.address} ({station.bundle.classes})")
+    print("Press Ctrl+C to stop.")
+    try:
+        asyncio.run(server.run())
+    except KeyboardInterrupt:
+        print("Stopping sensor server...")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+sensor_stream.py
+
+Reads the EMG sensor on a background thread so GUIs (Tk mainloop, pygame
+loop) never block on serial I/O.
+
+The reader thread parses the integer lines printed by emg_sensor.ino and
+appends (timestamp, value) pairs to every subscriber's queue. Consumers
+call drain() on their queue from their own thread to get all samples
+that arrived since the last call.
+
+Loops that poll the port themselves use a SerialReader instead: one bulk,
+non-blocking read of everything waiting per call rather than one
+readline() per sample, so a loop that stalled gets the whole backlog at
+once (and can tell from the sample timestamps how far behind it is).
+"""
+
+import time
+import threading
+from collections import deque
+
+import numpy as np
+import serial
+
+DEFAULT_PORT = 'COM4'
+DEFAULT_BAUDRATE = 9600
+SAMPLE_RATE = 100  # Hz, as sent by emg_sensor.ino
+# Samples kept per subscriber if it stops draining (a minute at 100 Hz)
+SUBSCRIBER_CAPACITY = 6000
+
+
+class SampleQueue:
+    """Bounded single-consumer queue of (timestamp, value) samples."""
+
+    def __init__(self, capacity=SUBSCRIBER_CAPACITY):
+        self._samples = deque(maxlen=capacity)
+
+    def put(self, timestamp, value):
+        # deque.append is atomic, so the reader thread needs no lock
+        self._samples.append((timestamp, value))
+
+    def drain(self):
+        """Return (timestamps, values) arrays of every sample queued so far."""
+        count = len(self._samples)
+        timestamps = np.empty(count)
+        values = np.empty(count, dtype=np.int64)
+        for i in range(count):
+            timestamps[i], values[i] = self._samples.popleft()
+        return timestamps, values
+
+
+class LineParser:
+    """Integer samples from serial bytes; a partial last line waits for the next read."""
+
+    def __init__(self):
+        self._partial = b""
+        self.errors = 0
+
+    def feed(self, data):
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        values = []
+        for line in lines:
+            try:
+                values.append(int(line.decode('latin-1').strip()))
+            except ValueError:
+                self.errors += 1
+        return values
+
+
+class SerialReader:
+    def __init__(self, ser, sample_rate=SAMPLE_RATE):
+        """ser: an open pyserial port; read() never blocks on it."""
+        self.ser = ser
+        self.sample_rate = sample_rate
+        self.parser = LineParser()
+        self.samples_read = 0
+        self._last_timestamp = 0.0
+
+    @property
+    def parse_errors(self):
+        return self.parser.errors
+
+    def read(self):
+        """
+        (timestamps, values) arrays of every complete line waiting on the
+        port. Samples of one read arrived together: their timestamps are
+        spaced at the sample rate and end at the time of the read.
+        """
+        waiting = self.ser.in_waiting
+        values = self.parser.feed(self.ser.read(waiting)) if waiting else None
+        if not values:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        now = time.time()
+        start = max(now - (len(values) - 1) / self.sample_rate, self._last_timestamp)
+        self._last_timestamp = now
+        self.samples_read += len(values)
+        return np.linspace(start, now, len(values)), np.array(values, dtype=np.int64)
+
+
+class SensorStream:
+    def __init__(self, port=DEFAULT_PORT, baudrate=DEFAULT_BAUDRATE):
+        self.port = port
+        self.baudrate = baudrate
+        self.ser = None
+        self._subscribers = []
+        self._thread = None
+        self._running = False
+        self.samples_read = 0
+        self.parse_errors = 0
+
+    def subscribe(self, capacity=SUBSCRIBER_CAPACITY):
+        queue = SampleQueue(capacity)
+        self._subscribers = self._subscribers + [queue]
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers = [q for q in self._subscribers if q is not queue]
+
+    def start(self):
+        """Open the serial port and start the reader thread."""
+        self.ser = serial.Serial(self.port, self.baudrate, timeout=0.1)
+        self.ser.reset_input_buffer()
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, name="sensor-reader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.ser is not None:
+            self.ser.close()
+            self.ser = None
+
+    def _read_loop(self):
+        while self._running:
+            line = self.ser.readline()
+            if not line:
+                continue
+            try:
+                value = int(line.decode('latin-1').strip())
+            except ValueError:
+                self.parse_errors += 1
+                continue
+            timestamp = time.time()
+            self.samples_read += 1
+            for queue in self._subscribers:
+                queue.put(timestamp, value)
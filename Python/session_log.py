@@ -0,0 +1,173 @@
+"""
+session_log.py
+
+Compact binary session logs, so a reported problem ("it missed my jump")
+can be replayed exactly (see UI/session_replay.py).
+
+A log starts with MAGIC and is followed by records:
+
+    type (uint8), timestamp (float64), payload length (uint32), payload
+
+- REC_META: JSON, configuration needed to replay (bundle, hop, seed, ...)
+- REC_SAMPLES: a chunk of raw sensor samples (float64 timestamps, int32 values)
+- REC_DECISION: kind, class index, action code, intensity, float32 probabilities
+- REC_INPUT: one game-engine input (op, three float64 arguments)
+- REC_EVENT: JSON, outcomes worth checking on replay (e.g. a death)
+
+SessionRecorder only encodes on the calling thread and appends to a list;
+a background thread writes the batches every FLUSH_INTERVAL and fsyncs
+every fsync_interval, so the sensor and game loops never wait on the disk.
+A log cut short by a crash reads up to its last complete record.
+"""
+
+import os
+import json
+import time
+import struct
+import threading
+
+import numpy as np
+
+MAGIC = b"UGCLOG1\n"
+RECORD = struct.Struct('<BdI')
+DECISION = struct.Struct('<BBBf')
+INPUT = struct.Struct('<Bddd')
+
+REC_META = 0
+REC_SAMPLES = 1
+REC_DECISION = 2
+REC_INPUT = 3
+REC_EVENT = 4
+
+DECISION_KINDS = ["action", "press", "release"]
+NO_ACTION = 255
+
+CONTROLLER_LOG = "controller.ugclog"
+GAME_LOG = "game.ugclog"
+FLUSH_INTERVAL = 0.05  # Seconds between batched writes
+FSYNC_INTERVAL = 1.0
+
+
+def new_session_dir(root):
+    """Create and return root/<date-time> for a new session's logs."""
+    path = os.path.join(root, time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class SessionRecorder:
+    def __init__(self, path, meta=None, fsync_interval=FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self.records = 0
+        self.bytes_written = len(MAGIC)
+        if meta:
+            self.meta(meta)
+        self._thread = threading.Thread(target=self._writer, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record_type, payload, timestamp=None):
+        record = RECORD.pack(record_type, time.time() if timestamp is None else timestamp, len(payload)) + payload
+        with self._lock:
+            self._pending.append(record)
+
+    def meta(self, meta):
+        self.write(REC_META, json.dumps(meta).encode())
+
+    def event(self, event):
+        self.write(REC_EVENT, json.dumps(event).encode())
+
+    def samples(self, timestamps, values):
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.int32)
+        self.write(REC_SAMPLES, timestamps.tobytes() + values.tobytes(),
+                   timestamp=float(timestamps[-1]) if len(timestamps) else None)
+
+    def decision(self, timestamp, kind, label_index, action_code=None, intensity=None, probabilities=None):
+        payload = DECISION.pack(DECISION_KINDS.index(kind), label_index,
+                                NO_ACTION if action_code is None else action_code,
+                                float("nan") if intensity is None else intensity)
+        if probabilities is not None:
+            payload += np.asarray(probabilities, dtype=np.float32).tobytes()
+        self.write(REC_DECISION, payload, timestamp)
+
+    def input(self, op, a=0.0, b=0.0, c=float("nan")):
+        self.write(REC_INPUT, INPUT.pack(op, a, b, c))
+
+    def _flush(self, sync):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            data = b"".join(batch)
+            self._file.write(data)
+            self.records += len(batch)
+            self.bytes_written += len(data)
+        if sync:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _writer(self):
+        last_sync = time.monotonic()
+        while not self._closed.wait(FLUSH_INTERVAL):
+            now = time.monotonic()
+            sync = now - last_sync >= self.fsync_interval
+            self._flush(sync)
+            if sync:
+                last_sync = now
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join()
+        self._flush(sync=True)
+        self._file.close()
+
+
+def read_log(path):
+    """Yield (type, timestamp, payload) for every complete record in the log."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a session log")
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            record_type, timestamp, length = RECORD.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield record_type, timestamp, payload
+
+
+def decode_samples(payload):
+    """(timestamps, values) of a REC_SAMPLES payload."""
+    n = len(payload) // 12
+    return np.frombuffer(payload, np.float64, n), np.frombuffer(payload, np.int32, n, offset=8 * n)
+
+
+def decode_decision(payload):
+    """(kind, label_index, action_code or None, intensity or None, probabilities or None)."""
+    kind, label_index, action_code, intensity = DECISION.unpack_from(payload)
+    probabilities = np.frombuffer(payload, np.float32, offset=DECISION.size) if len(payload) > DECISION.size else None
+    return (DECISION_KINDS[kind], label_index, None if action_code == NO_ACTION else action_code,
+            None if np.isnan(intensity) else intensity, probabilities)
+
+
+def decode_input(payload):
+    """(op, a, b, c) of a REC_INPUT payload."""
+    return INPUT.unpack(payload)
+
+
+def read_meta(path):
+    """All REC_META records of a log merged into one dict."""
+    meta = {}
+    for record_type, _, payload in read_log(path):
+        if record_type == REC_META:
+            meta.update(json.loads(payload.decode()))
+    return meta
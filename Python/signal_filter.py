@@ -0,0 +1,104 @@
+"""
+signal_filter.py
+
+Causal filtering of the raw sensor signal, sample by sample or chunk by
+chunk, so it can run on live data.
+
+EnvelopeFilter removes the resting baseline of the signal, rectifies it,
+and smooths the result into an amplitude envelope, i.e. a "how hard is the
+muscle contracting" signal. The baseline follows the signal down quickly
+but up only very slowly, so it tracks the resting level (electrode offset,
+drift) without creeping up during a sustained contraction.
+
+BaselineFilter removes the same baseline but keeps the signal's shape
+(no rectification or smoothing); it is the input of the raw-sample CNN
+(streaming_cnn.py).
+
+Filters report their settings with config(), which is stored in model
+bundles, and make_filter() rebuilds a filter from such a config.
+"""
+
+import numpy as np
+
+
+class EnvelopeFilter:
+    def __init__(self, baseline_alpha=0.0005, baseline_down_alpha=0.05, envelope_alpha=0.15):
+        """
+        baseline_alpha: EMA weight of the baseline when the signal is above it (small = slow).
+        baseline_down_alpha: EMA weight of the baseline when the signal is below it.
+        envelope_alpha: EMA weight of the envelope smoother (large = fast).
+        """
+        self.baseline_alpha = baseline_alpha
+        self.baseline_down_alpha = baseline_down_alpha
+        self.envelope_alpha = envelope_alpha
+        self.baseline = None
+        self.envelope = 0.0
+
+    def config(self):
+        """Filter settings, in the form stored in model bundles."""
+        return {"type": "envelope", "baseline_alpha": self.baseline_alpha,
+                "baseline_down_alpha": self.baseline_down_alpha, "envelope_alpha": self.envelope_alpha}
+
+    def reset(self):
+        self.baseline = None
+        self.envelope = 0.0
+
+    def update(self, value):
+        """Filter one sample and return the current envelope."""
+        if self.baseline is None:
+            self.baseline = float(value)
+        alpha = self.baseline_alpha if value > self.baseline else self.baseline_down_alpha
+        self.baseline += alpha * (value - self.baseline)
+        self.envelope += self.envelope_alpha * (abs(value - self.baseline) - self.envelope)
+        return self.envelope
+
+    def process(self, values, out=None):
+        """Filter a chunk of samples, returning the envelope for each one."""
+        if out is None:
+            out = np.empty(len(values))
+        for i, value in enumerate(values):
+            out[i] = self.update(value)
+        return out
+
+
+class BaselineFilter:
+    def __init__(self, baseline_alpha=0.0005, baseline_down_alpha=0.05):
+        """Same baseline tracking as EnvelopeFilter; the output is value - baseline."""
+        self.baseline_alpha = baseline_alpha
+        self.baseline_down_alpha = baseline_down_alpha
+        self.baseline = None
+
+    def config(self):
+        return {"type": "baseline", "baseline_alpha": self.baseline_alpha,
+                "baseline_down_alpha": self.baseline_down_alpha}
+
+    def reset(self):
+        self.baseline = None
+
+    def update(self, value):
+        """Filter one sample and return it relative to the current baseline."""
+        if self.baseline is None:
+            self.baseline = float(value)
+        alpha = self.baseline_alpha if value > self.baseline else self.baseline_down_alpha
+        self.baseline += alpha * (value - self.baseline)
+        return value - self.baseline
+
+    def process(self, values, out=None):
+        """Filter a chunk of samples, returning each one relative to the baseline."""
+        if out is None:
+            out = np.empty(len(values))
+        for i, value in enumerate(values):
+            out[i] = self.update(value)
+        return out
+
+
+FILTERS = {"envelope": EnvelopeFilter, "baseline": BaselineFilter}
+
+
+def make_filter(config):
+    """A new filter from a config() dict (e.g. a bundle's filter_config)."""
+    options = dict(config)
+    kind = options.pop("type")
+    if kind not in FILTERS:
+        raise ValueError(f"Unknown filter type: {kind}")
+    return FILTERS[kind](**options)
@@ -0,0 +1,203 @@
+"""
+streaming_cnn.py
+
+Sample-by-sample inference for "cnn" model bundles: a small causal 1D CNN
+on the filtered raw signal (trained with model_training.py --cnn).
+
+Re-running the network over the whole window for every new sample repeats
+almost all of its work. StreamingCNN instead keeps, for every convolution,
+a ring buffer of the inputs its taps still need (its receptive-field state)
+and the running sum of the last pool_size outputs of the last layer, so a
+new sample costs one output row per layer plus one pooling update. The
+output layer only runs when probabilities are asked for (every hop).
+
+Once a full window has been pushed, its probabilities equal the bundle's
+full-window predict() on the same filtered samples. Running this script
+checks that (parity; it exits non-zero if they differ by more than
+PARITY_TOLERANCE) and benchmarks both per sample:
+
+    python streaming_cnn.py --bundle emg_classifier_cnn.npz
+    python streaming_cnn.py --recording data/data_clench_1.csv
+
+Without a bundle a randomly initialized network with the default
+architecture is used.
+"""
+
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from model_bundle import ModelBundle, load_bundle
+from signal_filter import BaselineFilter, make_filter
+
+CNN_INPUT = ["filtered"]  # feature_columns of CNN bundles
+CNN_CHANNELS = 8
+CNN_KERNEL = 3
+CNN_DILATIONS = [1, 2, 4, 8]
+CNN_BUNDLE_FILE = "emg_classifier_cnn.npz"
+PARITY_TOLERANCE = 1e-6  # Largest probability difference allowed between streaming and full window
+
+
+class StreamingCNN:
+    def __init__(self, bundle):
+        """bundle: a "cnn" ModelBundle; samples are filtered with its filter_config."""
+        self.bundle = bundle
+        self.filter = make_filter(bundle.filter_config)
+        self._mean = 0.0 if bundle.norm_mean is None else float(np.ravel(bundle.norm_mean)[0])
+        self._std = 1.0 if bundle.norm_std is None else float(np.ravel(bundle.norm_std)[0])
+        self._head = bundle._layers[-1]
+        self._layers = []
+        for w, b, d in bundle.conv_layers:
+            taps, inputs, _ = w.shape
+            size = (taps - 1) * d + 1
+            # Ring position of every tap for each write position, oldest tap first
+            table = (np.arange(size)[:, None] - (taps - 1 - np.arange(taps))[None, :] * d) % size
+            self._layers.append([np.zeros((size, inputs)), table, w.reshape(taps * inputs, -1), b, 0])
+        channels = len(bundle.conv_layers[-1][1])
+        self._pool = np.zeros((bundle.pool_size, channels))
+        self._pool_sum = np.zeros(channels)
+        self._pool_pos = 0
+        self._input = np.zeros(1)
+        self.samples = 0
+
+    def reset(self):
+        self.filter.reset()
+        for layer in self._layers:
+            layer[0].fill(0)
+            layer[4] = 0
+        self._pool.fill(0)
+        self._pool_sum.fill(0)
+        self._pool_pos = 0
+        self.samples = 0
+
+    @property
+    def ready(self):
+        """True once a full window has been pushed."""
+        return self.samples >= self.bundle.window_size
+
+    def push(self, value):
+        """Filter one raw sample and advance every layer by one step."""
+        x = self._input
+        x[0] = (self.filter.update(value) - self._mean) / self._std
+        for layer in self._layers:
+            ring, table, w, b, pos = layer
+            ring[pos] = x
+            x = ring[table[pos]].reshape(-1) @ w
+            x += b
+            np.maximum(x, 0, out=x)
+            layer[4] = pos + 1 if pos + 1 < len(ring) else 0
+
+        pos = self._pool_pos
+        self._pool_sum += x
+        self._pool_sum -= self._pool[pos]
+        self._pool[pos] = x
+        pos += 1
+        if pos == len(self._pool):
+            pos = 0
+            # Recompute the running sum exactly once per lap so rounding never accumulates
+            self._pool.sum(axis=0, out=self._pool_sum)
+        self._pool_pos = pos
+        self.samples += 1
+
+    def probabilities(self):
+        """Class probabilities of the latest window, shape (num_classes,)."""
+        w, b = self._head
+        x = (self._pool_sum / len(self._pool)) @ w
+        x += b
+        x -= x.max()
+        np.exp(x, out=x)
+        x /= x.sum()
+        return x
+
+
+def random_bundle(classes=("clench", "index", "rest", "wrist"), window_size=200, seed=0):
+    """An untrained CNN bundle with the default architecture (for checks and benchmarks)."""
+    rng = np.random.default_rng(seed)
+    weights = []
+    inputs = 1
+    for _ in CNN_DILATIONS:
+        weights += [rng.normal(0, 1 / np.sqrt(CNN_KERNEL * inputs), (CNN_KERNEL, inputs, CNN_CHANNELS)),
+                    rng.normal(0, 0.1, CNN_CHANNELS)]
+        inputs = CNN_CHANNELS
+    weights += [rng.normal(0, 1, (CNN_CHANNELS, len(classes))), np.zeros(len(classes))]
+    return ModelBundle(weights, classes, CNN_INPUT, window_size, window_size // 2, BaselineFilter().config(),
+                       [0.0], [50.0], "cnn", {"cnn": {"kernel": CNN_KERNEL, "dilations": CNN_DILATIONS}})
+
+
+def parity(bundle, values, checks=200):
+    """
+    Largest difference between the streaming probabilities and the
+    full-window predict() at checks points of the signal.
+    """
+    filtered = make_filter(bundle.filter_config).process(values)
+    n = bundle.window_size
+    at = set(np.linspace(n - 1, len(values) - 1, checks).astype(int))
+    stream = StreamingCNN(bundle)
+    worst = 0.0
+    for i, value in enumerate(values):
+        stream.push(value)
+        if i in at:
+            full = bundle.predict(filtered[i - n + 1:i + 1][None, :])[0]
+            worst = max(worst, float(np.abs(stream.probabilities() - full).max()))
+    return worst
+
+
+def benchmark(bundle, values, hop=None):
+    """Microseconds per sample: streaming (with probabilities every hop) and full-window recompute."""
+    hop = hop or bundle.hop
+    stream = StreamingCNN(bundle)
+    start = time.perf_counter()
+    for i, value in enumerate(values):
+        stream.push(value)
+        if i % hop == 0:
+            stream.probabilities()
+    streaming = (time.perf_counter() - start) / len(values)
+
+    filtered = make_filter(bundle.filter_config).process(values)
+    n = bundle.window_size
+    count = min(len(values) - n + 1, 2000)
+    start = time.perf_counter()
+    for i in range(count):
+        bundle.predict(filtered[i:i + n][None, :])
+    full = (time.perf_counter() - start) / count
+    return streaming * 1e6, full * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bundle", default=None, help=f"CNN bundle (default: {CNN_BUNDLE_FILE} if present)")
+    parser.add_argument("--recording", help="data_<label>_<timestamp>.csv to stream (default: synthetic signal)")
+    parser.add_argument("--samples", type=int, default=20000, help="length of the synthetic signal")
+    parser.add_argument("--tolerance", type=float, default=PARITY_TOLERANCE,
+                        help=f"largest allowed parity difference (default: {PARITY_TOLERANCE:g})")
+    args = parser.parse_args()
+
+    path = args.bundle or (CNN_BUNDLE_FILE if os.path.exists(CNN_BUNDLE_FILE) else None)
+    bundle = load_bundle(path) if path else random_bundle()
+    if bundle.model_type != "cnn":
+        parser.error(f"{path} is a {bundle.model_type!r} bundle, not a CNN")
+    if args.recording:
+        values = pd.read_csv(args.recording)["value"].values.astype(float)
+    else:
+        # Resting noise with bursts of contraction
+        rng = np.random.default_rng(0)
+        values = 300 + rng.normal(0, 5, args.samples)
+        bursts = rng.random(args.samples) < 0.002
+        values += 200 * np.convolve(bursts, np.ones(80), mode="same") * rng.normal(1, 0.3, args.samples)
+
+    print(f"{path or 'random CNN'}: window {bundle.window_size} samples, receptive field "
+          f"{bundle.receptive_field}, pooled over {bundle.pool_size}")
+    worst = parity(bundle, values)
+    print(f"Parity: max |streaming - full window| = {worst:.2e}")
+    if not worst <= args.tolerance:
+        raise SystemExit(f"Parity check failed: streaming differs from the full window by {worst:.2e} "
+                         f"(tolerance {args.tolerance:.0e})")
+    streaming, full = benchmark(bundle, values)
+    print(f"Per sample: streaming {streaming:.1f} us, full-window recompute {full:.1f} us ({full / streaming:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+uinput_output.py
+
+Turns controller decisions into synthetic keyboard / gamepad input through
+Linux uinput (python-evdev), so the EMG controller can play any game, not
+just gameUI.py.
+
+Each game action is mapped to a key or button and a mode:
+- "tap":  press and release tap_ms later (jump). Games that poll the key
+          state once per frame (pygame.key.get_pressed(), emulators) miss
+          a key that is released in the same frame, so the default
+          TAP_MS keeps it down for about two frames at 60 fps.
+- "hold": press on a gesture press, release on its release (duck). A
+          one-shot action on a hold mapping keeps the key down for hold_ms.
+
+A one-shot action on a key that a gesture press is already holding leaves
+it held until the gesture's release.
+
+The mapping can be loaded from a JSON file, e.g.
+    {"jump": {"key": "KEY_SPACE", "mode": "tap", "tap_ms": 34},
+     "duck": {"key": "KEY_DOWN", "mode": "hold", "hold_ms": 400}}
+Gamepad buttons (BTN_SOUTH, BTN_EAST, ...) work the same way.
+
+Injection latency (decision timestamp to uinput write) is measured for
+every event and summarized on exit.
+
+Usage (needs write access to /dev/uinput):
+    python uinput_output.py --address unix:/tmp/ugc.sock --config mapping.json
+"""
+
+import json
+import time
+import argparse
+
+import numpy as np
+
+try:
+    import evdev
+    from evdev import ecodes
+except ImportError:  # Only needed on Linux when this backend is used
+    evdev = None
+    ecodes = None
+
+from controller_client import ControllerClient
+
+TAP_MS = 34  # Key-down time of a tap: two frames at 60 fps
+HOLD_MS = 400  # Key-down time of a one-shot action on a hold mapping
+DEFAULT_MAPPING = {
+    "jump": {"key": "KEY_SPACE", "mode": "tap"},
+    "duck": {"key": "KEY_DOWN", "mode": "hold", "hold_ms": HOLD_MS},
+}
+DEVICE_NAME = "EMG Game Controller"
+POLL_SECONDS = 0.002  # Wake-up interval for timed releases
+
+
+class UInputOutput:
+    def __init__(self, mapping=None, device=None):
+        """
+        mapping: action -> {"key": evdev key/button name, "mode": "tap"|"hold", "tap_ms": int, "hold_ms": int}.
+        device: an object with write/syn/close (defaults to a new evdev.UInput).
+        """
+        self.mapping = mapping or DEFAULT_MAPPING
+        for action, entry in self.mapping.items():
+            if entry.get("mode", "tap") not in ("tap", "hold"):
+                raise ValueError(f"{action}: unknown mode {entry['mode']}")
+        if device is None:
+            if evdev is None:
+                raise RuntimeError("python-evdev is required for uinput output (pip install evdev)")
+            self.codes = {action: ecodes.ecodes[entry["key"]] for action, entry in self.mapping.items()}
+            device = evdev.UInput({ecodes.EV_KEY: sorted(set(self.codes.values()))}, name=DEVICE_NAME)
+            self.ev_key = ecodes.EV_KEY
+        else:
+            self.codes = {action: entry["key"] for action, entry in self.mapping.items()}
+            self.ev_key = 1
+        self.device = device
+        self.held = set()
+        self.release_at = {}  # action -> time of a scheduled release
+        self.latencies_ms = []
+        self.write_ms = []
+
+    def _key(self, action, down):
+        start = time.perf_counter()
+        self.device.write(self.ev_key, self.codes[action], 1 if down else 0)
+        self.device.syn()
+        self.write_ms.append((time.perf_counter() - start) * 1000)
+
+    def press(self, action):
+        if action not in self.held:
+            self._key(action, True)
+            self.held.add(action)
+
+    def release(self, action):
+        if action in self.held:
+            self._key(action, False)
+            self.held.discard(action)
+        self.release_at.pop(action, None)
+
+    def handle(self, event):
+        """Apply one ControllerEvent (kinds action / press / release)."""
+        action = event.action
+        if action not in self.mapping:
+            return
+        entry = self.mapping[action]
+        if event.kind == "press":
+            self.press(action)
+            # Held until the gesture's release, not until an earlier action's timeout
+            self.release_at.pop(action, None)
+        elif event.kind == "release":
+            self.release(action)
+        elif event.kind == "action":
+            held_by_press = action in self.held and action not in self.release_at
+            self.press(action)
+            if not held_by_press:
+                if entry.get("mode", "tap") == "tap":
+                    duration_ms = entry.get("tap_ms", TAP_MS)
+                else:
+                    duration_ms = entry.get("hold_ms", HOLD_MS)
+                when = time.time() + duration_ms / 1000
+                self.release_at[action] = max(when, self.release_at.get(action, when))
+        else:
+            return
+        self.latencies_ms.append((time.time() - event.timestamp) * 1000)
+
+    def tick(self, now=None):
+        """Perform releases whose hold time has passed."""
+        now = time.time() if now is None else now
+        for action, when in list(self.release_at.items()):
+            if now >= when:
+                self.release(action)
+
+    def release_all(self):
+        for action in list(self.held):
+            self.release(action)
+
+    def stats(self):
+        """Median / p99 of decision-to-injection latency and of the uinput write itself, in ms."""
+        if not self.latencies_ms:
+            return None
+        latencies = np.array(self.latencies_ms)
+        writes = np.array(self.write_ms)
+        return {
+            "events": len(latencies),
+            "latency_median_ms": float(np.median(latencies)),
+            "latency_p99_ms": float(np.percentile(latencies, 99)),
+            "write_median_ms": float(np.median(writes)),
+            "write_p99_ms": float(np.percentile(writes, 99)),
+        }
+
+    def close(self):
+        self.release_all()
+        self.device.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inject EMG controller decisions as keyboard/gamepad input.")
+    parser.add_argument("--address", required=True, help="controller daemon address (unix:<path> or tcp:<host>:<port>)")
+    parser.add_argument("--config", help="JSON action mapping (default: jump=SPACE tap, duck=DOWN hold)")
+    args = parser.parse_args()
+
+    mapping = None
+    if args.config:
+        with open(args.config) as f:
+            mapping = json.load(f)
+    output = UInputOutput(mapping)
+    client = ControllerClient(args.address)
+    print(f"Injecting {sorted(output.mapping)} as '{DEVICE_NAME}'. Press Ctrl+C to stop.")
+    try:
+        while client.connected:
+            for event in client.wait(POLL_SECONDS):
+                if event.kind == "stop":
+                    raise KeyboardInterrupt
+                output.handle(event)
+            output.tick()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        output.close()
+        print("Injection stats:", output.stats())
+
+
+if __name__ == "__main__":
+    main()
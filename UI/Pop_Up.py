@@ -1,7 +1,33 @@
 import tkinter as tk
-from tkinter import ttk
-import subprocess
+from tkinter import ttk, messagebox
 import sys
+import os
+import time
+
+import serial
+
+# Sensor, recording and calibration helpers live next to the training scripts
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Python")
+sys.path.append(PYTHON_DIR)
+from sensor_stream import SensorStream, DEFAULT_PORT
+from motion_capture import save_recording, capture_features, closest_motion, DISTINCTNESS_THRESHOLD
+from model_bundle import load_bundle
+from calibration import calibrate
+from signal_visualizer import SignalHistory, TkSignalPlot
+from game_launcher import GameLauncher
+from session_log import new_session_dir
+
+SENSOR_PORT = DEFAULT_PORT
+DATA_FOLDER = os.path.join(PYTHON_DIR, "data")
+BASE_BUNDLE = os.path.join(PYTHON_DIR, "emg_classifier.npz")
+USER_BUNDLE = os.path.join(PYTHON_DIR, "emg_classifier_user.npz")
+# Record sensor data, decisions and game inputs of every game for session_replay.py
+RECORD_SESSIONS = True
+SESSIONS_FOLDER = os.path.join(PYTHON_DIR, "sessions")
+# Gesture -> action of the shared model, used if no calibration happened
+DEFAULT_GESTURES = {'clench': 'jump', 'wrist': 'duck'}
+CAPTURE_SECONDS = 3  # Length of each motion recording
+POLL_MS = 30  # How often the Tk loop collects samples from the sensor thread
 
 class MotionCaptureApp(tk.Tk):
     def __init__(self):
@@ -25,6 +51,36 @@ class MotionCaptureApp(tk.Tk):
         # State to track completed motions
         self.completed_motions = set()
         
+        # Captured recordings and their feature windows, by motion
+        self.recordings = {}
+        self.captured_features = {}
+        self.recording = None  # (timestamps, values) lists while capturing
+        self.capture_started = 0
+        self.duplicate_of = None
+        self.user_bundle = None
+        self.history = SignalHistory()
+        # Drives the live probability readout until the user's own head is calibrated
+        try:
+            self.readout_bundle = load_bundle(BASE_BUNDLE)
+        except (OSError, ValueError):
+            self.readout_bundle = None
+        
+        # The sensor is read on a background thread; the Tk loop polls it
+        self.sensor = SensorStream(SENSOR_PORT)
+        try:
+            self.sensor.start()
+            self.samples = self.sensor.subscribe()
+        except (serial.SerialException, OSError) as e:
+            messagebox.showerror("Sensor", f"Could not open sensor on {SENSOR_PORT}: {e}")
+            self.sensor = None
+            self.samples = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Load the game in the background while the user calibrates
+        self.launcher = GameLauncher(self.sensor,
+                                     session_dir=new_session_dir(SESSIONS_FOLDER) if RECORD_SESSIONS else None)
+        self.launcher.prewarm()
+        
         # Create and store all frames
         for F in (WelcomeFrame, MuscleSetupFrame, RequestMotionFrame, ErrorMotionFrame, 
                   CaptureMotionFrame, SuccessMotionFrame):
@@ -34,6 +90,7 @@ class MotionCaptureApp(tk.Tk):
         
         # Show the initial frame
         self.show_frame("WelcomeFrame")
+        self.after(POLL_MS, self.poll_sensor)
     
     def show_frame(self, frame_name):
         """Raise the specified frame to the top"""
@@ -50,6 +107,78 @@ class MotionCaptureApp(tk.Tk):
         self.current_motion = motion_type
         self.show_frame("RequestMotionFrame")
     
+    def poll_sensor(self):
+        """Move new samples from the sensor thread into the plot and the active recording"""
+        if self.samples is not None:
+            timestamps, values = self.samples.drain()
+            self.history.extend(timestamps, values)
+            if self.recording is not None:
+                self.recording[0].extend(timestamps)
+                self.recording[1].extend(values)
+                self.check_capture()
+            self.frames["CaptureMotionFrame"].plot.refresh()
+        self.after(POLL_MS, self.poll_sensor)
+    
+    def begin_capture(self):
+        self.recording = ([], [])
+        self.capture_started = time.time()
+        self.duplicate_of = None
+    
+    def cancel_capture(self):
+        self.recording = None
+        self.show_frame("RequestMotionFrame")
+    
+    def check_capture(self):
+        """Score the capture so far against the other motions; stop when done or duplicate"""
+        timestamps, values = self.recording
+        elapsed = time.time() - self.capture_started
+        others = {m: f for m, f in self.captured_features.items() if m != self.current_motion}
+        features = capture_features(timestamps, values)
+        label, score = closest_motion(features, others)
+        self.frames["CaptureMotionFrame"].update_status(max(0, CAPTURE_SECONDS - elapsed), label, score)
+        
+        # Give the score half the capture to settle before calling it a duplicate
+        if label is not None and score < DISTINCTNESS_THRESHOLD and elapsed >= CAPTURE_SECONDS / 2:
+            self.recording = None
+            self.duplicate_of = label
+            self.show_frame("ErrorMotionFrame")
+        elif elapsed >= CAPTURE_SECONDS:
+            self.finish_capture(features)
+    
+    def finish_capture(self, features):
+        timestamps, values = self.recording
+        self.recording = None
+        save_recording(self.current_motion, timestamps, values, DATA_FOLDER)
+        self.recordings[self.current_motion] = (values, timestamps)
+        self.captured_features[self.current_motion] = features
+        self.calibrate()
+        self.show_frame("SuccessMotionFrame")
+    
+    def calibrate(self):
+        """Refit the classifier head on the captured motions (takes milliseconds)"""
+        if len(self.recordings) < 2:
+            return
+        try:
+            base = load_bundle(BASE_BUNDLE)
+            self.user_bundle = calibrate(base, {m: [r] for m, r in self.recordings.items()})
+            self.user_bundle.save(USER_BUNDLE)
+            self.frames["CaptureMotionFrame"].plot.bundle = self.user_bundle
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Calibration", f"Could not calibrate: {e}")
+    
+    def on_close(self):
+        self.launcher.stop()
+        if self.sensor is not None:
+            self.sensor.stop()
+        self.destroy()
+    
+    def watch_game(self):
+        """Keep the sensor and model alive while the game runs; close with it"""
+        if self.launcher.running():
+            self.after(500, self.watch_game)
+        else:
+            self.on_close()
+    
     def complete_motion_capture(self):
         """Mark the current motion as completed"""
         if self.current_motion:
@@ -57,12 +186,18 @@ class MotionCaptureApp(tk.Tk):
             self.current_motion = None
 
     def start_game(self):
-        """Launch the game UI"""
+        """Show the pre-initialized game and feed it decisions from this process"""
         try:
-            subprocess.Popen([sys.executable, "Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/UI/gameUI.py"])
-            self.quit()
+            if self.user_bundle is not None:
+                # Calibrated classes are the captured motions, named after their actions
+                self.launcher.start(self.user_bundle, {motion: motion for motion in self.completed_motions},
+                                    USER_BUNDLE)
+            else:
+                self.launcher.start(self.readout_bundle, DEFAULT_GESTURES, BASE_BUNDLE)
+            self.withdraw()
+            self.watch_game()
         except Exception as e:
-            tk.messagebox.showerror("Error", f"Could not start game: {str(e)}")
+            messagebox.showerror("Error", f"Could not start game: {str(e)}")
 
 class WelcomeFrame(tk.Frame):
     def __init__(self, parent, controller):
@@ -182,6 +317,7 @@ class RequestMotionFrame(tk.Frame):
 class ErrorMotionFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
+        self.controller = controller
         
         label1 = ttk.Label(self, text="Error 49", font=("Helvetica", 24))
         label1.pack(pady=20)
@@ -189,8 +325,8 @@ class ErrorMotionFrame(tk.Frame):
         label2 = ttk.Label(self, text="Try a different motion,", font=("Helvetica", 24))
         label2.pack(pady=10)
         
-        label3 = ttk.Label(self, text="this one was used for another action!", font=("Helvetica", 24))
-        label3.pack(pady=10)
+        self.label3 = ttk.Label(self, text="this one was used for another action!", font=("Helvetica", 24))
+        self.label3.pack(pady=10)
         
         button = tk.Button(
             self, 
@@ -200,26 +336,48 @@ class ErrorMotionFrame(tk.Frame):
             height=6
         )
         button.place(relx=0.5, rely=0.6, anchor=tk.CENTER)
+    
+    def on_show(self):
+        """Name the action the rejected motion was too similar to"""
+        if self.controller.duplicate_of:
+            self.label3.config(text=f"this one was used for {self.controller.duplicate_of.upper()}!")
 
 class CaptureMotionFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
         
-        label1 = ttk.Label(self, text="Motion captured!", font=("Helvetica", 24))
-        label1.pack(pady=20)
+        self.motion_label = ttk.Label(self, text="Please repeat", font=("Helvetica", 24))
+        self.motion_label.pack(pady=20)
+        
+        self.status_label = ttk.Label(self, text="", font=("Helvetica", 14))
+        self.status_label.pack(pady=10)
         
-        label2 = ttk.Label(self, text="Please repeat", font=("Helvetica", 24))
-        label2.pack(pady=20)
+        self.canvas = tk.Canvas(self, width=800, height=260, background="white")
+        self.canvas.pack(pady=10)
+        self.plot = TkSignalPlot(self.canvas, controller.history, controller.readout_bundle)
         
         button = tk.Button(
             self, 
-            text="Start", 
-            command=lambda: controller.show_frame("SuccessMotionFrame"), 
-            width=40, 
-            height=6
+            text="Cancel", 
+            command=controller.cancel_capture, 
+            width=20, 
+            height=2
         )
-        button.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+        button.pack(pady=10)
+    
+    def on_show(self):
+        """Start recording as soon as the frame is shown"""
+        motion_type = self.controller.current_motion.upper() if self.controller.current_motion else "MOTION"
+        self.motion_label.config(text=f"Please repeat your {motion_type} motion")
+        self.status_label.config(text="")
+        self.controller.begin_capture()
+    
+    def update_status(self, remaining, closest, score):
+        text = f"{remaining:.1f} s left"
+        if closest is not None:
+            text += f"  |  distinctness from {closest}: {score:.2f}"
+        self.status_label.config(text=text)
 
 class SuccessMotionFrame(tk.Frame):
     def __init__(self, parent, controller):
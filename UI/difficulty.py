@@ -0,0 +1,188 @@
+"""
+difficulty.py
+
+Adaptive difficulty for EMG play. Instead of a fixed speed ramp and a fixed
+obstacle cooldown, speed and spawn spacing follow what the player's EMG
+pipeline can actually do, measured live:
+
+- decision latency (gesture to decision in the game) and its spread,
+- false-positive rate (jumps with no obstacle to jump over),
+- confidence of the decisions, which sets the jump height (intensity).
+
+From these the controller keeps every obstacle reachable:
+
+- speed limit: an obstacle crosses the screen in SCREEN_TRAVEL_PX / speed.
+  That must leave time to react, to get the (compensated) decision through
+  the pipeline and to take off ahead of the obstacle, and for a ptero to
+  get the (uncompensated) duck down before it arrives.
+- speed floor: the faster the game, the shorter an obstacle is under the
+  Dino, so the wider the window in which a jump clears it. At low speed
+  that window can get narrower than the player's timing jitter.
+- spawn cooldown: consecutive obstacles must be at least one jump plus the
+  timing jitter apart, more with frequent false positives (a spurious jump
+  can leave the Dino in the air when the next real one is needed).
+
+Within [floor, limit] the speed still ramps up as in the original game.
+A floor above the limit cannot be met (no speed is safe for that player's
+timing); the limit, the narrowest overlap that is still reachable, comes
+closest. Runs start at the base speed moved into that range, and the
+speed climbs to a raised floor at no more than FLOOR_ACCELERATION: a
+sudden jump in speed would bring the next obstacle in closer behind the
+previous one than the spawn cooldown allows for.
+
+Until MIN_SAMPLES decisions have been measured the statistics are priors
+for a slow, jittery, false-positive-prone pipeline with low jumps, so the
+first obstacles of a session are reachable and spaced for every player;
+the false-positive rate starts from its prior weighted as PRIOR_SECONDS
+of play.
+Pure Python (no pygame) so difficulty_sim.py can run it headless.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from dino_physics import airtime, clear_interval
+
+FPS = 120  # The game advances obstacles by game_speed px per frame
+SCREEN_TRAVEL_PX = 1230  # Spawn x (1280) to the Dino (50)
+OVERLAP_PX = 180  # Horizontal distance over which the Dino and a cactus overlap (80 / 2 + 100 / 2, both sides)
+CLEAR_HEIGHT = 120  # Jump height (px) at which the Dino clears a cactus
+PTERO_TRAVEL_PX = 1250  # Ptero spawn x (1300) to the Dino
+PTERO_OVERLAP_PX = 164  # 80 / 2 + 84 / 2, both sides
+LOW_PTERO_CLEAR_HEIGHT = 91  # The lowest ptero is jumped over, the others ducked under
+
+BASE_SPEED = 7
+SPEED_RAMP = 0.0015  # Speed increase per frame, as in the original game
+MAX_SPEED = 30
+FLOOR_ACCELERATION = 0.5  # Fastest climb towards the speed floor, px/frame per second
+BASE_COOLDOWN_MS = 1000
+
+REACTION_TIME = 0.25  # Seconds from seeing an obstacle to starting the gesture
+TIMING_SIGMAS = 2.0  # Margin in standard deviations of the timing jitter
+FP_SPACING_GAIN = 10.0  # Extra spacing per false positive per second
+HISTORY = 50  # Decisions the statistics are computed over
+
+# Used until enough decisions have been observed
+PRIOR_LATENCY = 0.6
+PRIOR_JITTER = 0.1
+PRIOR_CONFIDENCE = 0.3
+PRIOR_FALSE_POSITIVE_RATE = 0.1  # Per second, weighted as PRIOR_SECONDS of play
+PRIOR_SECONDS = 30.0
+MIN_SAMPLES = 5
+
+
+class PipelineStats:
+    """
+    Rolling statistics of the decisions the game receives. The percentiles
+    are recomputed only when a decision arrives, not on every frame.
+    """
+
+    def __init__(self, history=HISTORY):
+        self.latencies = deque(maxlen=history)
+        self.confidences = deque(maxlen=history)
+        self.decisions = 0
+        self.false_positives = 0
+        self.elapsed = 0.0  # Seconds of play observed
+        self._latency = (PRIOR_LATENCY, PRIOR_JITTER)
+        self._confidence = PRIOR_CONFIDENCE
+        self._high_confidence = PRIOR_CONFIDENCE
+
+    def observe_decision(self, latency, confidence=None):
+        """latency: seconds from the gesture to the decision reaching the game."""
+        self.latencies.append(latency)
+        if confidence is not None:
+            self.confidences.append(confidence)
+        self.decisions += 1
+        if len(self.latencies) >= MIN_SAMPLES:
+            latencies = np.asarray(self.latencies)
+            self._latency = (float(np.percentile(latencies, 90)), float(latencies.std()))
+        if len(self.confidences) >= MIN_SAMPLES:
+            self._confidence, self._high_confidence = (
+                float(c) for c in np.percentile(np.asarray(self.confidences), [10, 90]))
+
+    def observe_false_positive(self):
+        self.false_positives += 1
+
+    def advance(self, dt):
+        self.elapsed += dt
+
+    @property
+    def latency(self):
+        """(90th percentile, standard deviation) of the latency in seconds."""
+        return self._latency
+
+    @property
+    def confidence(self):
+        """Low (10th percentile) confidence: the jump heights to plan for."""
+        return self._confidence
+
+    @property
+    def high_confidence(self):
+        """High (90th percentile) confidence: the longest climbs to plan the take-off lead for."""
+        return self._high_confidence
+
+    @property
+    def false_positive_rate(self):
+        """False positives per second of play, starting from the prior."""
+        return (self.false_positives + PRIOR_FALSE_POSITIVE_RATE * PRIOR_SECONDS) / (self.elapsed + PRIOR_SECONDS)
+
+
+class DifficultyController:
+    def __init__(self, stats=None, compensation=0.0, reaction_time=REACTION_TIME, reaction_jitter=0.05):
+        """
+        stats: PipelineStats fed by the game (a new one by default).
+        compensation: seconds of latency the game compensates (jump replay).
+        reaction_time / reaction_jitter: the player's own timing, in seconds.
+        """
+        self.stats = stats or PipelineStats()
+        self.compensation = compensation
+        self.reaction_time = reaction_time
+        self.reaction_jitter = reaction_jitter
+
+    def _jitter(self):
+        _, latency_std = self.stats.latency
+        return float(np.hypot(latency_std, self.reaction_jitter))
+
+    def speed_limit(self):
+        """Fastest speed (px/frame) at which an obstacle can still be reacted to in time."""
+        latency_p90, _ = self.stats.latency
+        # The jump has to start about half its clearing window before the obstacle arrives;
+        # the higher the jump, the earlier that is
+        start, end = clear_interval(CLEAR_HEIGHT, self.stats.high_confidence)
+        lead = self.reaction_time + max(latency_p90 - self.compensation, 0.0) + (start + end) / 2
+        # A duck is not compensated: it must be down when the ptero reaches the Dino
+        duck_lead = self.reaction_time + latency_p90 + TIMING_SIGMAS * self._jitter()
+        return min(SCREEN_TRAVEL_PX / (FPS * lead), (PTERO_TRAVEL_PX - PTERO_OVERLAP_PX / 2) / (FPS * duck_lead),
+                   MAX_SPEED)
+
+    def speed_floor(self):
+        """Slowest speed at which the clearing window still covers the timing jitter."""
+        start, end = clear_interval(CLEAR_HEIGHT, self.stats.confidence)
+        tolerance = (end - start) - 2 * TIMING_SIGMAS * self._jitter()
+        if tolerance <= 0:
+            return MAX_SPEED
+        return OVERLAP_PX / (FPS * tolerance)
+
+    def spawn_cooldown_ms(self):
+        """Minimum time between obstacle spawns."""
+        spacing = airtime(self.stats.confidence) + 2 * TIMING_SIGMAS * self._jitter()
+        spacing *= 1 + FP_SPACING_GAIN * self.stats.false_positive_rate
+        return max(BASE_COOLDOWN_MS, 1000 * spacing)
+
+    def _range(self):
+        """(floor, limit); a floor above the limit cannot be met, and the limit comes closest."""
+        limit = self.speed_limit()
+        return min(self.speed_floor(), limit), limit
+
+    def start_speed(self):
+        """Speed a run starts at: the original base speed, moved into the reachable range."""
+        floor, limit = self._range()
+        return min(max(BASE_SPEED, floor), limit)
+
+    def next_speed(self, game_speed, dt=1 / FPS):
+        """Ramp game_speed over dt seconds, kept within the reachable range."""
+        self.stats.advance(dt)
+        floor, limit = self._range()
+        floor = min(floor, game_speed + FLOOR_ACCELERATION * dt)
+        return min(max(game_speed + SPEED_RAMP * FPS * dt, floor), limit)
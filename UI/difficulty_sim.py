@@ -0,0 +1,282 @@
+"""
+difficulty_sim.py
+
+Headless simulation harness for the difficulty controller (difficulty.py).
+
+Simulates thousands of game runs for players with different EMG pipelines
+(latency, timing jitter, missed and false-positive decisions, confidence),
+with the original fixed speed ramp / cooldown and with the adaptive
+controller, and reports how long runs last and how many obstacles were
+unreachable even for a perfectly timed gesture.
+
+The game is simulated per obstacle rather than per frame: obstacles spawn
+as in dino_engine.py (cooldown, then a 9/50 chance per frame; a third of
+them pteros). The player aims a jump at each cactus and low ptero from
+when it becomes visible, and the decision takes effect after the pipeline
+latency minus the game's latency compensation. A jump clears an obstacle
+if it keeps the Dino above the obstacle's clear height for the whole time
+the two overlap. The other pteros are ducked under: the duck decision
+(not compensated) must arrive by the time they reach the Dino, give or
+take the game's collision grace, and the Dino must not be in the air
+(e.g. from a false positive) while they pass.
+
+Besides run length the table shows how many obstacles were unreachable
+even for a perfectly timed gesture and how many were tight: a jump's
+timing tolerance was narrower than TIMING_SIGMAS of the player's jitter.
+The run ends with a check that the adaptive controller outlasts the fixed
+ramp for the slow and noisy players and does no worse for the others; it
+exits non-zero if not.
+
+Usage:
+    python difficulty_sim.py --runs 2000
+"""
+
+import math
+import argparse
+
+import numpy as np
+
+from difficulty import (BASE_COOLDOWN_MS, BASE_SPEED, CLEAR_HEIGHT, FPS, LOW_PTERO_CLEAR_HEIGHT, OVERLAP_PX,
+                        PTERO_OVERLAP_PX, PTERO_TRAVEL_PX, REACTION_TIME, SCREEN_TRAVEL_PX, SPEED_RAMP,
+                        TIMING_SIGMAS, DifficultyController)
+from dino_physics import airtime, clear_interval
+
+SPAWN_CHANCE = 9 / 50  # Per frame once the cooldown has passed (cactus or ptero in dino_engine.py)
+PTERO_SHARE = 3 / 9  # Of the spawned obstacles
+DUCK_SHARE = 2 / 3  # Of the pteros: two of the three PTERO_HEIGHTS fly over a ducking Dino
+COMPENSATION = 0.15  # Latency the game compensates (gameUI.py --latency-ms)
+COLLISION_GRACE = 0.25  # A collision the Dino gets out of this fast is forgiven (gameUI.py with a link)
+MAX_TIME = 180.0  # Seconds a run may last
+TARGET_PLAYERS = ("slow", "noisy")  # Players the adaptive controller must do better for
+
+
+class SimulatedPlayer:
+    def __init__(self, name, latency_mean, latency_std, reaction_jitter=0.05, miss_rate=0.02,
+                 false_positives_per_minute=1.0, confidence=0.6):
+        """
+        latency_mean / latency_std: gesture to decision in the game, in seconds.
+        reaction_jitter: standard deviation of the player's own timing.
+        miss_rate: fraction of gestures the pipeline does not detect.
+        confidence: mean decision intensity (sets the jump height).
+        The player knows their timing: ducks start TIMING_SIGMAS of the
+        total jitter ahead of the ptero.
+        """
+        self.name = name
+        self.latency_mean = latency_mean
+        self.latency_std = latency_std
+        self.reaction_jitter = reaction_jitter
+        self.miss_rate = miss_rate
+        self.false_positive_rate = false_positives_per_minute / 60
+        self.confidence = confidence
+        self.jitter = math.hypot(latency_std, reaction_jitter)
+
+
+PLAYERS = [
+    SimulatedPlayer("fast", latency_mean=0.20, latency_std=0.02, confidence=0.8),
+    SimulatedPlayer("typical", latency_mean=0.35, latency_std=0.05),
+    SimulatedPlayer("slow", latency_mean=0.60, latency_std=0.08, confidence=0.4),
+    SimulatedPlayer("noisy", latency_mean=0.40, latency_std=0.10, miss_rate=0.05,
+                    false_positives_per_minute=6.0, confidence=0.3),
+]
+
+
+class RunResult:
+    __slots__ = ("time", "cleared", "obstacles", "unreachable", "tight", "cause")
+
+    def __init__(self):
+        self.time = 0.0
+        self.cleared = 0
+        self.obstacles = 0
+        self.unreachable = 0  # Obstacles a noise-free gesture could not have cleared
+        self.tight = 0  # Jumped obstacles whose timing tolerance was within the player's jitter
+        self.cause = None
+
+
+def _covers(start, intensity, height, window_start, window_end):
+    interval = clear_interval(height, intensity)
+    return interval is not None and start + interval[0] <= window_start and start + interval[1] >= window_end
+
+
+def _airborne(jump, window_start, window_end):
+    return jump is not None and jump[0] < window_end and jump[0] + airtime(jump[1]) > window_start
+
+
+def simulate_run(player, rng, controller=None, compensation=COMPENSATION, max_time=MAX_TIME):
+    """One game with player; controller=None uses the fixed speed ramp and cooldown."""
+    result = RunResult()
+    speed = controller.start_speed() if controller else BASE_SPEED
+    spawn = 0.0
+    ground_at = 0.0  # When the Dino is next on the ground
+    last_jump = None  # (start, intensity) of the latest accepted jump
+    next_false_positive = rng.exponential(1 / player.false_positive_rate) if player.false_positive_rate else math.inf
+    anticipation = player.latency_mean - compensation  # Learned: gesture this much earlier
+
+    def false_positives(until):
+        # Spurious jumps up to until, whenever on the ground
+        nonlocal next_false_positive, last_jump, ground_at
+        while next_false_positive < until:
+            if next_false_positive >= ground_at:
+                fp_intensity = float(np.clip(rng.normal(player.confidence, 0.1), 0.0, 1.0))
+                last_jump = (next_false_positive, fp_intensity)
+                ground_at = next_false_positive + airtime(fp_intensity)
+            if controller:
+                controller.stats.observe_false_positive()
+            next_false_positive += rng.exponential(1 / player.false_positive_rate)
+
+    while True:
+        cooldown = (controller.spawn_cooldown_ms() if controller else BASE_COOLDOWN_MS) / 1000
+        gap = cooldown + rng.geometric(SPAWN_CHANCE) / FPS
+        if controller:
+            speed = controller.next_speed(speed, gap)
+        else:
+            speed += SPEED_RAMP * FPS * gap
+        spawn += gap
+        px_per_second = speed * FPS
+        duck = False
+        if rng.random() < PTERO_SHARE:
+            travel, overlap_px, height = PTERO_TRAVEL_PX, PTERO_OVERLAP_PX, LOW_PTERO_CLEAR_HEIGHT
+            duck = rng.random() < DUCK_SHARE
+        else:
+            travel, overlap_px, height = SCREEN_TRAVEL_PX, OVERLAP_PX, CLEAR_HEIGHT
+        arrival = spawn + travel / px_per_second
+        if arrival > max_time:
+            result.time = max_time
+            return result
+        overlap = overlap_px / px_per_second
+        window_start, window_end = arrival - overlap / 2, arrival + overlap / 2
+        result.obstacles += 1
+        earliest = spawn + REACTION_TIME  # Cannot gesture before seeing the obstacle
+
+        if duck:
+            planned = max(window_start - TIMING_SIGMAS * player.jitter - player.latency_mean, earliest)
+            if planned + player.latency_mean > window_start + COLLISION_GRACE:
+                result.unreachable += 1
+            gesture = max(planned + rng.normal(0, player.reaction_jitter), earliest)
+            decided = gesture + max(rng.normal(player.latency_mean, player.latency_std), 0.05)
+            false_positives(window_end)
+            if rng.random() < player.miss_rate:
+                cause = "missed"
+            elif decided > window_start + COLLISION_GRACE:
+                cause = "late duck"
+            elif _airborne(last_jump, window_start, window_end):
+                cause = "in the air"
+            else:
+                result.cleared += 1
+                continue
+            result.time = arrival
+            result.cause = cause
+            return result
+
+        intensity = float(np.clip(rng.normal(player.confidence, 0.1), 0.0, 1.0))
+        start, end = clear_interval(height, intensity)
+        if (end - start) - overlap < 2 * TIMING_SIGMAS * player.jitter:
+            result.tight += 1
+        ideal = arrival - (start + end) / 2
+        planned = max(ideal - anticipation, earliest)
+        if not (_covers(planned + anticipation, intensity, height, window_start, window_end)
+                and planned + player.latency_mean >= ground_at):
+            result.unreachable += 1
+
+        gesture = max(planned + rng.normal(0, player.reaction_jitter), earliest)
+        latency = max(rng.normal(player.latency_mean, player.latency_std), 0.05)
+        decided = gesture + latency
+        false_positives(decided)
+
+        cause = None
+        if rng.random() < player.miss_rate:
+            cause = "missed"
+        elif decided < ground_at:
+            cause = "in the air"
+        else:
+            # The game replays the compensated part of the jump
+            takeoff = decided - min(compensation, decided - gesture)
+            last_jump = (takeoff, intensity)
+            ground_at = takeoff + airtime(intensity)
+            if controller:
+                controller.stats.observe_decision(latency, intensity)
+
+        if last_jump is not None and _covers(last_jump[0], last_jump[1], height, window_start, window_end):
+            result.cleared += 1
+            continue
+        result.time = arrival
+        result.cause = cause or ("early" if last_jump is not None and last_jump[0] < ideal else "late")
+        return result
+
+
+def simulate(player, runs, adaptive, seed=0):
+    """
+    runs games of player. Run i draws from its own generator seeded with
+    (seed, i), so the fixed and the adaptive mode play the same sequences
+    of random draws and differ only by the controller.
+    """
+    results = []
+    for run in range(runs):
+        controller = DifficultyController(compensation=COMPENSATION, reaction_jitter=player.reaction_jitter) \
+            if adaptive else None
+        results.append(simulate_run(player, np.random.default_rng([seed, run]), controller))
+    return results
+
+
+def summarize(results):
+    times = np.array([r.time for r in results])
+    obstacles = sum(r.obstacles for r in results)
+    unreachable = sum(r.unreachable for r in results)
+    tight = sum(r.tight for r in results)
+    causes = {}
+    for r in results:
+        if r.cause:
+            causes[r.cause] = causes.get(r.cause, 0) + 1
+    return {
+        "median_s": float(np.median(times)),
+        "p10_s": float(np.percentile(times, 10)),
+        "cleared": float(np.mean([r.cleared for r in results])),
+        "unreachable_pct": 100 * unreachable / max(obstacles, 1),
+        "tight_pct": 100 * tight / max(obstacles, 1),
+        "causes": causes,
+    }
+
+
+def check(summaries):
+    """
+    Failures of the adaptive controller against the fixed ramp: it must beat
+    it on median run time and obstacles cleared for TARGET_PLAYERS and match
+    it at least for every other player.
+    """
+    failures = []
+    for player in PLAYERS:
+        fixed, adaptive = summaries[player.name, False], summaries[player.name, True]
+        for key in ("median_s", "cleared"):
+            if player.name in TARGET_PLAYERS and not adaptive[key] > fixed[key]:
+                failures.append(f"{player.name}: adaptive {key} {adaptive[key]:.1f} does not beat fixed {fixed[key]:.1f}")
+            elif adaptive[key] < fixed[key]:
+                failures.append(f"{player.name}: adaptive {key} {adaptive[key]:.1f} is below fixed {fixed[key]:.1f}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=2000, help="runs per player and mode")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'player':<8} {'mode':<8} {'median s':>9} {'p10 s':>7} {'cleared':>8} {'unreach %':>10} "
+          f"{'tight %':>8}  deaths")
+    summaries = {}
+    for player in PLAYERS:
+        for adaptive in (False, True):
+            summary = summaries[player.name, adaptive] = summarize(simulate(player, args.runs, adaptive, args.seed))
+            causes = ", ".join(f"{cause} {count}" for cause, count in sorted(summary["causes"].items()))
+            print(f"{player.name:<8} {'adaptive' if adaptive else 'fixed':<8} {summary['median_s']:>9.1f} "
+                  f"{summary['p10_s']:>7.1f} {summary['cleared']:>8.1f} {summary['unreachable_pct']:>10.2f} "
+                  f"{summary['tight_pct']:>8.1f}  {causes}")
+
+    failures = check(summaries)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        raise SystemExit(1)
+    print(f"OK: adaptive outlasts fixed for {' and '.join(TARGET_PLAYERS)} and does no worse for the others")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+dino_engine.py
+
+The Dino game's simulation without pygame: Dino position, obstacles,
+speed, score, spawning and collisions. gameUI.py draws the engine's state
+and feeds it the player's inputs; session_replay.py runs the same engine
+headless from a recorded session.
+
+The engine is deterministic: all game randomness comes from its own
+random.Random(seed), time only advances through step(dt), and the inputs
+(jump, duck, restart) are method calls. With a recorder attached, every
+input and step is written to the session log, so replaying the log with
+the same seed reproduces the game frame by frame.
+
+Everything moves on the same time base: the speed is in px per frame at
+FRAME_RATE, and obstacles move speed * FRAME_RATE * dt px per step, so jump
+arcs and obstacle spacing match at any frame rate. The score counts
+SCORE_RATE points per frame at FRAME_RATE the same way. A step is at most
+MAX_STEP long (like the jump physics), so a stalled frame slows the game
+down instead of moving obstacles through the Dino.
+
+Rectangles are (left, top, width, height) tuples in screen pixels and
+collide like pygame.Rect.colliderect.
+"""
+
+import math
+import random
+
+from dino_physics import MAX_STEP, JumpPhysics
+
+# Input ops as written to the session log
+OP_STEP = 0  # a = dt
+OP_JUMP = 1  # a = intensity, b = elapsed, c = latency (nan if unknown)
+OP_DUCK = 2  # a = 1 to duck, 0 to stand
+OP_RESTART = 3
+
+BASE_SPEED = 7
+SPEED_RAMP = 0.0015  # Per frame at FRAME_RATE, without a difficulty controller
+SCORE_RATE = 0.1  # Points per frame at FRAME_RATE
+POINTS_EVERY = 100  # Score between "points" events
+OBSTACLE_COOLDOWN_MS = 1000
+DINO_X = 50
+DINO_SIZE = (80, 100)
+GROUND_Y = 360
+DUCK_Y = 380
+CACTUS_Y = 340
+CACTUS_SIZE = (100, 100)
+CACTUS_VARIANTS = 6
+PTERO_X = 1300
+PTERO_HEIGHTS = [280, 295, 350]
+PTERO_SIZE = (84, 62)
+SPAWN_X = 1280
+FRAME_RATE = 120  # The speed is in px per frame at this rate
+
+
+def centered(x, y, size):
+    width, height = size
+    return int(x) - width // 2, int(y) - height // 2, width, height
+
+
+def collide(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+class Obstacle:
+    __slots__ = ("kind", "x_pos", "y_pos", "size", "variant")
+
+    def __init__(self, kind, x_pos, y_pos, size, variant=0):
+        self.kind = kind  # "cactus" or "ptero"
+        self.x_pos = x_pos
+        self.y_pos = y_pos
+        self.size = size
+        self.variant = variant  # Which cactus sprite
+
+    @property
+    def rect(self):
+        return centered(self.x_pos, self.y_pos, self.size)
+
+
+class DinoEngine:
+    def __init__(self, seed=None, difficulty=None, collision_grace_ms=0, recorder=None):
+        """
+        difficulty: optional DifficultyController for speed and spawn spacing.
+        collision_grace_ms: how long a collision must last to end the game.
+        recorder: optional SessionRecorder that receives every input and step.
+        """
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.difficulty = difficulty
+        self.collision_grace_ms = collision_grace_ms
+        self.recorder = recorder
+        self.physics = JumpPhysics()
+        self.ducking = False
+        self.obstacles = []
+        self.frames = 0
+        self.time_ms = 0.0
+        self.restart(record=False)
+
+    def _record(self, op, a=0.0, b=0.0, c=float("nan")):
+        if self.recorder is not None:
+            self.recorder.input(op, a, b, c)
+
+    # Inputs
+
+    def restart(self, record=True):
+        if record:
+            self._record(OP_RESTART)
+        self.speed = self.difficulty.start_speed() if self.difficulty is not None else BASE_SPEED
+        self.score = 0.0
+        self.game_over = False
+        self.obstacles = []
+        self.obstacle_timer = self.time_ms
+        self.obstacle_cooldown = OBSTACLE_COOLDOWN_MS
+        self.collision_since = None
+        self._collision_ducking = False
+        self.physics.reset()
+
+    def jump(self, intensity=1.0, elapsed=0.0, latency=None):
+        """
+        Jump if on the ground; see JumpPhysics.jump. latency (s): measured
+        decision latency of an EMG jump, fed to the difficulty controller.
+        Returns True if the jump was accepted.
+        """
+        self._record(OP_JUMP, intensity, elapsed, float("nan") if latency is None else latency)
+        if latency is not None and self.difficulty is not None and not self.game_over:
+            self.difficulty.stats.observe_decision(latency, intensity)
+            if not self.obstacle_ahead():
+                self.difficulty.stats.observe_false_positive()
+        return self.physics.jump(intensity, elapsed)
+
+    def set_ducking(self, ducking):
+        if ducking != self.ducking:
+            self._record(OP_DUCK, float(ducking))
+            self.ducking = ducking
+
+    # State
+
+    @property
+    def dino_rect(self):
+        ground_y = DUCK_Y if self.ducking else GROUND_Y
+        return centered(DINO_X, ground_y - round(self.physics.height), DINO_SIZE)
+
+    def obstacle_ahead(self, horizon=1.5):
+        """True if an obstacle reaches the Dino within horizon seconds."""
+        left, _, width, _ = self.dino_rect
+        reach = left + width + self.speed * FRAME_RATE * horizon
+        for obstacle in self.obstacles:
+            o_left, _, o_width, _ = obstacle.rect
+            if left <= o_left + o_width and o_left <= reach:
+                return True
+        return False
+
+    def colliding(self):
+        dino = self.dino_rect
+        return any(collide(dino, obstacle.rect) for obstacle in self.obstacles)
+
+    # Simulation
+
+    def _spawn(self):
+        roll = self.rng.randint(1, 50)
+        if roll in range(1, 7):
+            obstacle = Obstacle("cactus", SPAWN_X, CACTUS_Y, CACTUS_SIZE, self.rng.randrange(CACTUS_VARIANTS))
+        elif roll in range(7, 10):
+            obstacle = Obstacle("ptero", PTERO_X, self.rng.choice(PTERO_HEIGHTS), PTERO_SIZE)
+        else:
+            return None
+        self.obstacles.append(obstacle)
+        self.obstacle_timer = self.time_ms
+        return obstacle
+
+    def step(self, dt):
+        """
+        Advance one frame of dt seconds. Returns the frame's events:
+        ("spawn", obstacle), ("points",), ("death",).
+        """
+        self._record(OP_STEP, dt)
+        dt = min(dt, MAX_STEP)
+        self.frames += 1
+        self.time_ms += dt * 1000
+        events = []
+
+        # Collisions, resolved after the grace window so late EMG jumps still count: a
+        # collision is forgiven if the Dino gets out of it by jumping or ducking in time,
+        # not if the obstacle just passes through it
+        if not self.game_over:
+            dead = False
+            if self.colliding():
+                if self.collision_since is None:
+                    self.collision_since = self.time_ms
+                    self._collision_ducking = self.ducking
+                dead = self.time_ms - self.collision_since >= self.collision_grace_ms
+            elif self.collision_since is not None:
+                dead = self.physics.on_ground and self.ducking == self._collision_ducking
+                self.collision_since = None
+            if dead:
+                self.collision_since = None
+                self.game_over = True
+                events.append(("death",))
+                if self.recorder is not None:
+                    self.recorder.event({"event": "death", "frame": self.frames, "score": int(self.score)})
+        if self.game_over:
+            return events
+
+        if self.difficulty is not None:
+            self.speed = self.difficulty.next_speed(self.speed, dt)
+            self.obstacle_cooldown = self.difficulty.spawn_cooldown_ms()
+        else:
+            self.speed += SPEED_RAMP * FRAME_RATE * dt
+        previous_score = self.score
+        self.score += SCORE_RATE * FRAME_RATE * dt
+        if self.score // POINTS_EVERY > previous_score // POINTS_EVERY:
+            events.append(("points",))
+
+        if self.time_ms - self.obstacle_timer >= self.obstacle_cooldown:
+            obstacle = self._spawn()
+            if obstacle is not None:
+                events.append(("spawn", obstacle))
+
+        self.physics.step(dt)
+        for obstacle in self.obstacles:
+            obstacle.x_pos -= self.speed * FRAME_RATE * dt
+        self.obstacles = [o for o in self.obstacles if o.x_pos > -o.size[0]]
+        return events
+
+    def apply(self, op, a=0.0, b=0.0, c=float("nan")):
+        """Re-apply one recorded input (see the OP_ constants)."""
+        if op == OP_STEP:
+            return self.step(a)
+        if op == OP_JUMP:
+            return self.jump(a, b, None if math.isnan(c) else c)
+        if op == OP_DUCK:
+            return self.set_ducking(bool(a))
+        if op == OP_RESTART:
+            return self.restart()
+        raise ValueError(f"Unknown engine input: {op}")
@@ -0,0 +1,91 @@
+"""
+dino_physics.py
+
+Vertical motion of the Dino as a simple ballistic model: a jump sets an
+upward velocity, gravity is integrated every frame with the frame's real
+time step, and the Dino lands when it is back on the ground.
+
+Jump height depends on the intensity of the jump (0..1, e.g. how
+confidently / strongly the gesture was made): the takeoff velocity is
+chosen so that the apex lies between MIN_JUMP_HEIGHT and MAX_JUMP_HEIGHT.
+A keyboard jump uses full intensity.
+
+A jump can also be started in the past (latency compensation): jump(...,
+elapsed=t) replays the first t seconds of the jump at once, so a late EMG
+decision puts the Dino where it would be had the jump started on time.
+
+Kept free of pygame so it can be stepped without a display.
+"""
+
+import math
+
+GRAVITY = 4400.0  # px/s^2
+MIN_JUMP_HEIGHT = 170.0  # px above the ground at intensity 0
+MAX_JUMP_HEIGHT = 270.0  # px above the ground at intensity 1 (the old fixed apex)
+MAX_STEP = 1 / 30  # Longest time step integrated at once (a stalled frame must not tunnel)
+REPLAY_STEP = 1 / 120  # Step used to replay a jump that started in the past
+
+
+def takeoff_velocity(intensity, gravity=GRAVITY):
+    """Upward velocity (px/s) that reaches the apex for this intensity."""
+    intensity = min(max(intensity, 0.0), 1.0)
+    height = MIN_JUMP_HEIGHT + intensity * (MAX_JUMP_HEIGHT - MIN_JUMP_HEIGHT)
+    return math.sqrt(2 * gravity * height)
+
+
+def airtime(intensity, gravity=GRAVITY):
+    """Seconds from takeoff to landing."""
+    return 2 * takeoff_velocity(intensity, gravity) / gravity
+
+
+def clear_interval(height, intensity, gravity=GRAVITY):
+    """
+    (start, end) in seconds after takeoff during which the Dino is at least
+    height px above the ground, or None if the jump never gets that high.
+    """
+    velocity = takeoff_velocity(intensity, gravity)
+    discriminant = velocity * velocity - 2 * gravity * height
+    if discriminant < 0:
+        return None
+    root = math.sqrt(discriminant)
+    return (velocity - root) / gravity, (velocity + root) / gravity
+
+
+class JumpPhysics:
+    def __init__(self, gravity=GRAVITY):
+        self.gravity = gravity
+        self.height = 0.0  # px above the ground
+        self.velocity = 0.0  # px/s, positive = up
+
+    @property
+    def on_ground(self):
+        return self.height <= 0.0
+
+    def jump(self, intensity=1.0, elapsed=0.0):
+        """
+        Start a jump if on the ground. elapsed: seconds since the jump should
+        have started; that much of it is replayed immediately. Returns True if
+        the jump was accepted.
+        """
+        if not self.on_ground:
+            return False
+        self.velocity = takeoff_velocity(intensity, self.gravity)
+        while elapsed > 0.0 and not (self.on_ground and self.velocity <= 0.0):
+            self.step(min(elapsed, REPLAY_STEP))
+            elapsed -= REPLAY_STEP
+        return True
+
+    def step(self, dt):
+        """Advance by dt seconds (semi-implicit Euler)."""
+        if self.on_ground and self.velocity <= 0.0:
+            return
+        dt = min(dt, MAX_STEP)
+        self.velocity -= self.gravity * dt
+        self.height += self.velocity * dt
+        if self.height <= 0.0:
+            self.height = 0.0
+            self.velocity = 0.0
+
+    def reset(self):
+        self.height = 0.0
+        self.velocity = 0.0
@@ -1,9 +1,64 @@
 import pygame
+import os
 import sys
+import time
 import random
+import argparse
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Python"))
+
+from dino_engine import FRAME_RATE, DinoEngine
+from dino_physics import MAX_STEP
+from difficulty import DifficultyController
+from session_log import GAME_LOG, SessionRecorder
+
+# --link: receive EMG actions from the process that owns the sensor (see game_launcher.py)
+# --wait: pre-initialize hidden and only show the window when the launcher says start
+# --record: write the game's inputs to a session log for session_replay.py
+parser = argparse.ArgumentParser(description="Dino game")
+parser.add_argument("--link", help="controller link address to receive EMG actions from")
+parser.add_argument("--wait", action="store_true", help="load everything, then wait for the start signal")
+parser.add_argument("--latency-ms", type=float, default=150,
+                    help="EMG pipeline latency to compensate, gesture onset to decision, for controllers "
+                         "that do not send gesture onsets (default: %(default)s)")
+parser.add_argument("--record", metavar="DIR", help="session folder to write the game log to")
+args, _ = parser.parse_known_args()
+
+link = None
+if args.link:
+    import controller_link
+    link = controller_link.DecisionSubscriber(args.link)
+
+# How long a one-shot EMG duck keeps the dino down
+DUCK_ACTION_MS = 500
+# Latency compensation for EMG jumps: a decision is late by the pipeline latency
+# (window + smoothing + inference) plus its time on the link. The controller sends
+# when the gesture started, so the game measures that latency per decision (with an
+# older controller it assumes PIPELINE_LATENCY_MS plus the link time). The jump is
+# replayed from when the gesture was made, up to MAX_COMPENSATION_MS, and a collision
+# only ends the game once it has lasted COLLISION_GRACE_MS, so a late jump can still
+# clear it.
+PIPELINE_LATENCY_MS = args.latency_ms
+MAX_COMPENSATION_MS = 250
+COLLISION_GRACE_MS = MAX_COMPENSATION_MS if link is not None else 0
+# With EMG control, speed and obstacle spacing adapt to the measured gesture-to-decision
+# latency, false positives and confidence (keyboard play keeps the fixed ramp)
+difficulty = None
+if link is not None:
+    difficulty = DifficultyController(compensation=min(PIPELINE_LATENCY_MS, MAX_COMPENSATION_MS) / 1000)
+
+# The game simulation runs in the engine; everything random in it comes from this seed
+seed = random.randrange(2 ** 32)
+recorder = None
+if args.record:
+    recorder = SessionRecorder(os.path.join(args.record, GAME_LOG), {
+        "source": "game", "seed": seed, "collision_grace_ms": COLLISION_GRACE_MS,
+        "difficulty": difficulty is not None, "compensation": difficulty.compensation if difficulty else 0.0})
+engine = DinoEngine(seed, difficulty, COLLISION_GRACE_MS, recorder)
 
 pygame.init()
-screen = pygame.display.set_mode((1280, 720))
+screen = pygame.display.set_mode((1280, 720), pygame.HIDDEN if args.wait else 0)
 clock = pygame.time.Clock()
 pygame.display.set_caption("Dino Game")
 
@@ -31,45 +86,45 @@ class Dino(pygame.sprite.Sprite):
         self.ducking_sprites = []
 
         self.running_sprites.append(pygame.transform.scale(
-            pygame.image.load("Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/Dino1.png"), (80, 100)))
+            pygame.image.load(os.path.join(ASSETS_DIR, "Dino1.png")), (80, 100)))
         self.running_sprites.append(pygame.transform.scale(
-            pygame.image.load("Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/Dino2.png"), (80, 100)))
+            pygame.image.load(os.path.join(ASSETS_DIR, "Dino2.png")), (80, 100)))
 
         self.ducking_sprites.append(pygame.transform.scale(
-            pygame.image.load(f"Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/DinoDucking1.png"), (110, 60)))
+            pygame.image.load(os.path.join(ASSETS_DIR, "DinoDucking1.png")), (110, 60)))
         self.ducking_sprites.append(pygame.transform.scale(
-            pygame.image.load(f"Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/DinoDucking2.png"), (110, 60)))
+            pygame.image.load(os.path.join(ASSETS_DIR, "DinoDucking2.png")), (110, 60)))
 
-        self.x_pos = x_pos
-        self.y_pos = y_pos
         self.current_image = 0
         self.image = self.running_sprites[self.current_image]
-        self.rect = self.image.get_rect(center=(self.x_pos, self.y_pos))
-        self.velocity = 50
-        self.gravity = 4.5
-        self.ducking = False
-
-    def jump(self):
+        self.rect = pygame.Rect(engine.dino_rect)
+
+    @property
+    def ducking(self):
+        return engine.ducking
+
+    def jump(self, intensity=1.0, elapsed=0.0, latency=None):
+        """
+        Jump if on the ground; intensity (0..1) sets the height, elapsed (s) how
+        long ago the jump was meant to start. Returns True if accepted
+        """
+        if not engine.jump(intensity, elapsed, latency):
+            return False
+        self.rect = pygame.Rect(engine.dino_rect)
         jump_sfx.play()
-        if self.rect.centery >= 360:
-            while self.rect.centery - self.velocity > 40:
-                self.rect.centery -= 1
+        return True
 
     def duck(self):
-        self.ducking = True
-        self.rect.centery = 380
+        engine.set_ducking(True)
+        self.rect = pygame.Rect(engine.dino_rect)
 
     def unduck(self):
-        self.ducking = False
-        self.rect.centery = 360
-
-    def apply_gravity(self):
-        if self.rect.centery <= 360:
-            self.rect.centery += self.gravity
+        engine.set_ducking(False)
+        self.rect = pygame.Rect(engine.dino_rect)
 
     def update(self):
         self.animate()
-        self.apply_gravity()
+        self.rect = pygame.Rect(engine.dino_rect)
 
     def animate(self):
         self.current_image += 0.05
@@ -83,43 +138,43 @@ class Dino(pygame.sprite.Sprite):
 
 
 class Cactus(pygame.sprite.Sprite):
-    def __init__(self, x_pos, y_pos):
+    def __init__(self, obstacle):
         super().__init__()
-        self.x_pos = x_pos
-        self.y_pos = y_pos
+        self.obstacle = obstacle
         self.sprites = []
         for i in range(1, 7):
             current_sprite = pygame.transform.scale(
-                pygame.image.load(f"Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/cacti/cactus{i}.png"), (100, 100))
+                pygame.image.load(os.path.join(ASSETS_DIR, "cacti", f"cactus{i}.png")), (100, 100))
             self.sprites.append(current_sprite)
-        self.image = random.choice(self.sprites)
-        self.rect = self.image.get_rect(center=(self.x_pos, self.y_pos))
+        self.image = self.sprites[obstacle.variant]
+        self.rect = pygame.Rect(obstacle.rect)
 
     def update(self):
-        self.x_pos -= game_speed
-        self.rect = self.image.get_rect(center=(self.x_pos, self.y_pos))
+        self.rect = pygame.Rect(self.obstacle.rect)
+        if self.obstacle not in engine.obstacles:
+            self.kill()
 
 
 class Ptero(pygame.sprite.Sprite):
-    def __init__(self):
+    def __init__(self, obstacle):
         super().__init__()
-        self.x_pos = 1300
-        self.y_pos = random.choice([280, 295, 350])
+        self.obstacle = obstacle
         self.sprites = []
         self.sprites.append(
             pygame.transform.scale(
-                pygame.image.load("Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/Ptero1.png"), (84, 62)))
+                pygame.image.load(os.path.join(ASSETS_DIR, "Ptero1.png")), (84, 62)))
         self.sprites.append(
             pygame.transform.scale(
-                pygame.image.load("Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/Ptero2.png"), (84, 62)))
+                pygame.image.load(os.path.join(ASSETS_DIR, "Ptero2.png")), (84, 62)))
         self.current_image = 0
         self.image = self.sprites[self.current_image]
-        self.rect = self.image.get_rect(center=(self.x_pos, self.y_pos))
+        self.rect = pygame.Rect(obstacle.rect)
 
     def update(self):
         self.animate()
-        self.x_pos -= game_speed
-        self.rect = self.image.get_rect(center=(self.x_pos, self.y_pos))
+        self.rect = pygame.Rect(self.obstacle.rect)
+        if self.obstacle not in engine.obstacles:
+            self.kill()
 
     def animate(self):
         self.current_image += 0.025
@@ -130,21 +185,15 @@ class Ptero(pygame.sprite.Sprite):
 # Variables
 
 
-game_speed = 7
 jump_count = 10
-player_score = 0
-game_over = False
-obstacle_timer = 0
-obstacle_spawn = False
-obstacle_cooldown = 1000
 
 # Surfaces
 
-ground = pygame.image.load("Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/ground.png")
+ground = pygame.image.load(os.path.join(ASSETS_DIR, "ground.png"))
 ground = pygame.transform.scale(ground, (1280, 20))
 ground_x = 0
 ground_rect = ground.get_rect(center=(640, 400))
-cloud = pygame.image.load("Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/cloud.png")
+cloud = pygame.image.load(os.path.join(ASSETS_DIR, "cloud.png"))
 cloud = pygame.transform.scale(cloud, (200, 80))
 
 # Groups
@@ -158,9 +207,9 @@ dinosaur = Dino(50, 360)
 dino_group.add(dinosaur)
 
 # Sounds
-death_sfx = pygame.mixer.Sound("Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/sfx/lose.mp3")
-points_sfx = pygame.mixer.Sound("Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/sfx/100points.mp3")
-jump_sfx = pygame.mixer.Sound("Universal-Game-Controller-for-Disabled-Individuals/UGCFDI Project/assets/sfx/jump.mp3")
+death_sfx = pygame.mixer.Sound(os.path.join(ASSETS_DIR, "sfx", "lose.mp3"))
+points_sfx = pygame.mixer.Sound(os.path.join(ASSETS_DIR, "sfx", "100points.mp3"))
+jump_sfx = pygame.mixer.Sound(os.path.join(ASSETS_DIR, "sfx", "jump.mp3"))
 
 # Events
 CLOUD_EVENT = pygame.USEREVENT
@@ -169,13 +218,25 @@ pygame.time.set_timer(CLOUD_EVENT, 3000)
 # Functions
 
 
-def end_game():
-    global player_score, game_speed, game_over
+def quit_game():
+    if recorder is not None:
+        recorder.close()
+    pygame.quit()
+    sys.exit()
+
+
+def restart():
+    engine.restart()
+    cloud_group.empty()
+    obstacle_group.empty()
+    dinosaur.update()
 
+
+def end_game():
     screen.fill("white")
     game_over_text = game_font.render("Game Over!", True, "black")
     game_over_rect = game_over_text.get_rect(center=(640, 300))
-    score_text = game_font.render(f"Score: {int(player_score)}", True, "black")
+    score_text = game_font.render(f"Score: {int(engine.score)}", True, "black")
     score_rect = score_text.get_rect(center=(640, 340))
 
     restart_button = pygame.Rect(540, 380, 200, 50)
@@ -189,37 +250,88 @@ def end_game():
 
     pygame.display.update()
 
-    # Wait for restart button click
-    waiting = True
-    while waiting:
+    # Wait for a restart: the button, the jump keys, or an EMG jump made after the game
+    # ended (players who cannot use a mouse); the launcher can still stop the game
+    shown = time.time()
+    while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if restart_button.collidepoint(event.pos):
-                    # Reset game state
-                    player_score = 0
-                    game_speed = 7
-                    cloud_group.empty()
-                    obstacle_group.empty()
-                    dinosaur.rect.centery = 360  # Reset dino position
-                    game_over = False
-                    waiting = False
-
-
+                quit_game()
+            if event.type == pygame.MOUSEBUTTONDOWN and restart_button.collidepoint(event.pos):
+                restart()
+                return
+            if event.type == pygame.KEYDOWN and event.key in (pygame.K_SPACE, pygame.K_UP):
+                restart()
+                return
+        if link is not None:
+            for link_event in link.poll():
+                if link_event.kind == controller_link.KIND_STOP:
+                    quit_game()
+                if (link_event.action == "jump" and link_event.kind == controller_link.KIND_ACTION
+                        and link_event.timestamp >= shown):
+                    restart()
+                    return
+            if link.closed:
+                quit_game()
+        clock.tick(30)
+
+
+def decision_age(link_event):
+    """Seconds between the gesture behind an EMG decision and now"""
+    if link_event.onset is not None:
+        return max(time.time() - link_event.onset, 0.0)
+    return max(time.time() - link_event.timestamp + PIPELINE_LATENCY_MS / 1000, 0.0)
+
+
+def wait_for_start():
+    """Block (pre-initialized, window hidden) until the launcher sends the start signal"""
+    global screen
+    while True:
+        pygame.event.pump()
+        for event in link.wait(0.1):
+            if event.kind == controller_link.KIND_START:
+                screen = pygame.display.set_mode((1280, 720), pygame.SHOWN)
+                return
+        if link.closed:
+            quit_game()
+
+
+if args.wait and link is not None:
+    wait_for_start()
+
+link_duck_until = 0
+frame_dt = 1 / 120  # Duration of the last frame in seconds, for the jump physics
 
 while True:
+    # EMG actions from the controller link
+    if link is not None:
+        for link_event in link.poll():
+            if link_event.kind == controller_link.KIND_STOP:
+                quit_game()
+            if link_event.action == "jump" and link_event.kind == controller_link.KIND_ACTION:
+                # Stronger / more confident gestures jump higher
+                intensity = 1.0 if link_event.intensity is None else link_event.intensity
+                age = decision_age(link_event)
+                dinosaur.jump(intensity, min(age, MAX_COMPENSATION_MS / 1000), age)
+                if engine.game_over:
+                    restart()
+            elif link_event.action == "duck":
+                if link_event.kind == controller_link.KIND_ACTION:
+                    link_duck_until = pygame.time.get_ticks() + DUCK_ACTION_MS
+                elif link_event.kind == controller_link.KIND_PRESS:
+                    link_duck_until = float("inf")
+                elif link_event.kind == controller_link.KIND_RELEASE:
+                    link_duck_until = 0
+
     keys = pygame.key.get_pressed()
-    if keys[pygame.K_DOWN]:
+    if keys[pygame.K_DOWN] or pygame.time.get_ticks() < link_duck_until:
         dinosaur.duck()
     else:
         if dinosaur.ducking:
             dinosaur.unduck()
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
+            quit_game()
         if event.type == CLOUD_EVENT:
             current_cloud_y = random.randint(50, 300)
             current_cloud = Cloud(cloud, 1380, current_cloud_y)
@@ -227,44 +339,26 @@ while True:
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_SPACE or event.key == pygame.K_UP:
                 dinosaur.jump()
-                if game_over:
-                    game_over = False
-                    game_speed = 7
-                    player_score = 0
+                if engine.game_over:
+                    restart()
 
     screen.fill("white")
 
-    # Collisions
-    if pygame.sprite.spritecollide(dino_group.sprite, obstacle_group, False):
-        game_over = True
-        death_sfx.play()
-    if game_over:
-        end_game()
-
-    if not game_over:
-        game_speed += 0.0015
-        if round(player_score, 1) % 100 == 0 and int(player_score) > 0:
+    # Advance the simulation: collisions, speed, spawning, score, jump physics
+    for game_event in engine.step(frame_dt):
+        if game_event[0] == "spawn":
+            obstacle = game_event[1]
+            obstacle_group.add(Cactus(obstacle) if obstacle.kind == "cactus" else Ptero(obstacle))
+        elif game_event[0] == "points":
             points_sfx.play()
+        elif game_event[0] == "death":
+            death_sfx.play()
+    if engine.game_over:
+        end_game()
 
-        if pygame.time.get_ticks() - obstacle_timer >= obstacle_cooldown:
-            obstacle_spawn = True
-
-        if obstacle_spawn:
-            obstacle_random = random.randint(1, 50)
-            if obstacle_random in range(1, 7):
-                new_obstacle = Cactus(1280, 340)
-                obstacle_group.add(new_obstacle)
-                obstacle_timer = pygame.time.get_ticks()
-                obstacle_spawn = False
-            elif obstacle_random in range(7, 10):
-                new_obstacle = Ptero()
-                obstacle_group.add(new_obstacle)
-                obstacle_timer = pygame.time.get_ticks()
-                obstacle_spawn = False
-
-        player_score += 0.1
+    if not engine.game_over:
         player_score_surface = game_font.render(
-            str(int(player_score)), True, ("black"))
+            str(int(engine.score)), True, ("black"))
         screen.blit(player_score_surface, (1150, 10))
 
         cloud_group.update()
@@ -279,7 +373,7 @@ while True:
         obstacle_group.update()
         obstacle_group.draw(screen)
 
-        ground_x -= game_speed
+        ground_x -= engine.speed * FRAME_RATE * min(frame_dt, MAX_STEP)
 
         screen.blit(ground, (ground_x, 360))
         screen.blit(ground, (ground_x + 1280, 360))
@@ -287,5 +381,5 @@ while True:
         if ground_x <= -1280:
             ground_x = 0
 
-    clock.tick(120)
+    frame_dt = clock.tick(120) / 1000
     pygame.display.update()
\ No newline at end of file
@@ -1,14 +1,22 @@
 import pygame
+import os
 import sys
 import random
 import serial
 import time
-import numpy as np
-import tensorflow as tf
+import traceback
 from collections import deque
 
 import gameUI 
 
+# Shared feature extraction / classification helpers live next to the training scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Python"))
+from decision_layer import DecisionLayer
+from live_classifier import BACKLOG_SECONDS, LiveClassifier, backlog_age
+from model_bundle import load_bundle
+from sensor_stream import SerialReader
+from signal_visualizer import SignalHistory, PygameSignalOverlay
+
 pygame.init()
 screen = pygame.display.set_mode((1280, 720))
 clock = pygame.time.Clock()
@@ -16,14 +24,49 @@ pygame.display.set_caption("Dino Game with EMG Control")
 
 game_font = pygame.font.Font(None, 24)
 
-# Load the trained model and setup classification
-model = tf.keras.models.load_model("emg_classifier.h5")
-label_classes = ['clench', 'index', 'rest']
-
-# Parameters for the sliding window
-WINDOW_SIZE = 200
-OVERLAP_PERCENTAGE = 0.5
-CONFIDENCE_THRESHOLD = 0.6
+# Load the trained model bundle and setup classification
+model = load_bundle("emg_classifier.npz")
+label_classes = model.classes
+
+# Parameters for the sliding window, as trained
+WINDOW_SIZE = model.window_size
+OVERLAP_PERCENTAGE = model.overlap
+# Decision settings tuned by param_sweep.py are stored in the bundle
+LIVE_SETTINGS = model.live_settings
+CONFIDENCE_THRESHOLD = LIVE_SETTINGS.get("on_threshold", 0.6)
+RELEASE_THRESHOLD = LIVE_SETTINGS.get("off_threshold", 0.4)  # A gesture must fall below this before it can fire again
+SMOOTHING_ALPHA = LIVE_SETTINGS.get("alpha", 0.7)  # Weight of the newest window in the probability moving average
+# Show the live signal / probability overlay (toggle in game with F1)
+SHOW_SIGNAL_OVERLAY = False
+# Gesture -> game action; checked against the model's classes at startup
+GESTURE_ACTIONS = {'clench': 'jump', 'wrist': 'duck'}
+# Decide on growing prefixes of the window instead of waiting for all of it
+PROGRESSIVE_MODE = False
+# Classify every SHORT_HOP samples so a held duck starts quickly; it ends as
+# soon as the muscle relaxes (per-sample envelope tracking)
+SHORT_HOP = 10
+HELD_ACTIONS = ('duck',)
+# Follow slow signal drift (electrodes, skin, fatigue) during long sessions
+ADAPT_TO_DRIFT = model.model_type != "cnn"
+# After a stall (end_game(), a slow frame) the samples that piled up are stale:
+# "batch" classifies them in one pass without acting, "skip" jumps to the newest window
+CATCH_UP_MODE = "batch"
+
+progressive = None
+if PROGRESSIVE_MODE:
+    from early_exit import ProgressiveClassifier
+    progressive = ProgressiveClassifier()
+    label_classes = progressive.label_classes
+    WINDOW_SIZE = progressive.window_size
+
+if progressive is not None:
+    # Early exits are already confidence-gated; only suppress back-to-back repeats
+    decisions = DecisionLayer(label_classes, GESTURE_ACTIONS, mode="vote", vote_window=1)
+else:
+    classifier = LiveClassifier(model, GESTURE_ACTIONS, hop=SHORT_HOP, held_actions=HELD_ACTIONS,
+                                mode="ema", alpha=SMOOTHING_ALPHA,
+                                on_threshold=CONFIDENCE_THRESHOLD, off_threshold=RELEASE_THRESHOLD,
+                                adapt=ADAPT_TO_DRIFT)
 
 data_buffer = deque(maxlen=WINDOW_SIZE)
 timestamps_buffer = deque(maxlen=WINDOW_SIZE)
@@ -32,6 +75,8 @@ timestamps_buffer = deque(maxlen=WINDOW_SIZE)
 ser = serial.Serial('COM4', 9600)
 ser.flushInput()
 time.sleep(0.5)
+# Every frame takes all the samples waiting on the port at once
+reader = SerialReader(ser)
 
 # Existing game classes remain the same as in the original gameUI.py
 # [... Paste all the existing class definitions for Cloud, Dino, Cactus, Ptero ...]
@@ -48,37 +93,18 @@ obstacle_cooldown = 1000
 # Surfaces and other initializations remain the same
 # [... Paste all existing surface and initialization code ...]
 
-def extract_features(window, timestamps):
-    """
-    Extract enhanced features from a list of sensor values.
-    Features: AUC, mean, std, RMS, max, min, mean derivative, std derivative.
-    """
-    window = np.array(window)
-    timestamps = np.array(timestamps)
-    
-    # Calculate AUC using the trapezoidal rule
-    if len(timestamps) > 1:
-        auc = np.trapezoid(window, timestamps)
-    else:
-        auc = 0
-
-    mean_val = np.mean(window)
-    std_val = np.std(window)
-    rms_val = np.sqrt(np.mean(np.square(window)))
-    max_val = np.max(window)
-    min_val = np.min(window)
-    
-    # Compute derivative features
-    derivative = np.diff(window)
-    if len(derivative) > 0:
-        mean_deriv = np.mean(derivative)
-        std_deriv = np.std(derivative)
-    else:
-        mean_deriv = 0
-        std_deriv = 0
-    
-    features = np.array([auc, mean_val, std_val, rms_val, max_val, min_val, mean_deriv, std_deriv])
-    return features.reshape(1, -1)
+signal_history = SignalHistory()
+signal_overlay = PygameSignalOverlay(signal_history, (10, 420, 600, 280), model)
+
+def perform(action, kind="action", intensity=None):
+    """Apply a game action produced by the decision layer."""
+    if action == 'jump':
+        gameUI.dinosaur.jump(1.0 if intensity is None else intensity)
+    elif action == 'duck':
+        if kind == "release":
+            gameUI.dinosaur.unduck()
+        else:
+            gameUI.dinosaur.duck()
 
 def end_game():
     # [... Paste the existing end_game function from the original script ...]
@@ -87,36 +113,61 @@ def end_game():
 # Main game loop with classification integration
 while True:
     try:
-        # Read and process serial data for classification
-        line = ser.readline().decode('latin-1').strip()
         try:
-            value = int(line)
-            current_time = time.time()
-            
-            data_buffer.append(value)
-            timestamps_buffer.append(current_time)
-            
-            # Check if we have enough data to make a prediction
-            if len(data_buffer) >= WINDOW_SIZE:
-                features = extract_features(list(data_buffer), list(timestamps_buffer))
-                prediction = model.predict(features)
-                max_prob = np.max(prediction)
-                predicted_label = label_classes[np.argmax(prediction)]
-                
-                # Control dinosaur based on classification
-                if predicted_label == 'clench' and max_prob > CONFIDENCE_THRESHOLD:
-                    gameUI.dinosaur.jump()
-                elif predicted_label == 'wrist' and max_prob > CONFIDENCE_THRESHOLD:
-                    gameUI.dinosaur.duck()
-                
-                # Slide the window with overlap
-                slide_amount = int(WINDOW_SIZE * (1 - OVERLAP_PERCENTAGE))
-                data_buffer = deque(list(data_buffer)[slide_amount:], maxlen=WINDOW_SIZE)
-                timestamps_buffer = deque(list(timestamps_buffer)[slide_amount:], maxlen=WINDOW_SIZE)
-
-        except Exception as e:
-            # Silently continue if there's an error parsing serial data
-            pass
+            # Read and process serial data for classification
+            timestamps, values = reader.read()
+            signal_history.extend(timestamps, values)
+            behind = backlog_age(timestamps) > BACKLOG_SECONDS
+
+            if progressive is not None:
+                if behind:
+                    # Restart the early exits on the newest samples
+                    timestamps, values = timestamps[-WINDOW_SIZE:], values[-WINDOW_SIZE:]
+                    data_buffer.clear()
+                    timestamps_buffer.clear()
+                    progressive.reset()
+                    decisions.reset()
+                for current_time, value in zip(timestamps, values):
+                    data_buffer.append(value)
+                    timestamps_buffer.append(current_time)
+                    decision = progressive.update(data_buffer, timestamps_buffer, CONFIDENCE_THRESHOLD)
+                    if decision is not None:
+                        previous = decisions.active
+                        event = decisions.update(progressive.last_prediction)
+                        if event is not None:
+                            # A new gesture ends a held one
+                            if previous >= 0 and decisions.actions[previous] in HELD_ACTIONS:
+                                perform(decisions.actions[previous], "release")
+                            perform(event[1], "press" if event[1] in HELD_ACTIONS else "action")
+                        data_buffer.clear()
+                        timestamps_buffer.clear()
+                        progressive.reset()
+                    elif progressive.finished:
+                        # Undecided window: the gesture is over, so a held one ends too
+                        released = decisions.release()
+                        if released is not None and released[1] in HELD_ACTIONS:
+                            perform(released[1], "release")
+                        slide_amount = int(WINDOW_SIZE * (1 - OVERLAP_PERCENTAGE))
+                        data_buffer = deque(list(data_buffer)[slide_amount:], maxlen=WINDOW_SIZE)
+                        timestamps_buffer = deque(list(timestamps_buffer)[slide_amount:], maxlen=WINDOW_SIZE)
+                        progressive.reset()
+
+            else:
+                # Control dinosaur once per gesture, after smoothing and hysteresis;
+                # a held duck lasts until the release decision
+                if behind:
+                    fired = classifier.catch_up(timestamps, values, CATCH_UP_MODE)
+                else:
+                    fired = classifier.push(timestamps, values)
+                for decision in fired:
+                    perform(decision.action, decision.kind, decision.intensity)
+
+        except (ValueError, serial.SerialException) as e:
+            # A failed or garbled serial read; keep playing on the next one
+            print(f"Serial read error: {e}")
+        except Exception:
+            # A bug in classification or control must not just freeze the dinosaur
+            traceback.print_exc()
 
     except KeyboardInterrupt:
         break
@@ -129,12 +180,17 @@ while True:
             current_cloud_y = random.randint(50, 300)
             current_cloud = gameUI.Cloud(gameUI.cloud, 1380, current_cloud_y)
             gameUI.cloud_group.add(current_cloud)
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F1:
+            SHOW_SIGNAL_OVERLAY = not SHOW_SIGNAL_OVERLAY
 
     screen.fill("white")
 
     # Existing game logic remains the same
     # [... Paste the rest of the game logic from the original script ...]
 
+    if SHOW_SIGNAL_OVERLAY:
+        signal_overlay.draw(screen)
+
     clock.tick(120)
     pygame.display.update()
 
@@ -0,0 +1,92 @@
+"""
+game_launcher.py
+
+Starts the game from the setup wizard without a cold start.
+
+The wizard process keeps owning the sensor (SensorStream) and the
+calibrated model. The game is spawned early with --wait, so Python,
+pygame and the assets are already loaded while the user is still
+calibrating, and it connects back over a controller_link socket. When the
+user presses Start Game, a classification thread starts publishing
+decisions from the already-open sensor and the game is told to show its
+window. The serial port is never closed or reopened.
+
+With a session folder, the classification thread and the game each write
+a session log into it (see session_log.py) for session_replay.py.
+"""
+
+import os
+import sys
+import time
+import subprocess
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Python"))
+from controller_link import ACTIONS, KIND_START, KIND_STOP, DecisionPublisher
+from controller_daemon import ControllerDaemon
+from session_log import CONTROLLER_LOG, SessionRecorder
+
+GAME_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gameUI.py")
+
+
+class GameLauncher:
+    def __init__(self, sensor, game_script=GAME_SCRIPT, session_dir=None):
+        self.sensor = sensor
+        self.game_script = game_script
+        self.session_dir = session_dir
+        self.recorder = None
+        self.publisher = DecisionPublisher(hello={"actions": ACTIONS})
+        self.process = None
+        self.daemon = None
+
+    def _spawn(self, wait):
+        command = [sys.executable, self.game_script, "--link", self.publisher.address]
+        if wait:
+            command.append("--wait")
+        if self.session_dir:
+            command += ["--record", self.session_dir]
+        return subprocess.Popen(command, cwd=os.path.dirname(self.game_script))
+
+    def prewarm(self):
+        """Spawn the game hidden so it is fully initialized by the time it is needed"""
+        if self.process is None or self.process.poll() is not None:
+            self.process = self._spawn(wait=True)
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, bundle=None, gestures=None, bundle_path=None):
+        """
+        Start classifying into the game and show it.
+        gestures: captured gesture label -> game action; labels that are not
+        game actions (e.g. run) produce no events.
+        bundle_path: where bundle was loaded from, for the session log.
+        """
+        if bundle is not None and self.sensor is not None:
+            if self.session_dir:
+                self.recorder = SessionRecorder(os.path.join(self.session_dir, CONTROLLER_LOG),
+                                                {"bundle": bundle_path and os.path.abspath(bundle_path)})
+            # Same classify-and-publish loop as the standalone daemon, on this process's sensor
+            self.daemon = ControllerDaemon(self.sensor, bundle, gestures or {}, publisher=self.publisher,
+                                           publish_probabilities=False, recorder=self.recorder)
+            self.daemon.start()
+
+        if not self.running():
+            # Not prewarmed (or it exited); fall back to a normal start
+            self.process = self._spawn(wait=False)
+        # Wait for the game to connect before telling it to start
+        deadline = time.time() + 10
+        while self.publisher.subscriber_count == 0 and time.time() < deadline and self.running():
+            time.sleep(0.01)
+        self.publisher.publish(KIND_START)
+
+    def stop(self):
+        if self.daemon is not None:
+            self.daemon.stop()
+            self.daemon = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        self.publisher.publish(KIND_STOP)
+        self.publisher.close()
+        if self.running():
+            self.process.terminate()
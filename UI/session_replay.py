@@ -0,0 +1,141 @@
+"""
+session_replay.py
+
+Deterministic replay of a recorded session (see session_log.py), e.g. to
+reproduce a reported missed jump.
+
+- controller.ugclog: the recorded sensor samples are fed through a fresh
+  LiveClassifier built from the same bundle and settings, and its
+  decisions are compared with the recorded ones.
+- game.ugclog: the recorded inputs are applied to a DinoEngine with the
+  recorded seed, and its deaths are compared with the recorded ones.
+
+Both run as fast as the CPU allows; the speed-up over real time is printed.
+
+Usage:
+    python session_replay.py ../Python/sessions/20261019-170000
+    python session_replay.py ../Python/sessions/20261019-170000 --bundle ../Python/emg_classifier_user.npz -v
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Python"))
+from live_classifier import LiveClassifier
+from model_bundle import load_bundle
+from session_log import (CONTROLLER_LOG, GAME_LOG, REC_DECISION, REC_EVENT, REC_INPUT, REC_SAMPLES, decode_decision,
+                         decode_input, decode_samples, read_log, read_meta)
+from dino_engine import OP_STEP, DinoEngine
+from difficulty import DifficultyController
+from controller_link import ACTION_CODES
+
+
+def replay_controller(path, bundle_path=None, verbose=False):
+    meta = read_meta(path)
+    bundle = load_bundle(bundle_path or meta["bundle"])
+    classifier = LiveClassifier(bundle, meta["gestures"], hop=meta["hop"], held_actions=meta["held_actions"],
+                                adapt=meta.get("adapt", False))
+    class_index = {label: i for i, label in enumerate(bundle.classes)}
+
+    recorded = []
+    replayed = []
+    samples = 0
+    first = last = None
+    catch_up = None
+    start = time.perf_counter()
+    for record_type, timestamp, payload in read_log(path):
+        if record_type == REC_SAMPLES:
+            timestamps, values = decode_samples(payload)
+            if len(timestamps):
+                first = timestamps[0] if first is None else first
+                last = timestamps[-1]
+            samples += len(values)
+            if catch_up is not None:
+                decisions = classifier.catch_up(timestamps, values, catch_up)
+                catch_up = None
+            else:
+                decisions = classifier.push(timestamps, values)
+            for decision in decisions:
+                replayed.append((decision.timestamp, decision.kind, class_index[decision.label],
+                                 ACTION_CODES.get(decision.action)))
+        elif record_type == REC_EVENT:
+            event = json.loads(payload.decode())
+            if event.get("event") == "catch_up":
+                catch_up = event["mode"]
+        elif record_type == REC_DECISION:
+            # Keyed by the timestamp of the sample that produced the decision
+            kind, label_index, action_code, _, _ = decode_decision(payload)
+            recorded.append((timestamp, kind, label_index, action_code))
+    wall = time.perf_counter() - start
+
+    mismatch = next((i for i, (a, b) in enumerate(zip(recorded, replayed)) if a != b), None)
+    if mismatch is None and len(recorded) != len(replayed):
+        mismatch = min(len(recorded), len(replayed))
+    if verbose:
+        for t, kind, label, action in replayed:
+            print(f"  {t - first:9.3f} s  {bundle.classes[label]:<10} {kind}")
+    duration = (last - first) if first is not None else 0.0
+    return {"samples": samples, "duration_s": duration, "replay_s": wall, "recorded": len(recorded),
+            "replayed": len(replayed), "first_mismatch": mismatch}
+
+
+def replay_game(path, verbose=False):
+    meta = read_meta(path)
+    difficulty = DifficultyController(compensation=meta["compensation"]) if meta["difficulty"] else None
+    engine = DinoEngine(meta["seed"], difficulty, meta["collision_grace_ms"])
+
+    recorded = []
+    replayed = []
+    start = time.perf_counter()
+    for record_type, _, payload in read_log(path):
+        if record_type == REC_INPUT:
+            op, a, b, c = decode_input(payload)
+            events = engine.apply(int(op), a, b, c)
+            if op == OP_STEP:
+                for event in events:
+                    if event[0] == "death":
+                        replayed.append({"event": "death", "frame": engine.frames, "score": int(engine.score)})
+        elif record_type == REC_EVENT:
+            recorded.append(json.loads(payload.decode()))
+    wall = time.perf_counter() - start
+
+    if verbose:
+        for death in replayed:
+            print(f"  death at frame {death['frame']} with score {death['score']}")
+    return {"frames": engine.frames, "duration_s": engine.time_ms / 1000, "replay_s": wall,
+            "recorded": len(recorded), "replayed": len(replayed), "match": recorded == replayed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("session", help="session folder with controller.ugclog and/or game.ugclog")
+    parser.add_argument("--bundle", help="model bundle (default: the one recorded in the session)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list every decision and death")
+    args = parser.parse_args()
+
+    controller_log = os.path.join(args.session, CONTROLLER_LOG)
+    game_log = os.path.join(args.session, GAME_LOG)
+    if not os.path.exists(controller_log) and not os.path.exists(game_log):
+        parser.error(f"no session logs in {args.session}")
+
+    if os.path.exists(controller_log):
+        result = replay_controller(controller_log, args.bundle, args.verbose)
+        speedup = result["duration_s"] / max(result["replay_s"], 1e-9)
+        status = "identical" if result["first_mismatch"] is None else f"differ from #{result['first_mismatch']}"
+        print(f"Classifier: {result['samples']} samples ({result['duration_s']:.1f} s) replayed in "
+              f"{result['replay_s']:.2f} s ({speedup:.0f}x real time); {result['replayed']} decisions, "
+              f"{result['recorded']} recorded: {status}")
+
+    if os.path.exists(game_log):
+        result = replay_game(game_log, args.verbose)
+        speedup = result["duration_s"] / max(result["replay_s"], 1e-9)
+        print(f"Game: {result['frames']} frames ({result['duration_s']:.1f} s) replayed in "
+              f"{result['replay_s']:.2f} s ({speedup:.0f}x real time); {result['replayed']} deaths, "
+              f"{result['recorded']} recorded: {'identical' if result['match'] else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
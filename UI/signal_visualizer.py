@@ -0,0 +1,185 @@
+"""
+signal_visualizer.py
+
+Live scrolling plot of the raw and filtered EMG signal with a feature and
+class-probability readout, for the calibration wizard (Tk) and as an
+overlay in the pygame game.
+
+Drawing is kept cheap so it never competes with acquisition:
+- the history is decimated to the plot's pixel width with min/max pairs per
+  pixel column, so the cost does not depend on how many samples are shown
+  and no spikes are lost;
+- Tk canvas items are created once and only their coordinates/text are
+  updated, and the pygame overlay re-renders into a cached surface that is
+  just blitted between refreshes;
+- refreshes are limited to MAX_FPS no matter how often they are requested.
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Python"))
+from emg_features import FEATURE_COLUMNS, extract_features
+from signal_filter import EnvelopeFilter
+
+MAX_FPS = 20
+HISTORY_SAMPLES = 1000  # 10 s at the sensor's 100 Hz
+
+
+class SignalHistory:
+    """Ring buffer of the latest raw samples, timestamps and filtered envelope."""
+
+    def __init__(self, capacity=HISTORY_SAMPLES, signal_filter=None):
+        self.capacity = capacity
+        self.raw = np.zeros(capacity)
+        self.filtered = np.zeros(capacity)
+        self.timestamps = np.zeros(capacity)
+        self.filter = signal_filter or EnvelopeFilter()
+        self.count = 0  # total samples seen
+        self._scratch = np.empty(capacity)
+
+    def extend(self, timestamps, values):
+        values = values[-self.capacity:]
+        timestamps = timestamps[-self.capacity:]
+        n = len(values)
+        if n == 0:
+            return
+        filtered = self.filter.process(values, self._scratch[:n])
+        start = self.count % self.capacity
+        first = min(n, self.capacity - start)
+        for target, source in ((self.raw, values), (self.filtered, filtered), (self.timestamps, timestamps)):
+            target[start:start + first] = source[:first]
+            target[:n - first] = source[first:]
+        self.count += n
+
+    def ordered(self, array):
+        """Samples of one of the buffers, oldest first."""
+        if self.count < self.capacity:
+            return array[:self.count]
+        start = self.count % self.capacity
+        return np.concatenate((array[start:], array[:start]))
+
+    def latest(self, n):
+        """(timestamps, raw) of the newest n samples, or None if fewer are buffered."""
+        if self.count < n or n > self.capacity:
+            return None
+        return self.ordered(self.timestamps)[-n:], self.ordered(self.raw)[-n:]
+
+
+def minmax_decimate(values, columns):
+    """
+    Reduce values to at most 2 * columns points: the min and max of each
+    pixel column, interleaved. Returns (x, y) with x in column units.
+    """
+    n = len(values)
+    if n <= 2 * columns:
+        return np.linspace(0, columns - 1, n) if n > 1 else np.zeros(n), values
+    edges = np.linspace(0, n, columns + 1).astype(np.intp)[:-1]
+    lows = np.minimum.reduceat(values, edges)
+    highs = np.maximum.reduceat(values, edges)
+    y = np.empty(2 * columns)
+    y[0::2] = lows
+    y[1::2] = highs
+    x = np.repeat(np.arange(columns, dtype=float), 2)
+    return x, y
+
+
+def plot_points(values, width, height, top=0, margin=4):
+    """Flattened [x0, y0, x1, y1, ...] screen coordinates for one trace."""
+    x, y = minmax_decimate(values, width)
+    low, high = (y.min(), y.max()) if len(y) else (0, 1)
+    scale = (height - 2 * margin) / max(high - low, 1e-9)
+    points = np.empty(2 * len(x))
+    points[0::2] = x
+    points[1::2] = top + height - margin - (y - low) * scale
+    return points
+
+
+class RateLimiter:
+    def __init__(self, max_fps=MAX_FPS):
+        self.interval = 1.0 / max_fps
+        self.last = 0.0
+
+    def ready(self):
+        now = time.perf_counter()
+        if now - self.last < self.interval:
+            return False
+        self.last = now
+        return True
+
+
+def readout_text(history, bundle):
+    """Feature and probability readout of the newest window, or '' if not enough data."""
+    if bundle is None:
+        return ""
+    window = history.latest(bundle.window_size)
+    if window is None:
+        return ""
+    timestamps, values = window
+    features = extract_features(values, timestamps)
+    probabilities = bundle.predict(features)[0]
+    feature_text = "  ".join(f"{name} {value:.1f}" for name, value in zip(FEATURE_COLUMNS, features[0]))
+    probability_text = "  ".join(f"{name} {p:.2f}" for name, p in zip(bundle.classes, probabilities))
+    return f"{feature_text}\n{probability_text}"
+
+
+class TkSignalPlot:
+    """Raw and filtered traces on a Tk canvas, updated in place."""
+
+    def __init__(self, canvas, history, bundle=None, max_fps=MAX_FPS):
+        self.canvas = canvas
+        self.history = history
+        self.bundle = bundle
+        self.limiter = RateLimiter(max_fps)
+        self.raw_line = canvas.create_line(0, 0, 0, 0, fill="gray")
+        self.filtered_line = canvas.create_line(0, 0, 0, 0, fill="blue", width=2)
+        self.readout = canvas.create_text(4, 4, anchor="nw", font=("Helvetica", 10), text="")
+
+    def refresh(self):
+        """Redraw if the frame budget allows; call as often as convenient."""
+        if self.history.count < 2 or not self.limiter.ready():
+            return
+        width = int(self.canvas["width"])
+        height = int(self.canvas["height"])
+        # Raw trace in the top half, filtered envelope in the bottom half
+        half = height // 2
+        raw = plot_points(self.history.ordered(self.history.raw), width, half, top=30)
+        filtered = plot_points(self.history.ordered(self.history.filtered), width, half - 30, top=half + 30)
+        self.canvas.coords(self.raw_line, *raw)
+        self.canvas.coords(self.filtered_line, *filtered)
+        self.canvas.itemconfigure(self.readout, text=readout_text(self.history, self.bundle))
+
+
+class PygameSignalOverlay:
+    """Same plot as a pygame overlay; rendered into a cached surface and blitted."""
+
+    def __init__(self, history, rect, bundle=None, max_fps=MAX_FPS, font=None):
+        import pygame
+        self.pygame = pygame
+        self.history = history
+        self.rect = pygame.Rect(rect)
+        self.bundle = bundle
+        self.limiter = RateLimiter(max_fps)
+        self.font = font or pygame.font.Font(None, 18)
+        self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+
+    def _render(self):
+        pygame = self.pygame
+        width, height = self.rect.size
+        self.surface.fill((255, 255, 255, 200))
+        if self.history.count >= 2:
+            half = height // 2
+            raw = plot_points(self.history.ordered(self.history.raw), width, half - 20, top=20)
+            filtered = plot_points(self.history.ordered(self.history.filtered), width, half, top=half)
+            pygame.draw.lines(self.surface, "gray", False, raw.reshape(-1, 2))
+            pygame.draw.lines(self.surface, "blue", False, filtered.reshape(-1, 2), 2)
+        for i, line in enumerate(readout_text(self.history, self.bundle).splitlines()):
+            self.surface.blit(self.font.render(line, True, "black"), (4, 2 + 14 * i))
+
+    def draw(self, screen):
+        """Blit the overlay every frame; it is only re-rendered at max_fps."""
+        if self.limiter.ready():
+            self._render()
+        screen.blit(self.surface, self.rect)
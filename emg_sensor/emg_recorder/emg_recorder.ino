@@ -0,0 +1,46 @@
+// Binary multi-channel EMG capture for data_collection.py --format binary.
+// Every PERIOD_US microseconds it sends one frame (little-endian):
+//   0xA5 0x5A | uint16 sequence | uint32 micros() | CHANNELS x uint16 reading | uint8 checksum
+// The checksum is the byte sum, mod 256, of everything between the sync bytes and itself.
+
+const int CHANNELS = 2;                      // Analog inputs A0 .. A(CHANNELS - 1)
+const unsigned long PERIOD_US = 500;         // 2 kHz; one analogRead takes ~112 us on an Uno
+const long BAUD_RATE = 2000000;              // Use the same --baudrate in data_collection.py
+const int FRAME_SIZE = 2 + 2 + 4 + 2 * CHANNELS + 1;
+
+uint8_t frame[FRAME_SIZE];
+uint16_t sequence = 0;
+unsigned long nextSample;
+
+void putUint16(int offset, uint16_t value) {
+  frame[offset] = value & 0xFF;
+  frame[offset + 1] = value >> 8;
+}
+
+void setup() {
+  Serial.begin(BAUD_RATE);
+  frame[0] = 0xA5;
+  frame[1] = 0x5A;
+  nextSample = micros();
+}
+
+void loop() {
+  if ((long)(micros() - nextSample) < 0) {
+    return;
+  }
+  unsigned long now = micros();
+  nextSample += PERIOD_US;  // Fixed schedule, so a late frame does not shift the following ones
+
+  putUint16(2, sequence++);
+  putUint16(4, now & 0xFFFF);
+  putUint16(6, now >> 16);
+  for (int channel = 0; channel < CHANNELS; channel++) {
+    putUint16(8 + 2 * channel, analogRead(A0 + channel));
+  }
+  uint8_t checksum = 0;
+  for (int i = 2; i < FRAME_SIZE - 1; i++) {
+    checksum += frame[i];
+  }
+  frame[FRAME_SIZE - 1] = checksum;
+  Serial.write(frame, FRAME_SIZE);
+}